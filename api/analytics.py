@@ -0,0 +1,136 @@
+from datetime import date, timedelta
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, FloatField, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce
+from django.utils import timezone
+
+from .inventory import DecimalDivide
+from .models import BillingItem, Product, ProductSalesDaily
+from .outbox import handles
+
+# Window used for "recent" sales when the client does not pass ?days=
+SALES_WINDOW_DAYS = 30
+SALES_MAX_WINDOW_DAYS = 365
+
+REVENUE_FIELD = DecimalField(max_digits=18, decimal_places=4)
+
+
+def _daily_sales(billing_items):
+    # Each line's share of its invoice total, so the invoice-level discount
+    # and tax are spread over the lines and a day's revenue adds up to the
+    # totals of its invoices
+    income = Case(
+        When(billing__sub_total=0, then=F('total_price')),
+        default=DecimalDivide(F('total_price') * F('billing__total_amount'), F('billing__sub_total'),
+                              output_field=REVENUE_FIELD),
+        output_field=REVENUE_FIELD,
+    )
+    return (billing_items
+            .values('billing__user_id', 'item_id', 'billing__invoice_date')
+            .annotate(sold=Sum('quantity'), income=Sum(income, output_field=REVENUE_FIELD))
+            .order_by())
+
+
+def refresh_sales_rollup(user_id, days):
+    """
+    Recompute the rollup rows of ``user_id`` for each of ``days``.
+
+    Only the invoices of those days are read, and the result replaces what
+    was there. This is a recompute of the affected days rather than a delta
+    on purpose: the outbox delivers events at least once, and replaying a
+    delta would count the same sale twice, while a recompute is harmless to
+    run again. An edit that only changes the invoice discount or tax, or
+    moves the invoice to another day, is handled the same way.
+    """
+    days = {day for day in days if day is not None}
+    if not days:
+        return
+    rows = _daily_sales(BillingItem.objects.filter(billing__user_id=user_id, billing__invoice_date__in=days))
+    with transaction.atomic():
+        ProductSalesDaily.objects.filter(user_id=user_id, day__in=days).delete()
+        ProductSalesDaily.objects.bulk_create([
+            ProductSalesDaily(user_id=user_id, product_id=row['item_id'], day=row['billing__invoice_date'],
+                              quantity=row['sold'], revenue=row['income'])
+            for row in rows
+        ])
+
+
+def rebuild_sales_rollup(user_ids=None, batch_size=1000):
+    """Rebuild the rollup from every invoice, optionally for some users only."""
+    billing_items = BillingItem.objects.filter(billing__invoice_date__isnull=False)
+    rollup = ProductSalesDaily.objects.all()
+    if user_ids is not None:
+        billing_items = billing_items.filter(billing__user_id__in=user_ids)
+        rollup = rollup.filter(user_id__in=user_ids)
+
+    created = 0
+    with transaction.atomic():
+        rollup.delete()
+        batch = []
+        for row in _daily_sales(billing_items).iterator(chunk_size=batch_size):
+            batch.append(ProductSalesDaily(
+                user_id=row['billing__user_id'], product_id=row['item_id'], day=row['billing__invoice_date'],
+                quantity=row['sold'], revenue=row['income']))
+            if len(batch) >= batch_size:
+                ProductSalesDaily.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+        ProductSalesDaily.objects.bulk_create(batch)
+        created += len(batch)
+    return created
+
+
+@handles('billing.created')
+@handles('billing.updated')
+@handles('billing.deleted')
+def update_sales_rollup(payload):
+    days = [payload.get('invoice_date'), payload.get('previous_invoice_date')]
+    refresh_sales_rollup(payload['user_id'], {date.fromisoformat(day) for day in days if day})
+
+
+@handles('billing.generated')
+def update_generated_sales_rollup(payload):
+    refresh_sales_rollup(payload['user_id'], {date.fromisoformat(day) for day in payload['invoice_dates']})
+
+
+def sales_window_start(days):
+    return timezone.localdate() - timedelta(days=days - 1)
+
+
+def top_products(user, days, limit, order_by='quantity'):
+    """Best sellers over the last ``days`` days, read from the rollup."""
+    return list(
+        ProductSalesDaily.objects
+        .filter(user=user, day__gte=sales_window_start(days))
+        .values('product_id', 'product__product_name')
+        .annotate(quantity_sold=Sum('quantity'), revenue=Sum('revenue'))
+        .order_by('-revenue' if order_by == 'revenue' else '-quantity_sold', 'product_id')[:limit]
+    )
+
+
+def products_with_velocity(user, days):
+    """
+    The user's products annotated with ``quantity_sold`` over the last
+    ``days`` days and ``days_of_stock``: stock on hand divided by the average
+    daily sales, or None for products that did not sell.
+    """
+    sold = (ProductSalesDaily.objects
+            .filter(product=OuterRef('pk'), day__gte=sales_window_start(days))
+            .values('product')
+            .annotate(total=Sum('quantity'))
+            .values('total'))
+    return (Product.objects
+            .filter(user=user)
+            .annotate(quantity_sold=Coalesce(Subquery(sold), Value(0)))
+            .annotate(days_of_stock=Case(
+                When(quantity_sold=0, then=None),
+                default=Cast(F('quantity'), FloatField()) * days / F('quantity_sold'),
+                output_field=FloatField())))
+
+
+def sales_revenue(user, start, end):
+    """Invoiced revenue (invoice totals) between the ``start`` and ``end`` days, from the rollup."""
+    return (ProductSalesDaily.objects
+            .filter(user=user, day__gte=start, day__lte=end)
+            .aggregate(total=Sum('revenue'))['total'] or 0)
@@ -0,0 +1,148 @@
+import logging
+import threading
+import time
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, F, IntegerField, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+from .models import Category, CategoryStock, Product
+
+logger = logging.getLogger(__name__)
+
+CATEGORY_VERSION_KEY = 'category-catalog-version'
+
+# How often a process asks Redis whether another process changed the categories
+CATEGORY_CHECK_INTERVAL = 5
+
+_lock = threading.Lock()
+_categories = None
+_loaded_version = None
+_checked_at = float('-inf')
+
+
+def _load():
+    global _categories, _loaded_version, _checked_at
+    try:
+        version = cache.get(CATEGORY_VERSION_KEY)
+    except Exception:
+        logger.exception('Could not read the category version; reloading categories')
+        version = None
+    if _categories is None or version is None or version != _loaded_version:
+        _categories = {category.pk: category for category in Category.objects.order_by('name')}
+        _loaded_version = version
+    _checked_at = time.monotonic()
+
+
+def categories():
+    """
+    Every category, keyed by id, from this process's memory.
+
+    The table is small and rarely changes, so it is loaded once. At most
+    every ``CATEGORY_CHECK_INTERVAL`` seconds one cache GET compares the
+    version in Redis with the one loaded, and a change made by any process
+    triggers a reload. The returned instances are shared; do not modify them.
+    """
+    if _categories is None or time.monotonic() - _checked_at >= CATEGORY_CHECK_INTERVAL:
+        with _lock:
+            if _categories is None or time.monotonic() - _checked_at >= CATEGORY_CHECK_INTERVAL:
+                _load()
+    return _categories
+
+
+def get_category(pk):
+    """The category with id ``pk``, or None. Reloads once on a miss, so new categories are found at once."""
+    category = categories().get(pk)
+    if category is None:
+        with _lock:
+            _load()
+        category = _categories.get(pk)
+    return category
+
+
+def invalidate_categories():
+    """Tell every process to reload its categories. Called after a category change commits."""
+    global _categories
+    _categories = None
+    try:
+        cache.set(CATEGORY_VERSION_KEY, time.time_ns(), None)
+    except Exception:
+        logger.exception('Could not broadcast a category change')
+
+
+def change_category_stock(user_id, changes):
+    """
+    Apply ``{category_id: (products, quantity, value)}`` deltas to the
+    user's category counters in one UPDATE. Rows the UPDATE does not find
+    are created and updated afterwards.
+    """
+    changes = {category_id: change for category_id, change in changes.items() if any(change)}
+    if not changes:
+        return
+
+    def column(index, output_field):
+        return Case(*[When(category_id=category_id, then=Value(change[index]))
+                      for category_id, change in changes.items()],
+                    default=Value(0), output_field=output_field)
+
+    rows = CategoryStock.objects.filter(user_id=user_id, category_id__in=changes)
+    update = {
+        'product_count': F('product_count') + column(0, IntegerField()),
+        'quantity': F('quantity') + column(1, IntegerField()),
+        'stock_value': F('stock_value') + column(2, DecimalField(max_digits=16, decimal_places=4)),
+    }
+    if rows.update(**update) < len(changes):
+        existing = set(rows.values_list('category_id', flat=True))
+        missing = set(changes) - existing
+        CategoryStock.objects.bulk_create(
+            [CategoryStock(user_id=user_id, category_id=category_id) for category_id in missing],
+            ignore_conflicts=True)
+        rows.filter(category_id__in=missing).update(**update)
+
+
+def move_category_stock(user_id, before=None, after=None):
+    """
+    Update the counters for one product written through the API.
+
+    ``before`` and ``after`` are the product's ``(category_id, quantity,
+    average_cost)`` before and after the write, None when it did not exist
+    then.
+    """
+    changes = {}
+    for state, sign in ((before, -1), (after, 1)):
+        if state is None:
+            continue
+        category_id, quantity, average_cost = state
+        products, units, value = changes.get(category_id, (0, 0, Decimal('0')))
+        changes[category_id] = (products + sign, units + sign * quantity,
+                                value + sign * quantity * Decimal(str(average_cost)))
+    change_category_stock(user_id, changes)
+
+
+def product_state(product):
+    return product.category_id, product.quantity, product.average_cost
+
+
+def rebuild_category_stock(user_ids=None):
+    """Recompute the category counters from the products, optionally for some users only."""
+    products = Product.objects.all()
+    counters = CategoryStock.objects.all()
+    if user_ids is not None:
+        products = products.filter(user_id__in=user_ids)
+        counters = counters.filter(user_id__in=user_ids)
+    value_field = DecimalField(max_digits=16, decimal_places=4)
+    rows = (products
+            .values('user_id', 'category_id')
+            .annotate(products=Count('id'), units=Sum('quantity'),
+                      value=Coalesce(Sum(F('quantity') * F('average_cost'), output_field=value_field),
+                                     Value(Decimal('0')), output_field=value_field))
+            .order_by())
+    with transaction.atomic():
+        counters.delete()
+        return len(CategoryStock.objects.bulk_create([
+            CategoryStock(user_id=row['user_id'], category_id=row['category_id'], product_count=row['products'],
+                          quantity=row['units'], stock_value=row['value'])
+            for row in rows
+        ], batch_size=1000))
@@ -0,0 +1,138 @@
+import hashlib
+import logging
+import time
+from contextlib import nullcontext
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework import status
+from rest_framework.response import Response
+
+from .routers import use_primary
+
+logger = logging.getLogger(__name__)
+
+# Counters are recreated on demand, so letting idle ones expire is harmless
+RESOURCE_VERSION_TTL = timedelta(days=30)
+
+
+def _version_key(entity, user_id):
+    return f'resource-version:{user_id if user_id is not None else "shared"}:{entity}'
+
+
+def bump_resource_version(entity, user_id=None):
+    """
+    Mark every cached representation of ``entity`` for ``user_id`` as stale.
+
+    The counter is set to the current time in nanoseconds rather than
+    incremented, so a counter lost to eviction or a Redis restart is never
+    recreated with a value a client has already seen. Called after commit;
+    a cache outage is logged instead of failing a write that already happened.
+    """
+    try:
+        cache.set(_version_key(entity, user_id), time.time_ns(), RESOURCE_VERSION_TTL.total_seconds())
+    except Exception:
+        logger.exception('Could not bump the %s version for user %s', entity, user_id)
+
+
+def resource_version(entity, user_id=None):
+    key = _version_key(entity, user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), RESOURCE_VERSION_TTL.total_seconds())
+        version = cache.get(key)
+    return version
+
+
+def _matches(if_none_match, etag):
+    # GET uses the weak comparison (RFC 9110 13.1.2)
+    tags = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+    return etag.removeprefix('W/') in tags
+
+
+def _row_version(model, lookup, object_id, user):
+    rows = model.objects.all() if user is None else model.objects.filter(user=user)
+    try:
+        return rows.filter(**{lookup: object_id}).values_list('version', flat=True).first()
+    except (TypeError, ValueError):
+        # Not a valid id; the view answers with its own error
+        return None
+
+
+def conditional_get(entity, shared=False, shared_entities=(), versioned=None, lookup='pk'):
+    """
+    Answer a GET with 304 Not Modified when nothing of ``entity`` changed.
+
+    The ETag combines the per-user counter for ``entity`` with the user, the
+    full path and the negotiated media type, so every page, filter and
+    sparse fieldset gets its own tag. A matching ``If-None-Match`` is
+    answered from the counter alone, without touching the database. Use
+    ``shared=True`` for rows that are not owned by a user, such as parties,
+    and ``shared_entities`` for shared counters the response also depends on.
+
+    Detail requests (``?id=``) on a ``versioned`` model get a strong
+    ``"<version>.<digest>"`` tag instead, read with one primary key lookup
+    on ``lookup``. Its leading row version is what ``expected_version``
+    checks, so a client can send the ETag of a GET back as ``If-Match``.
+
+    ``Last-Modified`` is the time of the latest counter bump. It is left out
+    while that bump is under a second old, since a second change in the
+    same second would share the timestamp; ``If-Modified-Since`` is only
+    used when no ``If-None-Match`` is sent.
+
+    The counters are bumped as the primary commits, but a replica may still
+    serve the rows from before. Within ``REPLICA_PIN_SECONDS`` of the latest
+    bump the response is therefore read from the primary, so no tag is
+    handed out with a body older than the change it stands for.
+    """
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            try:
+                versions = [resource_version(entity, None if shared else request.user.pk)]
+                versions += [resource_version(name) for name in shared_entities]
+            except Exception:
+                logger.exception('Could not read the %s version; serving without an ETag', entity)
+                return view_method(self, request, *args, **kwargs)
+            read_at = time.time_ns()
+
+            digest = hashlib.sha1(
+                f'{":".join(map(str, versions))}:{request.user.pk}:{request.get_full_path()}:'
+                f'{request.accepted_media_type}'.encode()
+            ).hexdigest()
+            etag = f'W/"{digest}"'
+            modified_at = max(version or 0 for version in versions)
+            recent = read_at - modified_at < settings.REPLICA_PIN_SECONDS * 10 ** 9
+            reads = use_primary if recent else nullcontext
+            object_id = request.query_params.get('id')
+            if versioned is not None and object_id:
+                with reads():
+                    row_version = _row_version(versioned, lookup, object_id, None if shared else request.user)
+                if row_version is not None:
+                    etag = f'"{row_version}.{digest}"'
+
+            if_none_match = request.headers.get('If-None-Match')
+            if if_none_match:
+                not_modified = _matches(if_none_match, etag)
+            else:
+                since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+                not_modified = since is not None and modified_at // 10 ** 9 <= since
+            if not_modified:
+                response = Response(status=status.HTTP_304_NOT_MODIFIED)
+            else:
+                with reads():
+                    response = view_method(self, request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+            response['ETag'] = etag
+            if read_at - modified_at >= 10 ** 9:
+                response['Last-Modified'] = http_date(modified_at // 10 ** 9)
+            patch_vary_headers(response, ['Authorization'])
+            return response
+
+        return wrapper
+    return decorator
@@ -0,0 +1,136 @@
+import logging
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db.models import Exists, Min, OuterRef, Q, Sum
+from django.utils import timezone
+
+from .inventory import low_stock_products
+from .models import Billing, Expense
+
+logger = logging.getLogger(__name__)
+
+# How long a computed dashboard is served before a read recomputes it
+DASHBOARD_TTL = timedelta(minutes=5)
+
+# Writes within this long of each other share one background refresh
+DASHBOARD_REFRESH_DELAY = timedelta(seconds=3)
+
+# Entities whose changes show up on the dashboard
+DASHBOARD_ENTITIES = ('billing', 'expense', 'product')
+
+PERIODS = ('today', 'week', 'month')
+
+CENTS = Decimal('0.01')
+
+
+def _cache_key(user_id, today):
+    # The day is part of the key, so "today" never outlives midnight
+    return f'dashboard:{user_id}:{today.isoformat()}'
+
+
+def _pending_key(user_id):
+    return f'dashboard-refresh-pending:{user_id}'
+
+
+def period_starts(today):
+    """First day of each period; weeks start on Monday."""
+    return {
+        'today': today,
+        'week': today - timedelta(days=today.weekday()),
+        'month': today.replace(day=1),
+    }
+
+
+def compute_dashboard(user_id, today=None):
+    """
+    Sales, dues, expenses and new customers for today, this week and this
+    month, plus the number of low-stock products.
+
+    Each figure is one conditional aggregate over the invoices or expenses
+    since the earliest period start, so the whole dashboard is four queries
+    however many periods it shows. A new customer is a party whose first
+    invoice from this user falls in the period.
+    """
+    today = today or timezone.localdate()
+    starts = period_starts(today)
+    since = min(starts.values())
+
+    billings = Billing.objects.filter(user_id=user_id, invoice_date__gte=since, invoice_date__lte=today)
+    sales = billings.aggregate(**{
+        f'{metric}_{period}': Sum(field, filter=Q(invoice_date__gte=start))
+        for period, start in starts.items()
+        for metric, field in (('sales', 'total_amount'), ('dues', 'due_amount'))
+    })
+    expenses = (Expense.objects
+                .filter(user_id=user_id, date__gte=since, date__lte=today)
+                .aggregate(**{f'expenses_{period}': Sum('amount', filter=Q(date__gte=start))
+                              for period, start in starts.items()}))
+
+    earlier = Billing.objects.filter(user_id=user_id, party_id=OuterRef('party_id'), invoice_date__lt=since)
+    first_invoices = list(billings
+                          .filter(party__isnull=False)
+                          .exclude(Exists(earlier))
+                          .values('party_id')
+                          .annotate(first=Min('invoice_date'))
+                          .values_list('first', flat=True))
+
+    dashboard = {'date': today.isoformat()}
+    for period, start in starts.items():
+        dashboard[period] = {
+            'sales': str((sales[f'sales_{period}'] or Decimal('0')).quantize(CENTS)),
+            'dues': str((sales[f'dues_{period}'] or Decimal('0')).quantize(CENTS)),
+            'expenses': str((expenses[f'expenses_{period}'] or Decimal('0')).quantize(CENTS)),
+            'new_customers': sum(1 for first in first_invoices if first >= start),
+        }
+    dashboard['low_stock_count'] = low_stock_products().filter(user_id=user_id).count()
+    dashboard['generated_at'] = timezone.now().isoformat()
+    return dashboard
+
+
+def refresh_dashboard(user_id):
+    """Recompute the dashboard of ``user_id`` and cache it."""
+    today = timezone.localdate()
+    dashboard = compute_dashboard(user_id, today)
+    cache.set(_cache_key(user_id, today), dashboard, DASHBOARD_TTL.total_seconds())
+    return dashboard
+
+
+def get_dashboard(user_id):
+    """
+    The cached dashboard, computed on the spot only when nothing is cached.
+
+    Writes refresh the cache in the background (see
+    ``schedule_dashboard_refresh``), so reads normally cost one cache hit.
+    """
+    try:
+        dashboard = cache.get(_cache_key(user_id, timezone.localdate()))
+        if dashboard is not None:
+            return dashboard
+        return refresh_dashboard(user_id)
+    except Exception:
+        logger.exception('Dashboard cache unavailable for user %s; computing it directly', user_id)
+        return compute_dashboard(user_id)
+
+
+def schedule_dashboard_refresh(user_id):
+    """
+    Queue a background refresh of ``user_id``'s dashboard, after commit.
+
+    A marker in the cache collapses a burst of writes into one refresh that
+    runs ``DASHBOARD_REFRESH_DELAY`` after the first of them; the task
+    clears the marker before it reads, so a write committed while it runs
+    queues the next refresh.
+    """
+    from .tasks import refresh_user_dashboard
+
+    try:
+        if cache.add(_pending_key(user_id), 1, DASHBOARD_REFRESH_DELAY.total_seconds() * 2):
+            refresh_user_dashboard.apply_async((user_id,), countdown=DASHBOARD_REFRESH_DELAY.total_seconds())
+    except Exception:
+        logger.exception('Could not schedule a dashboard refresh for user %s', user_id)
+
+
+def clear_refresh_pending(user_id):
+    cache.delete(_pending_key(user_id))
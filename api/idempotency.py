@@ -0,0 +1,122 @@
+import hashlib
+import time
+from contextvars import ContextVar
+from datetime import timedelta
+from functools import wraps
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from rest_framework import status
+from rest_framework.response import Response
+
+# How long a finished response can be replayed for the same key
+IDEMPOTENCY_TTL = timedelta(hours=24)
+
+# How long a request may hold a key before a retry is allowed to run it again
+IDEMPOTENCY_LOCK_TTL = timedelta(seconds=30)
+
+# How long a duplicate waits for the first request to finish before giving up
+IDEMPOTENCY_WAIT = timedelta(seconds=10)
+IDEMPOTENCY_POLL_INTERVAL = 0.05
+
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+
+# Locks of responses waiting for their transaction to commit, per request
+_uncommitted_locks = ContextVar('uncommitted_idempotency_locks', default=None)
+
+
+def idempotent(view_method):
+    """
+    Make a view method safe to retry with an ``Idempotency-Key`` header.
+
+    The first request with a key runs normally and its response is stored in
+    the cache. Retries with the same key and body get the stored response
+    back (marked ``Idempotent-Replayed: true``) without running the view.
+    A retry that arrives while the first request is still running waits for
+    it to finish. Requests without the header are not affected.
+    """
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        if _uncommitted_locks.get() is not None:
+            return _idempotent_call(view_method, self, request, args, kwargs)
+        # The outermost call: once it returns, every transaction it opened has
+        # ended, so a lock still waiting for its commit was rolled back
+        token = _uncommitted_locks.set(set())
+        try:
+            return _idempotent_call(view_method, self, request, args, kwargs)
+        finally:
+            if not connection.in_atomic_block:
+                for lock_key in _uncommitted_locks.get():
+                    cache.delete(lock_key)
+            _uncommitted_locks.reset(token)
+
+    return wrapper
+
+
+def _idempotent_call(view_method, self, request, args, kwargs):
+    key = request.headers.get('Idempotency-Key')
+    if not key:
+        return view_method(self, request, *args, **kwargs)
+    if len(key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+        return Response({'error': 'Idempotency-Key is too long.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    cache_key = f'idempotency:{request.user.pk}:{request.method}:{request.path}:{key}'
+    lock_key = f'{cache_key}:lock'
+    fingerprint = hashlib.sha256(request.body).hexdigest()
+
+    stored = cache.get(cache_key)
+    if stored is None:
+        if cache.add(lock_key, fingerprint, IDEMPOTENCY_LOCK_TTL.total_seconds()):
+            return _run_and_store(view_method, self, request, args, kwargs, cache_key, lock_key, fingerprint)
+        stored = _wait_for_result(cache_key, lock_key)
+        if stored is None:
+            return Response({'error': 'A request with this Idempotency-Key is still in progress.'},
+                            status=status.HTTP_409_CONFLICT)
+
+    if stored['fingerprint'] != fingerprint:
+        return Response({'error': 'This Idempotency-Key was already used for a different request.'},
+                        status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+    response = Response(stored['data'], status=stored['status'])
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _run_and_store(view_method, view, request, args, kwargs, cache_key, lock_key, fingerprint):
+    try:
+        response = view_method(view, request, *args, **kwargs)
+    except Exception:
+        cache.delete(lock_key)
+        raise
+
+    if response.status_code >= 500:
+        cache.delete(lock_key)
+        return response
+
+    result = {'status': response.status_code, 'data': response.data, 'fingerprint': fingerprint}
+    uncommitted = _uncommitted_locks.get()
+    uncommitted.add(lock_key)
+
+    def store():
+        cache.set(cache_key, result, IDEMPOTENCY_TTL.total_seconds())
+        cache.delete(lock_key)
+        uncommitted.discard(lock_key)
+
+    # Inside an outer transaction (e.g. batch/) only remember the response
+    # once the write is actually committed. If it rolls back, the outermost
+    # idempotent view releases the lock and a retry runs again.
+    transaction.on_commit(store)
+    return response
+
+
+def _wait_for_result(cache_key, lock_key):
+    deadline = time.monotonic() + IDEMPOTENCY_WAIT.total_seconds()
+    while time.monotonic() < deadline:
+        time.sleep(IDEMPOTENCY_POLL_INTERVAL)
+        stored = cache.get(cache_key)
+        if stored is not None:
+            return stored
+        if cache.get(lock_key) is None:
+            # The first request failed without storing a result.
+            return None
+    return None
@@ -0,0 +1,262 @@
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, DecimalField, F, Func, IntegerField, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Round
+from django.utils import timezone
+
+from .catalog import change_category_stock
+from .models import Product, StockMovement, StockSnapshot
+from .sync import record_changes
+
+
+class InsufficientStock(ValueError):
+    def __init__(self, product_ids):
+        super().__init__(f"Insufficient stock for product(s): {', '.join(map(str, product_ids))}")
+        self.product_ids = product_ids
+
+
+# Products snapshotted per bulk insert
+SNAPSHOT_BATCH_SIZE = 1000
+
+
+def _movements(user, deltas, kind, billing, unit_costs, average_costs):
+    booked_on = billing.invoice_date if billing is not None and billing.invoice_date else timezone.localdate()
+    return [
+        StockMovement(user=user, product_id=product_id, quantity=delta, billing=billing, booked_on=booked_on,
+                      unit_cost=unit_costs.get(product_id, average_costs.get(product_id, 0)),
+                      kind=StockMovement.RETURN if kind == StockMovement.SALE and delta > 0 else kind)
+        for product_id, delta in deltas.items() if delta
+    ]
+
+
+def record_movements(user, deltas, kind, billing=None, unit_costs=None):
+    """
+    Append one StockMovement per non-zero delta in a single INSERT.
+
+    For sales, stock coming back (a line removed or reduced) is recorded
+    as a return. Movements without an entry in ``unit_costs`` are costed at
+    the product's current average cost. Movements of an invoice are booked
+    on its invoice date.
+    """
+    record_billing_movements(user, [(billing, deltas)], kind, unit_costs)
+
+
+def record_billing_movements(user, billing_deltas, kind, unit_costs=None):
+    """
+    ``record_movements`` for several invoices at once: ``billing_deltas``
+    is a list of ``(billing, deltas)`` pairs, written in a single INSERT.
+    """
+    billing_deltas = [(billing, {product_id: delta for product_id, delta in deltas.items() if delta})
+                      for billing, deltas in billing_deltas]
+    product_ids = {product_id for _, deltas in billing_deltas for product_id in deltas}
+    if not product_ids:
+        return
+    unit_costs = unit_costs or {}
+    average_costs = dict(Product.objects.filter(id__in=product_ids - set(unit_costs))
+                         .values_list('id', 'average_cost'))
+    StockMovement.objects.bulk_create([
+        movement
+        for billing, deltas in billing_deltas
+        for movement in _movements(user, deltas, kind, billing, unit_costs, average_costs)
+    ])
+
+
+class DecimalDivide(Func):
+    """
+    ``dividend / divisor`` with a decimal result on every backend.
+
+    SQLite stores whole decimals as integers, and casting to NUMERIC keeps
+    them that way, so 240 / 55 would give 4 there. The dividend is made a
+    REAL first.
+    """
+    arg_joiner = ' / '
+    template = '(%(expressions)s)'
+    arity = 2
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, arg_joiner=' * 1.0 / ', **extra_context)
+
+
+def _reaveraged_cost(deltas, unit_costs):
+    """
+    New average cost after receiving stock at ``unit_costs``:
+    (on hand * average + received * cost) / (on hand + received).
+
+    Every F() in an UPDATE reads the row as it was before the statement, so
+    this sees the old quantity and average.
+    """
+    received = [(product_id, deltas[product_id], cost) for product_id, cost in unit_costs.items()
+                if deltas.get(product_id, 0) > 0]
+    if not received:
+        return F('average_cost')
+    cost_field = DecimalField(max_digits=12, decimal_places=4)
+    return Case(
+        # Rounded as the column would, so every backend stores the same value
+        *[When(id=product_id, then=Round(DecimalDivide(
+            F('quantity') * F('average_cost') + Value(delta * cost, output_field=cost_field),
+            F('quantity') + Value(delta), output_field=cost_field), 4))
+          for product_id, delta, cost in received],
+        default=F('average_cost'),
+        output_field=cost_field,
+    )
+
+
+def adjust_stock(user, deltas, kind=StockMovement.ADJUSTMENT, billing=None, unit_costs=None, record=True):
+    """
+    Apply signed quantity changes to the user's products in a single UPDATE.
+
+    ``deltas`` maps product id to the change (negative for stock going out).
+    Raises InsufficientStock, with nothing applied, if any product would go
+    below zero. Each change is also written to the stock ledger as ``kind``.
+    Stock received with a cost in ``unit_costs`` updates the products'
+    weighted-average cost in the same statement, and the user's category
+    counters follow in one more. Callers passing ``record=False`` write the
+    ledger themselves, e.g. split across several invoices.
+    """
+    deltas = {product_id: delta for product_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    change = Case(*[When(id=product_id, then=Value(delta)) for product_id, delta in deltas.items()],
+                  output_field=IntegerField())
+    try:
+        # quantity is unsigned, so the database rejects the whole statement
+        # if any row would go negative
+        with transaction.atomic():
+            Product.objects.filter(user=user, id__in=deltas).update(
+                quantity=F('quantity') + change, average_cost=_reaveraged_cost(deltas, unit_costs or {}),
+                version=F('version') + 1, updated_at=timezone.now())
+    except IntegrityError:
+        short = [
+            product_id
+            for product_id, quantity in Product.objects.filter(user=user, id__in=deltas).values_list('id', 'quantity')
+            if quantity + deltas[product_id] < 0
+        ]
+        if not short:
+            raise
+        raise InsufficientStock(sorted(short))
+
+    # Stock received at a cost adds exactly that to its category's value;
+    # every other change moves at the (unchanged) average cost
+    products = Product.objects.filter(id__in=deltas).values_list('id', 'category_id', 'average_cost')
+    costs, categories = {}, defaultdict(lambda: [0, 0, Decimal('0')])
+    for product_id, category_id, average_cost in products:
+        delta = deltas[product_id]
+        costs[product_id] = average_cost
+        cost = unit_costs[product_id] if unit_costs and product_id in unit_costs and delta > 0 else average_cost
+        categories[category_id][1] += delta
+        categories[category_id][2] += delta * cost
+    costs.update(unit_costs or {})
+    change_category_stock(user.pk, {category_id: tuple(change) for category_id, change in categories.items()})
+
+    if record:
+        record_movements(user, deltas, kind, billing, costs)
+    record_changes('product', list(deltas), user_id=user.pk)
+
+
+def low_stock_products(user=None):
+    """
+    Products at or below their reorder level.
+
+    The filter matches the condition of ``product_low_stock_idx`` exactly, so
+    the database reads only the partial index, never the whole catalog.
+    """
+    products = Product.objects.filter(quantity__lte=F('reorder_level'))
+    if user is not None:
+        products = products.filter(user=user)
+    return products
+
+
+def _start_of(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def take_stock_snapshots(day):
+    """
+    Store every product's quantity at the end of ``day``.
+
+    Computed as the current quantity minus the movements since, in a single
+    statement per batch, so it is consistent with concurrent sales. Running
+    it again for the same day overwrites that day's snapshots.
+    """
+    since = (StockMovement.objects
+             .filter(product=OuterRef('pk'), created_at__gte=_start_of(day + timedelta(days=1)))
+             .values('product')
+             .annotate(total=Sum('quantity'))
+             .values('total'))
+    rows = (Product.objects
+            .annotate(moved_since=Coalesce(Subquery(since), Value(0)))
+            .values_list('id', 'quantity', 'moved_since')
+            .iterator(chunk_size=SNAPSHOT_BATCH_SIZE))
+
+    taken = 0
+    batch = []
+    for product_id, quantity, moved_since in rows:
+        batch.append(StockSnapshot(product_id=product_id, day=day, quantity=quantity - moved_since))
+        if len(batch) >= SNAPSHOT_BATCH_SIZE:
+            taken += len(StockSnapshot.objects.bulk_create(
+                batch, update_conflicts=True, unique_fields=['product', 'day'], update_fields=['quantity']))
+            batch = []
+    taken += len(StockSnapshot.objects.bulk_create(
+        batch, update_conflicts=True, unique_fields=['product', 'day'], update_fields=['quantity']))
+    return taken
+
+
+def stock_as_of(products, day):
+    """
+    Return ``{product_id: quantity}`` at the end of ``day`` for ``products``.
+
+    Starts from each product's latest snapshot on or before ``day`` and adds
+    the short ledger tail after it; only products without any snapshot read
+    their ledger from the beginning. Costs one query per distinct snapshot
+    day, usually one.
+    """
+    latest = StockSnapshot.objects.filter(product=OuterRef('pk'), day__lte=day).order_by('-day')
+    rows = products.annotate(
+        snapshot_day=Subquery(latest.values('day')[:1]),
+        snapshot_quantity=Subquery(latest.values('quantity')[:1]),
+    ).values_list('id', 'snapshot_day', 'snapshot_quantity')
+
+    quantities = {}
+    by_snapshot_day = {}
+    for product_id, snapshot_day, snapshot_quantity in rows:
+        quantities[product_id] = snapshot_quantity or 0
+        by_snapshot_day.setdefault(snapshot_day, []).append(product_id)
+
+    end = _start_of(day + timedelta(days=1))
+    for snapshot_day, product_ids in by_snapshot_day.items():
+        tail = StockMovement.objects.filter(product_id__in=product_ids, created_at__lt=end)
+        if snapshot_day is not None:
+            tail = tail.filter(created_at__gte=_start_of(snapshot_day + timedelta(days=1)))
+        for product_id, moved in tail.values('product_id').annotate(total=Sum('quantity')).values_list('product_id', 'total'):
+            quantities[product_id] += moved
+    return quantities
+
+
+def stock_valuation(user):
+    """Units on hand and their value at average cost, in one aggregate query."""
+    cost_field = DecimalField(max_digits=18, decimal_places=4)
+    return Product.objects.filter(user=user).aggregate(
+        product_count=Count('id'),
+        total_quantity=Coalesce(Sum('quantity'), 0),
+        total_value=Coalesce(Sum(F('quantity') * F('average_cost'), output_field=cost_field),
+                             Value(0, output_field=cost_field)),
+    )
+
+
+def cost_of_goods_sold(user, start, end):
+    """
+    Cost of the units sold between the ``start`` and ``end`` days
+    (inclusive), net of returns, at the cost booked when each moved.
+
+    Movements are grouped by the day they are booked on, which for an
+    invoice's stock is its invoice date, as revenue is.
+    """
+    cost_field = DecimalField(max_digits=18, decimal_places=4)
+    total = StockMovement.objects.filter(
+        user=user, kind__in=[StockMovement.SALE, StockMovement.RETURN], booked_on__gte=start, booked_on__lte=end,
+    ).aggregate(total=Sum(F('quantity') * F('unit_cost'), output_field=cost_field))['total']
+    return -(total or 0)
@@ -0,0 +1,164 @@
+import re
+import uuid
+from collections import defaultdict
+
+from django.conf import settings
+from django.utils import timezone
+
+from .inventory import adjust_stock
+from .models import BillingItem, InvoiceNumberBlock, InvoiceSequence, Product, StockMovement
+from .serializers import BillingLineSerializer
+
+# Largest block of numbers a terminal can reserve in one call
+INVOICE_BLOCK_MAX_SIZE = 1000
+
+BILLING_ITEM_FIELDS = ['item', 'quantity', 'rate', 'discount_percentage', 'tax_percentage', 'total_price']
+
+_invoice_number_re = re.compile(r'^%s-(\d{4})-(\d+)$' % re.escape(settings.INVOICE_NUMBER_PREFIX))
+
+
+def format_invoice_number(year, number):
+    return f'{settings.INVOICE_NUMBER_PREFIX}-{year}-{number:06d}'
+
+
+def parse_invoice_number(invoice_number):
+    """Return ``(year, number)`` for numbers in the server format, else None."""
+    match = _invoice_number_re.match(invoice_number or '')
+    if match is None:
+        return None
+    return int(match.group(1)), int(match.group(2))
+
+
+def pending_invoice_number():
+    """
+    Unique stand-in used while a billing is being written.
+
+    The real number is assigned by ``assign_invoice_number`` as the last step
+    of the transaction, so the counter row stays locked only for the commit.
+    """
+    return f'pending-{uuid.uuid4().hex}'
+
+
+def allocate_invoice_numbers(user, year, count=1):
+    """
+    Take ``count`` consecutive numbers from the user's counter for ``year``
+    and return ``(first, last)``.
+
+    Must run inside a transaction: the counter row stays locked until it
+    commits, and a rollback returns the numbers, so the sequence has no gaps.
+    """
+    sequence, _ = InvoiceSequence.objects.select_for_update().get_or_create(user=user, year=year)
+    first = sequence.last_number + 1
+    sequence.last_number += count
+    sequence.save(update_fields=['last_number'])
+    return first, sequence.last_number
+
+
+def assign_invoice_number(billing):
+    """Replace a pending number on ``billing`` with the next one in sequence."""
+    year = (billing.invoice_date or timezone.localdate()).year
+    number, _ = allocate_invoice_numbers(billing.user, year)
+    billing.invoice_number = format_invoice_number(year, number)
+    billing.save(update_fields=['invoice_number'])
+    return billing.invoice_number
+
+
+def reserve_invoice_block(user, terminal_id, size, year=None):
+    """Reserve ``size`` numbers for a terminal to hand out while offline."""
+    year = year or timezone.localdate().year
+    first, last = allocate_invoice_numbers(user, year, size)
+    return InvoiceNumberBlock.objects.create(
+        user=user, terminal_id=terminal_id, year=year, first_number=first, last_number=last)
+
+
+def is_reserved_for(user, invoice_number):
+    """
+    True unless ``invoice_number`` uses the server format without coming from
+    one of the user's reserved blocks. Free-form numbers are always accepted.
+    """
+    parsed = parse_invoice_number(invoice_number)
+    if parsed is None:
+        return True
+    year, number = parsed
+    return InvoiceNumberBlock.objects.filter(
+        user=user, year=year, first_number__lte=number, last_number__gte=number).exists()
+
+
+def sync_billing_items(billing, items_data):
+    """
+    Make the lines of ``billing`` match ``items_data``.
+
+    Lines carrying an ``id`` update that line, lines without one are added
+    and existing lines that are left out are removed. The writes are one
+    bulk_create, one bulk_update and one DELETE, followed by a single stock
+    adjustment for the net quantity change per product and one totals update.
+
+    Returns a dict of validation errors, or None once the lines are applied.
+    Must run inside a transaction; InsufficientStock is raised if the new
+    lines need more stock than is on hand.
+    """
+    serializer = BillingLineSerializer(data=items_data, many=True)
+    if not serializer.is_valid():
+        return {'items': serializer.errors}
+    lines = serializer.validated_data
+    if not lines:
+        return {'items': ['At least one billing item is required.']}
+
+    existing = {item.id: item for item in billing.items.all()}
+    line_ids = [line['id'] for line in lines if 'id' in line]
+    unknown_ids = set(line_ids).difference(existing)
+    if unknown_ids or len(line_ids) != len(set(line_ids)):
+        return {'items': [f"Unknown or repeated item id(s): {', '.join(map(str, sorted(unknown_ids) or line_ids))}"]}
+
+    product_ids = {line['item'] for line in lines}
+    owned = set(Product.objects.filter(user=billing.user, id__in=product_ids).values_list('id', flat=True))
+    if product_ids - owned:
+        return {'items': [f"Product(s) not found: {', '.join(map(str, sorted(product_ids - owned)))}"]}
+
+    # Net stock change per product: old lines go back, new lines go out
+    stock = defaultdict(int)
+    for item in existing.values():
+        stock[item.item_id] += item.quantity
+
+    to_create, to_update, kept = [], [], []
+    for line in lines:
+        values = {
+            'item_id': line['item'],
+            'quantity': line['quantity'],
+            'rate': line['rate'],
+            'total_price': line['quantity'] * line['rate'],
+        }
+        for optional in ('discount_percentage', 'tax_percentage'):
+            if optional in line:
+                values[optional] = line[optional]
+        stock[line['item']] -= line['quantity']
+
+        if 'id' not in line:
+            to_create.append(BillingItem(billing=billing, **values))
+            continue
+        item = existing[line['id']]
+        kept.append(item)
+        if any(getattr(item, field) != value for field, value in values.items()):
+            for field, value in values.items():
+                setattr(item, field, value)
+            to_update.append(item)
+
+    removed = set(existing).difference(item.id for item in kept)
+    if removed:
+        BillingItem.objects.filter(billing=billing, id__in=removed).delete()
+    if to_update:
+        BillingItem.objects.bulk_update(to_update, BILLING_ITEM_FIELDS)
+    if to_create:
+        BillingItem.objects.bulk_create(to_create)
+
+    adjust_stock(billing.user, stock, StockMovement.SALE, billing)
+    billing.calculate_totals(kept + to_create)
+    return None
+
+
+def release_billing_stock(billing):
+    """Put the stock held by ``billing``'s lines back before it is deleted."""
+    stock = defaultdict(int)
+    for product_id, quantity in billing.items.values_list('item_id', 'quantity'):
+        stock[product_id] += quantity
+    adjust_stock(billing.user, stock, StockMovement.RETURN, billing)
@@ -0,0 +1,97 @@
+from collections import defaultdict
+from decimal import ROUND_FLOOR, Decimal
+
+from django.conf import settings
+from django.db.models import Case, F, IntegerField, Value, When
+
+from .models import Billing, Customer
+from .sync import record_changes
+
+
+class InsufficientPoints(ValueError):
+    def __init__(self, points):
+        super().__init__(f"The customer does not have {points} loyalty points to redeem.")
+        self.points = points
+
+
+def points_for(amount):
+    """Points earned on a paid invoice of ``amount``: one per ``LOYALTY_SPEND_PER_POINT`` spent."""
+    if not settings.LOYALTY_SPEND_PER_POINT or amount <= 0:
+        return 0
+    return int((Decimal(str(amount)) / settings.LOYALTY_SPEND_PER_POINT).to_integral_value(ROUND_FLOOR))
+
+
+def redemption_value(points):
+    return (points * settings.LOYALTY_POINT_VALUE).quantize(Decimal('0.01'))
+
+
+def change_points(party_id, points):
+    """Add ``points`` (negative to take them back) to the customer of ``party_id`` with one UPDATE."""
+    if not points or party_id is None:
+        return
+    if Customer.objects.filter(party_id=party_id).update(loyalty_points=F('loyalty_points') + points):
+        record_changes('party', [party_id])
+
+
+def redeem_points(party_id, points):
+    """
+    Take ``points`` from the customer of ``party_id`` or raise InsufficientPoints.
+
+    The balance is checked and reduced in the same ``UPDATE ... WHERE
+    loyalty_points >= n``, so two checkouts racing for the same points
+    cannot both succeed and the balance never goes negative.
+    """
+    if party_id is None:
+        raise InsufficientPoints(points)
+    redeemed = (Customer.objects
+                .filter(party_id=party_id, loyalty_points__gte=points)
+                .update(loyalty_points=F('loyalty_points') - points))
+    if not redeemed:
+        raise InsufficientPoints(points)
+    record_changes('party', [party_id])
+
+
+def sync_loyalty_points(billing, previous_party_id):
+    """
+    Bring the points ``billing`` has earned in line with its current state.
+
+    A paid invoice earns ``points_for(total_amount)``; anything else earns
+    nothing. Only the difference from what was already awarded is applied,
+    with an F() update, so calling it after every write is safe. Call inside
+    the transaction that changed the billing, after its totals are final.
+    """
+    earned = points_for(billing.total_amount) if billing.invoice_status == 'Paid' and billing.party_id else 0
+    if previous_party_id == billing.party_id:
+        change_points(billing.party_id, earned - billing.loyalty_points_earned)
+    else:
+        change_points(previous_party_id, -billing.loyalty_points_earned)
+        change_points(billing.party_id, earned)
+    if earned != billing.loyalty_points_earned:
+        billing.loyalty_points_earned = earned
+        Billing.objects.filter(pk=billing.pk).update(loyalty_points_earned=earned)
+
+
+def award_points(billings):
+    """
+    ``sync_loyalty_points`` for new invoices created in bulk.
+
+    Sets ``loyalty_points_earned`` on the unsaved ``billings``, so call it
+    before inserting them, and credits every customer in one UPDATE.
+    """
+    earned = defaultdict(int)
+    for billing in billings:
+        if billing.invoice_status == 'Paid' and billing.party_id:
+            billing.loyalty_points_earned = points_for(billing.total_amount)
+            earned[billing.party_id] += billing.loyalty_points_earned
+    earned = {party_id: points for party_id, points in earned.items() if points}
+    if not earned:
+        return
+    change = Case(*[When(party_id=party_id, then=Value(points)) for party_id, points in earned.items()],
+                  output_field=IntegerField())
+    Customer.objects.filter(party_id__in=earned).update(loyalty_points=F('loyalty_points') + change)
+    record_changes('party', list(earned))
+
+
+def release_loyalty_points(billing):
+    """Take back the points ``billing`` earned and refund those redeemed on it, before it is deleted."""
+    change_points(billing.party_id, billing.loyalty_points_redeemed - billing.loyalty_points_earned)
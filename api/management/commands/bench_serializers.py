@@ -0,0 +1,90 @@
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from api.models import Billing, Expense, Product
+from api.renderers import ORJSONRenderer
+from api.serializers import (
+    BillingReadSerializer, BillingSerializer, ExpenseReadSerializer, ExpenseSerializer,
+    ProductReadSerializer, ProductSerializer,
+)
+
+
+def _product_row(i):
+    return {
+        'id': i, 'user_id': 1, 'product_name': f'Product {i}', 'category_id': 1 + i % 7,
+        'sku': f'SKU-{i}', 'product_Img': None, 'unit_price': Decimal('%d.%02d' % (i % 5000, i % 100)),
+        'quantity': i % 300, 'description': 'Lorem ipsum dolor sit amet' * (i % 3),
+    }
+
+
+def _expense_row(i):
+    return {
+        'id': i, 'user_id': 1, 'category': 'Rent', 'amount': Decimal('%d.50' % (i % 9000)),
+        'description': None, 'date': date(2026, 1, 1) + timedelta(days=i % 365), 'is_necessary': bool(i % 2),
+    }
+
+
+def _billing_row(i):
+    return {
+        'id': i, 'user_id': 1, 'invoice_number': f'INV-{i:06d}', 'invoice_date': date(2026, 1, 1),
+        'due_date': date(2026, 2, 1), 'payment_method': 'Cash', 'invoice_status': 'Paid',
+        'party_id': None, 'phone': '9800000000', 'VAt_number': None, 'address': 'Kathmandu',
+        'notes': 'Thank you for your business', 'paid_amount': Decimal('1130.00'),
+        'due_amount': Decimal('0.00'), 'total_amount': Decimal('1130.00'), 'discount': Decimal('0.00'),
+        'tax': Decimal('130.00'), 'sub_total': Decimal('1000.00'),
+    }
+
+
+BENCHMARKS = {
+    'product': (Product, ProductSerializer, ProductReadSerializer, _product_row),
+    'expense': (Expense, ExpenseSerializer, ExpenseReadSerializer, _expense_row),
+    'billing': (Billing, BillingSerializer, BillingReadSerializer, _billing_row),
+}
+
+
+class Command(BaseCommand):
+    help = ('Micro-benchmark the list read path: ModelSerializer + JSONRenderer versus '
+            '.values_list() rows + FlatReadSerializer + ORJSONRenderer. Runs in memory.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--only', choices=sorted(BENCHMARKS), action='append')
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+        for name in options['only'] or sorted(BENCHMARKS):
+            model, serializer_class, read_serializer, make_row = BENCHMARKS[name]
+            attnames = [field.attname for field in model._meta.concrete_fields]
+            full_rows = [make_row(i) for i in range(1, rows + 1)]
+            model_rows = [tuple(row.get(attname) for attname in attnames) for row in full_rows]
+            flat_rows = [tuple(row.get(column) for column in read_serializer.columns) for row in full_rows]
+
+            def before():
+                instances = [model.from_db('default', attnames, row) for row in model_rows]
+                return JSONRenderer().render(serializer_class(instances, many=True).data)
+
+            def after():
+                return ORJSONRenderer().render(read_serializer.to_representation(flat_rows))
+
+            if before() != after():
+                raise CommandError(f'{name}: fast path output differs from {serializer_class.__name__}')
+
+            slow, fast = self._best(before, repeat), self._best(after, repeat)
+            self.stdout.write(
+                f'{name:<8} before {rows / slow:>12,.0f} rows/s   after {rows / fast:>12,.0f} rows/s   '
+                f'x{slow / fast:.1f}'
+            )
+
+    @staticmethod
+    def _best(func, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - started)
+        return min(timings)
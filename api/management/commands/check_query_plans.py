@@ -0,0 +1,187 @@
+import re
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from api.inventory import low_stock_products
+from api.models import (Billing, Category, ChangeLog, Customer, Expense, ForgetPasswordOTP, OutboxEvent, Party,
+                        Product, PurchaseBill, RecurringBilling, RecurringExpense, Supplier)
+from api.search import filter_billings, search_billings
+from api.tasks import overdue_billings
+from api.views import users_with_email
+
+SEED_PREFIX = 'plancheck'
+
+# Lines of a plan that read a whole table
+FULL_SCAN_PATTERNS = {
+    'postgresql': re.compile(r'Seq Scan on (\w+)'),
+    'sqlite': re.compile(r'\bSCAN (?:TABLE )?(\w+)\s*$'),
+}
+
+
+class Rollback(Exception):
+    pass
+
+
+def seed_plan_data(users, rows):
+    """Seed ``users`` shops with ``rows`` rows in each of the tables the checked queries read."""
+    today = timezone.localdate()
+    now = timezone.now()
+    category = Category.objects.create(name=f'{SEED_PREFIX} category', slug=f'{SEED_PREFIX}-category')
+    shops = User.objects.bulk_create([
+        User(username=f'{SEED_PREFIX}-{u}', email=f'{SEED_PREFIX}-{u}@example.com') for u in range(users)
+    ])
+
+    parties = Party.objects.bulk_create([
+        Party(Category_type='Customer' if i % 4 else 'Supplier', is_active=bool(i % 7)) for i in range(rows)
+    ])
+    Customer.objects.bulk_create([
+        Customer(party=party, name=f'Customer {i}', email=f'customer{i}@example.com', phone_no=f'98{i:08d}',
+                 Customer_code=f'{SEED_PREFIX}-C{i}')
+        for i, party in enumerate(parties) if party.Category_type == 'Customer'
+    ], batch_size=1000)
+    suppliers = Supplier.objects.bulk_create([
+        Supplier(party=party, name=f'Supplier {i}', code=f'{SEED_PREFIX}-S{i}')
+        for i, party in enumerate(parties) if party.Category_type == 'Supplier'
+    ], batch_size=1000)
+
+    for u, shop in enumerate(shops):
+        Product.objects.bulk_create([
+            Product(user=shop, product_name=f'Product {i}', category=category, sku=f'{SEED_PREFIX}-{u}-{i}',
+                    unit_price=Decimal('100.00'), quantity=i % 50, reorder_level=5)
+            for i in range(rows)
+        ], batch_size=1000)
+        Billing.objects.bulk_create([
+            Billing(user=shop, party=parties[i], invoice_number=f'{SEED_PREFIX}-{i:06d}',
+                    invoice_date=today - timedelta(days=i % 365), due_date=today - timedelta(days=i % 365 - 30),
+                    invoice_status=('Paid', 'Unpaid', 'Pending', 'Draft')[i % 4], total_amount=Decimal('1130.00'),
+                    due_amount=Decimal('1130.00') if i % 4 else Decimal('0.00'),
+                    search_document=f'{SEED_PREFIX}-{i:06d} customer {i}')
+            for i in range(rows)
+        ], batch_size=1000)
+        Expense.objects.bulk_create([
+            Expense(user=shop, category='Rent', amount=Decimal('500.00'), date=today - timedelta(days=i % 365))
+            for i in range(rows)
+        ], batch_size=1000)
+        PurchaseBill.objects.bulk_create([
+            PurchaseBill(user=shop, supplier=suppliers[i % len(suppliers)], bill_number=f'{SEED_PREFIX}-{i}',
+                         bill_date=today - timedelta(days=i % 365), total_amount=Decimal('1000.00'))
+            for i in range(rows)
+        ], batch_size=1000)
+        ForgetPasswordOTP.objects.bulk_create([
+            ForgetPasswordOTP(user=shop, otp='123456', otp_created_at=now - timedelta(minutes=i))
+            for i in range(max(rows // 100, 1))
+        ])
+        ChangeLog.objects.bulk_create([
+            ChangeLog(user=shop, entity='billing', object_id=i) for i in range(rows)
+        ], batch_size=1000)
+        RecurringBilling.objects.bulk_create([
+            RecurringBilling(user=shop, start_date=today, next_run_date=today + timedelta(days=i % 30),
+                             is_active=bool(i % 3))
+            for i in range(rows // 10)
+        ])
+        RecurringExpense.objects.bulk_create([
+            RecurringExpense(user=shop, category='Rent', amount=Decimal('500.00'), start_date=today,
+                             next_run_date=today + timedelta(days=i % 30), is_active=bool(i % 3))
+            for i in range(rows // 10)
+        ])
+    OutboxEvent.objects.bulk_create([
+        OutboxEvent(event_type='billing.created', processed_at=now if i % 10 else None) for i in range(rows)
+    ], batch_size=1000)
+    return shops[0]
+
+
+def query_plans(user):
+    """The main query of each endpoint and background job, as ``(name, queryset)``."""
+    today = timezone.localdate()
+    month_start = today.replace(day=1)
+    billings = Billing.objects.filter(user=user)
+    party = billings.exclude(party=None).values_list('party_id', flat=True).first()
+    return [
+        ('auth: user by email', users_with_email(user.email.upper())),
+        ('auth: latest password reset OTP',
+         ForgetPasswordOTP.objects.filter(user=user).order_by('-otp_created_at')[:1]),
+        ('products: list', Product.objects.filter(user=user)[:10]),
+        ('products: duplicate name', Product.objects.filter(user=user, product_name='Product 1')),
+        ('products: low stock', low_stock_products(user)),
+        ('parties: list by type', Party.objects.filter(Category_type='Supplier')[:10]),
+        ('parties: duplicate customer email', Customer.objects.filter(email='customer1@example.com')),
+        ('parties: duplicate customer phone', Customer.objects.filter(phone_no='9800000001')),
+        ('parties: duplicate supplier name', Supplier.objects.filter(name='Supplier 0')),
+        ('parties: ledger', billings.filter(party_id=party).order_by(F('invoice_date').asc(nulls_first=True), 'id')),
+        ('expenses: list', Expense.objects.filter(user=user)[:10]),
+        ('billing: list', billings[:10]),
+        ('billing: status and date filter', filter_billings(billings, 'Unpaid', month_start, today)[:10]),
+        ('billing: search', search_billings(filter_billings(billings, 'Unpaid'), SEED_PREFIX)[:10]),
+        ('dashboard: sales', billings.filter(invoice_date__gte=month_start, invoice_date__lte=today)),
+        ('dashboard: expenses', Expense.objects.filter(user=user, date__gte=month_start, date__lte=today)),
+        ('purchases: list', PurchaseBill.objects.filter(user=user).order_by('-bill_date', '-id')[:10]),
+        ('sync: changes',
+         ChangeLog.objects.filter(Q(user=user) | Q(user__isnull=True), id__gt=0).order_by('id')[:500]),
+        ('reminders: overdue invoices', overdue_billings(today)),
+        ('outbox: pending events',
+         OutboxEvent.objects.filter(processed_at__isnull=True, available_at__lte=timezone.now()).order_by('id')[:100]),
+        ('recurring: due invoices', RecurringBilling.objects.filter(is_active=True, next_run_date__lte=today)),
+        ('recurring: due expenses', RecurringExpense.objects.filter(is_active=True, next_run_date__lte=today)),
+    ]
+
+
+def prepare_planner():
+    """Make the planner pick an index whenever one can serve a query, however small the seeded tables are."""
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+            cursor.execute('SET LOCAL enable_seqscan = off')
+
+
+def full_scans(plan):
+    """The tables ``plan`` reads in full."""
+    pattern = FULL_SCAN_PATTERNS[connection.vendor]
+    return sorted({match.group(1) for line in plan.splitlines() for match in [pattern.search(line)] if match})
+
+
+class Command(BaseCommand):
+    help = ('Seed a throwaway data set, EXPLAIN the main query of every endpoint and background job, '
+            'and fail if any of them reads a whole table. Everything runs in one transaction that '
+            'is rolled back, so it is safe against a live database.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=3)
+        parser.add_argument('--rows', type=int, default=2000,
+                            help='Rows per user in each seeded table.')
+        parser.add_argument('--verbose-plans', action='store_true', help='Print every plan, not only failures.')
+
+    def handle(self, *args, **options):
+        vendor = connection.vendor
+        if vendor not in FULL_SCAN_PATTERNS:
+            raise CommandError(f'Query plans cannot be checked on {vendor}.')
+        if options['users'] < 1 or options['rows'] < 10:
+            raise CommandError('--users must be at least 1 and --rows at least 10.')
+
+        failures = []
+        try:
+            with transaction.atomic():
+                user = seed_plan_data(options['users'], options['rows'])
+                prepare_planner()
+                for name, queryset in query_plans(user):
+                    plan = queryset.explain()
+                    scanned = full_scans(plan)
+                    if scanned:
+                        failures.append(name)
+                        self.stdout.write(self.style.ERROR(f'{name:<40} full scan of {", ".join(scanned)}'))
+                    else:
+                        self.stdout.write(f'{name:<40} ok')
+                    if scanned or options['verbose_plans']:
+                        self.stdout.write(plan + '\n')
+                raise Rollback
+        except Rollback:
+            pass
+
+        if failures:
+            raise CommandError(f'{len(failures)} quer{"y" if len(failures) == 1 else "ies"} fell back to a full scan.')
+        self.stdout.write(self.style.SUCCESS('Every checked query is served by an index.'))
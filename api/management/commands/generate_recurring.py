@@ -0,0 +1,22 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.recurring import generate_recurring_documents
+
+
+class Command(BaseCommand):
+    help = ('Generate the recurring invoices and expenses due by a date (today by default). '
+            'Periods already generated are skipped, so it is safe to run after a missed beat.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Generate what is due up to this day (YYYY-MM-DD).')
+
+    def handle(self, *args, **options):
+        try:
+            today = date.fromisoformat(options['date']) if options['date'] else None
+        except ValueError:
+            raise CommandError('--date must be YYYY-MM-DD.')
+
+        billings, expenses = generate_recurring_documents(today)
+        self.stdout.write(self.style.SUCCESS(f'Generated {billings} invoices and {expenses} expenses.'))
@@ -0,0 +1,87 @@
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from django.utils import timezone
+
+from api.invoicing import assign_invoice_number, parse_invoice_number, pending_invoice_number
+from api.models import Billing, InvoiceSequence
+
+
+class Command(BaseCommand):
+    help = ('Run concurrent checkouts against one shop and check that server-allocated invoice '
+            'numbers are unique and gap-free. Needs PostgreSQL: SQLite serializes all writers.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=50, help='Concurrent checkouts.')
+        parser.add_argument('--checkouts', type=int, default=20, help='Checkouts per worker.')
+        parser.add_argument('--work-ms', type=int, default=20,
+                            help='Simulated work inside each checkout transaction before numbering.')
+        parser.add_argument('--username', default='invoice-loadtest')
+        parser.add_argument('--keep', action='store_true', help='Keep the generated billings.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            self.stderr.write(self.style.WARNING(
+                f'Running on {connection.vendor}; row locks are not exercised, results are not representative.'))
+
+        user, _ = User.objects.get_or_create(username=options['username'])
+        year = timezone.localdate().year
+        Billing.objects.filter(user=user).delete()
+        InvoiceSequence.objects.filter(user=user).delete()
+
+        work = options['work_ms'] / 1000
+        latencies, errors = [], []
+        lock = threading.Lock()
+        start = threading.Barrier(options['workers'])
+
+        def worker():
+            try:
+                start.wait()
+                for _ in range(options['checkouts']):
+                    started = time.perf_counter()
+                    with transaction.atomic():
+                        billing = Billing.objects.create(user=user, invoice_number=pending_invoice_number())
+                        time.sleep(work)
+                        assign_invoice_number(billing)
+                    with lock:
+                        latencies.append(time.perf_counter() - started)
+            except Exception as exc:
+                with lock:
+                    errors.append(exc)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker) for _ in range(options['workers'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        if errors:
+            raise CommandError(f'{len(errors)} checkouts failed, first error: {errors[0]!r}')
+
+        numbers = sorted(
+            parse_invoice_number(invoice_number)[1]
+            for invoice_number in Billing.objects.filter(user=user).values_list('invoice_number', flat=True)
+        )
+        expected = options['workers'] * options['checkouts']
+        if numbers != list(range(1, expected + 1)):
+            raise CommandError(f'Expected invoice numbers 1..{expected}, got {len(numbers)} '
+                               f'({len(set(numbers))} distinct, max {numbers[-1] if numbers else 0}).')
+
+        latencies.sort()
+        self.stdout.write(self.style.SUCCESS(
+            f'{expected} checkouts by {options["workers"]} workers in {elapsed:.2f}s '
+            f'({expected / elapsed:,.0f}/s) for {year}: numbers 1..{expected} with no gaps or duplicates. '
+            f'Latency p50 {latencies[len(latencies) // 2] * 1000:.1f} ms, '
+            f'p95 {latencies[int(len(latencies) * 0.95)] * 1000:.1f} ms, '
+            f'max {latencies[-1] * 1000:.1f} ms.'))
+
+        if not options['keep']:
+            Billing.objects.filter(user=user).delete()
+            InvoiceSequence.objects.filter(user=user).delete()
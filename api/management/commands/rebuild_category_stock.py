@@ -0,0 +1,23 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from api.catalog import rebuild_category_stock
+
+
+class Command(BaseCommand):
+    help = ('Recompute the per user, per category product counts and stock value from the products. '
+            'Use after editing products outside the API, e.g. in the admin or a data import.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', action='append', dest='usernames',
+                            help='Only rebuild for this user (can be repeated).')
+
+    def handle(self, *args, **options):
+        user_ids = None
+        if options['usernames']:
+            user_ids = list(User.objects.filter(username__in=options['usernames']).values_list('id', flat=True))
+            if len(user_ids) != len(set(options['usernames'])):
+                raise CommandError('Unknown username in --username.')
+
+        created = rebuild_category_stock(user_ids)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt category counters: {created} user-category rows.'))
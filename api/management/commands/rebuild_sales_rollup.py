@@ -0,0 +1,24 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from api.analytics import rebuild_sales_rollup
+
+
+class Command(BaseCommand):
+    help = ('Rebuild the per product, per day sales rollup from every invoice. '
+            'Use after importing invoices or if the rollup is suspected to be out of sync.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', action='append', dest='usernames',
+                            help='Only rebuild for this user (can be repeated).')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        user_ids = None
+        if options['usernames']:
+            user_ids = list(User.objects.filter(username__in=options['usernames']).values_list('id', flat=True))
+            if len(user_ids) != len(set(options['usernames'])):
+                raise CommandError('Unknown username in --username.')
+
+        created = rebuild_sales_rollup(user_ids, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt sales rollup: {created} product-day rows.'))
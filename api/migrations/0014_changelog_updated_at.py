@@ -0,0 +1,69 @@
+# Generated by Django 6.0 on 2026-10-19 15:09
+
+from itertools import islice
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_change_log(apps, schema_editor):
+    """Seed the log with every existing row so a first sync from 0 is complete."""
+    ChangeLog = apps.get_model('api', 'ChangeLog')
+    sources = [
+        ('product', apps.get_model('api', 'Product').objects.values_list('id', 'user_id')),
+        ('expense', apps.get_model('api', 'Expense').objects.values_list('id', 'user_id')),
+        ('billing', apps.get_model('api', 'Billing').objects.values_list('id', 'user_id')),
+        ('party', apps.get_model('api', 'Party').objects.values_list('id', models.Value(None, output_field=models.IntegerField()))),
+    ]
+    for entity, rows in sources:
+        rows = rows.order_by('id').iterator(chunk_size=2000)
+        while batch := list(islice(rows, 2000)):
+            ChangeLog.objects.bulk_create(
+                [ChangeLog(entity=entity, object_id=pk, user_id=user_id) for pk, user_id in batch])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_forgetpasswordotp'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='billing',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddField(
+            model_name='expense',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='party',
+            name='is_updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.CreateModel(
+            name='ChangeLog',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('entity', models.CharField(choices=[('product', 'Product'), ('party', 'Party'), ('expense', 'Expense'), ('billing', 'Billing')], max_length=20)),
+                ('object_id', models.IntegerField()),
+                ('is_deleted', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='changes', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'id'], name='changelog_user_id_idx'), models.Index(fields=['entity', 'object_id'], name='changelog_entity_object_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_change_log, migrations.RunPython.noop),
+    ]
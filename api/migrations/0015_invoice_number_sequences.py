@@ -0,0 +1,62 @@
+# Generated by Django 6.0 on 2026-10-19 15:13
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_changelog_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InvoiceNumberBlock',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('terminal_id', models.CharField(max_length=64)),
+                ('year', models.PositiveIntegerField()),
+                ('first_number', models.PositiveIntegerField()),
+                ('last_number', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='InvoiceSequence',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('year', models.PositiveIntegerField()),
+                ('last_number', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='billing',
+            name='invoice_number',
+            field=models.CharField(max_length=50),
+        ),
+        migrations.AddConstraint(
+            model_name='billing',
+            constraint=models.UniqueConstraint(fields=('user', 'invoice_number'), name='unique_invoice_number_per_user'),
+        ),
+        migrations.AddField(
+            model_name='invoicenumberblock',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='invoice_number_blocks', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='invoicesequence',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='invoice_sequences', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='invoicenumberblock',
+            index=models.Index(fields=['user', 'year', 'first_number'], name='invoiceblock_user_year_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='invoicesequence',
+            constraint=models.UniqueConstraint(fields=('user', 'year'), name='unique_invoice_sequence_per_year'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 6.0 on 2026-10-19 15:23
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_productsalesdaily'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='reorder_level',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('quantity__lte', models.F('reorder_level'))), fields=['user', 'id'], name='product_low_stock_idx'),
+        ),
+    ]
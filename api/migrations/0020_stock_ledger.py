@@ -0,0 +1,61 @@
+# Generated by Django 6.0 on 2026-10-19 15:25
+
+from itertools import islice
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def open_stock_ledger(apps, schema_editor):
+    """Start each product's ledger with its current quantity as an adjustment."""
+    StockMovement = apps.get_model('api', 'StockMovement')
+    rows = (apps.get_model('api', 'Product').objects
+            .exclude(quantity=0)
+            .order_by('id')
+            .values_list('id', 'user_id', 'quantity')
+            .iterator(chunk_size=2000))
+    while batch := list(islice(rows, 2000)):
+        StockMovement.objects.bulk_create([
+            StockMovement(product_id=pk, user_id=user_id, kind='adjustment', quantity=quantity)
+            for pk, user_id, quantity in batch
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0019_product_reorder_level'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('sale', 'Sale'), ('purchase', 'Purchase'), ('adjustment', 'Adjustment'), ('return', 'Return')], max_length=20)),
+                ('quantity', models.IntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('billing', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stock_movements', to='api.billing')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_movements', to='api.product')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_movements', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['product', 'created_at'], name='stockmovement_product_time_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('day', models.DateField()),
+                ('quantity', models.IntegerField()),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_snapshots', to='api.product')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('product', 'day'), name='unique_stock_snapshot_day')],
+            },
+        ),
+        migrations.RunPython(open_stock_ledger, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 6.0 on 2026-10-19 15:28
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0021_average_cost'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PurchaseBill',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('bill_number', models.CharField(max_length=50)),
+                ('bill_date', models.DateField(default=django.utils.timezone.localdate)),
+                ('due_date', models.DateField(blank=True, null=True)),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0.0, max_digits=14)),
+                ('paid_amount', models.DecimalField(decimal_places=2, default=0.0, max_digits=14)),
+                ('due_amount', models.DecimalField(decimal_places=2, default=0.0, max_digits=14)),
+                ('notes', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('supplier', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='purchase_bills', to='api.supplier')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='purchase_bills', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PurchaseBillItem',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('quantity', models.PositiveIntegerField()),
+                ('unit_cost', models.DecimalField(decimal_places=4, max_digits=12)),
+                ('total_cost', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='purchase_items', to='api.product')),
+                ('purchase_bill', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='api.purchasebill')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SupplierBalance',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('payable', models.DecimalField(decimal_places=2, default=0.0, max_digits=14)),
+                ('supplier', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balances', to='api.supplier')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='supplier_balances', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='purchasebill',
+            index=models.Index(condition=models.Q(('due_amount__gt', 0)), fields=['user', 'supplier', 'due_date'], name='purchasebill_open_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='purchasebill',
+            constraint=models.UniqueConstraint(fields=('user', 'supplier', 'bill_number'), name='unique_purchase_bill_number'),
+        ),
+        migrations.AddConstraint(
+            model_name='supplierbalance',
+            constraint=models.UniqueConstraint(fields=('user', 'supplier'), name='unique_supplier_balance'),
+        ),
+    ]
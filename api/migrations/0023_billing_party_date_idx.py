@@ -0,0 +1,19 @@
+# Generated by Django 6.0 on 2026-10-19 15:28
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0022_purchase_bills'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='billing',
+            index=models.Index(fields=['party', 'invoice_date'], name='billing_party_date_idx'),
+        ),
+    ]
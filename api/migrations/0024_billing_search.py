@@ -0,0 +1,57 @@
+# Generated by Django 6.0 on 2026-10-19 15:30
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Concat, Lower
+
+
+def fill_search_documents(apps, schema_editor):
+    """Same document as api.search.search_document, built with the historical models."""
+    Billing = apps.get_model('api', 'Billing')
+    party_name = Coalesce(
+        Subquery(apps.get_model('api', 'Customer').objects.filter(party_id=OuterRef('party_id')).values('name')[:1]),
+        Subquery(apps.get_model('api', 'Supplier').objects.filter(party_id=OuterRef('party_id')).values('name')[:1]),
+        Value(''),
+    )
+    parts = [F('invoice_number'), party_name, F('phone'), F('VAt_number'), F('notes')]
+    separated = []
+    for part in parts:
+        separated += [Coalesce(part, Value('')), Value(' ')]
+    Billing.objects.update(search_document=Lower(Concat(*separated[:-1])))
+
+
+def create_search_index(apps, schema_editor):
+    # Trigram GIN indexes only exist on PostgreSQL; elsewhere search is a plain LIKE
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX CONCURRENTLY IF NOT EXISTS billing_search_trgm_idx '
+        'ON api_billing USING gin (search_document gin_trgm_ops)'
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX CONCURRENTLY IF EXISTS billing_search_trgm_idx')
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('api', '0023_billing_party_date_idx'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='billing',
+            name='search_document',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(fill_search_documents, migrations.RunPython.noop, atomic=True),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
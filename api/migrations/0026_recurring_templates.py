@@ -0,0 +1,78 @@
+# Generated by Django 6.0 on 2026-10-19 15:35
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0025_dashboard_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecurringBilling',
+            fields=[
+                ('frequency', models.CharField(choices=[('weekly', 'Weekly'), ('monthly', 'Monthly'), ('quarterly', 'Quarterly'), ('yearly', 'Yearly')], default='monthly', max_length=20)),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField(blank=True, null=True)),
+                ('next_run_date', models.DateField()),
+                ('occurrences', models.PositiveIntegerField(default=0)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('payment_method', models.CharField(blank=True, choices=[('Cash', 'Cash'), ('Credit Card', 'Credit Card'), ('Bank Transfer', 'Bank Transfer'), ('UPI', 'UPI')], max_length=20, null=True)),
+                ('invoice_status', models.CharField(choices=[('Paid', 'Paid'), ('Unpaid', 'Unpaid'), ('Pending', 'Pending'), ('Draft', 'Draft')], default='Unpaid', max_length=20)),
+                ('due_days', models.PositiveIntegerField(blank=True, null=True)),
+                ('phone', models.CharField(blank=True, max_length=15, null=True)),
+                ('VAt_number', models.CharField(blank=True, max_length=50, null=True)),
+                ('address', models.TextField(blank=True, null=True)),
+                ('notes', models.TextField(blank=True, null=True)),
+                ('discount', models.DecimalField(decimal_places=2, default=0.0, max_digits=12)),
+                ('tax', models.DecimalField(decimal_places=2, default=0.0, max_digits=12)),
+                ('party', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='recurring_billings', to='api.party')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recurring_billings', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RecurringBillingItem',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('quantity', models.PositiveIntegerField()),
+                ('rate', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('discount_percentage', models.DecimalField(decimal_places=2, default=0.0, max_digits=10)),
+                ('tax_percentage', models.DecimalField(decimal_places=2, default=13.0, max_digits=10)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recurring_billing_items', to='api.product')),
+                ('template', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='api.recurringbilling')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RecurringExpense',
+            fields=[
+                ('frequency', models.CharField(choices=[('weekly', 'Weekly'), ('monthly', 'Monthly'), ('quarterly', 'Quarterly'), ('yearly', 'Yearly')], default='monthly', max_length=20)),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField(blank=True, null=True)),
+                ('next_run_date', models.DateField()),
+                ('occurrences', models.PositiveIntegerField(default=0)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('category', models.CharField(choices=[('Rent', 'Rent'), ('Utilities', 'Utilities'), ('Salary', 'Salary'), ('Inventory', 'Inventory'), ('Transport', 'Transport'), ('Food', 'Food'), ('Office Supplies', 'Office Supplies'), ('Phone', 'Phone'), ('Marketing', 'Marketing'), ('Other', 'Other')], max_length=50)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('description', models.TextField(blank=True, null=True)),
+                ('is_necessary', models.BooleanField(default=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recurring_expenses', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='recurringbilling',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['next_run_date'], name='recurringbilling_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recurringexpense',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['next_run_date'], name='recurringexpense_due_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 6.0 on 2026-10-19 15:37
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0026_recurring_templates'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='billing',
+            name='reminder_sent_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='billing',
+            index=models.Index(fields=['invoice_status', 'due_date'], name='billing_status_due_idx'),
+        ),
+    ]
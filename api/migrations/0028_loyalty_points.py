@@ -0,0 +1,23 @@
+# Generated by Django 6.0 on 2026-10-19 15:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0027_billing_reminders'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='billing',
+            name='loyalty_points_earned',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='billing',
+            name='loyalty_points_redeemed',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
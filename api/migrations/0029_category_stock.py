@@ -0,0 +1,48 @@
+# Generated by Django 6.0 on 2026-10-19 15:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, F, Sum
+
+
+def count_category_stock(apps, schema_editor):
+    """Start the counters from the products that already exist."""
+    CategoryStock = apps.get_model('api', 'CategoryStock')
+    rows = (apps.get_model('api', 'Product').objects
+            .values('user_id', 'category_id')
+            .annotate(products=Count('id'), units=Sum('quantity'),
+                      value=Sum(F('quantity') * F('average_cost'),
+                                output_field=DecimalField(max_digits=16, decimal_places=4)))
+            .order_by())
+    CategoryStock.objects.bulk_create([
+        CategoryStock(user_id=row['user_id'], category_id=row['category_id'], product_count=row['products'],
+                      quantity=row['units'] or 0, stock_value=row['value'] or 0)
+        for row in rows
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0028_loyalty_points'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryStock',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('product_count', models.IntegerField(default=0)),
+                ('quantity', models.BigIntegerField(default=0)),
+                ('stock_value', models.DecimalField(decimal_places=4, default=0, max_digits=16)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_counters', to='api.category')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='category_stock', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'category'), name='unique_category_stock')],
+            },
+        ),
+        migrations.RunPython(count_category_stock, migrations.RunPython.noop),
+    ]
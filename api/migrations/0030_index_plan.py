@@ -0,0 +1,103 @@
+# Generated by Django 6.0 on 2026-10-19 15:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import Upper
+
+# Sign-in and password reset look users up by email, case-insensitively
+USER_EMAIL_INDEX = models.Index(Upper('email'), name='auth_user_email_upper_idx')
+
+
+def create_user_email_index(apps, schema_editor):
+    schema_editor.add_index(apps.get_model(settings.AUTH_USER_MODEL), USER_EMAIL_INDEX)
+
+
+def drop_user_email_index(apps, schema_editor):
+    schema_editor.remove_index(apps.get_model(settings.AUTH_USER_MODEL), USER_EMAIL_INDEX)
+
+
+def clamp_negative_due_amounts(apps, schema_editor):
+    """Overpaid bills owe nothing; clear them before due_amount >= 0 is enforced."""
+    for model in ('Billing', 'PurchaseBill'):
+        apps.get_model('api', model).objects.filter(due_amount__lt=0).update(due_amount=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0029_category_stock'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        # After the last change to auth_user, which rebuilds the table on SQLite
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_user_email_index, drop_user_email_index),
+        migrations.AddIndex(
+            model_name='billing',
+            index=models.Index(fields=['user', 'invoice_status', 'invoice_date'], name='billing_user_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['email'], name='customer_email_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['phone_no'], name='customer_phone_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='forgetpasswordotp',
+            index=models.Index(fields=['user', 'otp_created_at'], name='forgetotp_user_created_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='outboxevent',
+            name='outbox_pending_idx',
+        ),
+        migrations.AddIndex(
+            model_name='outboxevent',
+            index=models.Index(condition=models.Q(('processed_at__isnull', True)), fields=['id', 'available_at'], name='outbox_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='party',
+            index=models.Index(fields=['Category_type', 'is_active'], name='party_type_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['user', 'product_name'], name='product_user_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='supplier',
+            index=models.Index(fields=['name'], name='supplier_name_idx'),
+        ),
+        # The composite indexes above lead with the user, so the plain FK indexes go
+        migrations.AlterField(
+            model_name='billing',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='billings', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='expense',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='expenses', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='forgetpasswordotp',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='forget_password_otps', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='products', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(clamp_negative_due_amounts, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='billing',
+            constraint=models.CheckConstraint(condition=models.Q(('due_amount__gte', 0)), name='billing_due_amount_gte_0'),
+        ),
+        migrations.AddConstraint(
+            model_name='purchasebill',
+            constraint=models.CheckConstraint(condition=models.Q(('due_amount__gte', 0)), name='purchasebill_due_amount_gte_0'),
+        ),
+    ]
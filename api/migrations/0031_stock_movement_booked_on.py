@@ -0,0 +1,37 @@
+# Generated by Django 6.0 on 2026-10-19 15:56
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import TruncDate
+
+
+def book_existing_movements(apps, schema_editor):
+    """Book every movement on the day it happened, or its invoice's date."""
+    StockMovement = apps.get_model('api', 'StockMovement')
+    Billing = apps.get_model('api', 'Billing')
+    StockMovement.objects.update(booked_on=TruncDate('created_at'))
+    StockMovement.objects.filter(billing__invoice_date__isnull=False).update(
+        booked_on=Subquery(Billing.objects.filter(pk=OuterRef('billing_id')).values('invoice_date')[:1]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0030_index_plan'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stockmovement',
+            name='booked_on',
+            field=models.DateField(default=django.utils.timezone.localdate),
+        ),
+        migrations.RunPython(book_existing_movements, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='stockmovement',
+            index=models.Index(fields=['user', 'booked_on'], name='stockmovement_user_booked_idx'),
+        ),
+    ]
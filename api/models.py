@@ -1,6 +1,28 @@
 from decimal import Decimal
 from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.db.models import F
+from django.utils import timezone
+
+
+class OptimisticLockMixin:
+    """Optimistic concurrency control for models with a ``version`` field."""
+
+    def claim_version(self, expected_version=None):
+        """
+        Bump the stored version with ``UPDATE ... WHERE version = n``.
+
+        ``n`` is ``expected_version``, or the version this instance was loaded
+        with. Returns False when another write got there first. Call inside a
+        transaction and save afterwards: the UPDATE keeps the row locked until
+        commit, so no lock is held while the client is editing.
+        """
+        expected = self.version if expected_version is None else expected_version
+        claimed = type(self).objects.filter(pk=self.pk, version=expected).update(version=F('version') + 1)
+        if claimed:
+            self.version = expected + 1
+        return bool(claimed)
 
 class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
@@ -21,20 +43,56 @@ class Category(models.Model):
     def __str__(self):
         return self.name
 
-class Product(models.Model):
+class Product(OptimisticLockMixin, models.Model):
     id = models.AutoField(primary_key=True)  # Explicit primary key
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='products')
+    # Indexed by product_user_name_idx, which leads with the user
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='products', db_index=False)
     product_name = models.CharField(max_length=100)
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='products')
     sku = models.CharField(max_length=50, unique=True, default='')
     product_Img = models.CharField(max_length=255, blank=True, null=True)
     unit_price = models.DecimalField(max_digits=10, decimal_places=2)
     quantity = models.PositiveIntegerField()
+    # Stock at or below this level is reported as low stock
+    reorder_level = models.PositiveIntegerField(default=0)
+    # Weighted-average cost of the units on hand, updated on every purchase
+    average_cost = models.DecimalField(max_digits=12, decimal_places=4, default=0)
     description = models.TextField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    version = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        indexes = [
+            # Product lists and the duplicate-name check on create
+            models.Index(fields=['user', 'product_name'], name='product_user_name_idx'),
+            # Only low-stock rows are indexed, so finding them costs
+            # O(low-stock rows) however large the catalog grows
+            models.Index(fields=['user', 'id'], name='product_low_stock_idx',
+                         condition=models.Q(quantity__lte=models.F('reorder_level'))),
+        ]
 
     def __str__(self):
         return self.product_name
     
+class CategoryStock(models.Model):
+    """A user's products, units and stock value in one category, kept in step with product writes."""
+    id = models.AutoField(primary_key=True)  # Explicit primary key
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='category_stock')
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='stock_counters')
+    product_count = models.IntegerField(default=0)
+    quantity = models.BigIntegerField(default=0)
+    # Units at weighted-average cost
+    stock_value = models.DecimalField(max_digits=16, decimal_places=4, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'category'], name='unique_category_stock'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} / {self.category_id}: {self.product_count} products"
+
+
 class Party(models.Model):
     id=models.AutoField(primary_key=True)  # Explicit primary key
     CATEGORY_TYPE_CHOICES = [
@@ -44,11 +102,15 @@ class Party(models.Model):
     Category_type=models.CharField(max_length=20,choices=CATEGORY_TYPE_CHOICES)
     is_active=models.BooleanField(default=True)
     
-    is_updated_at=models.DateTimeField(auto_now=True)
+    is_updated_at=models.DateTimeField(auto_now=True, db_index=True)
    
    #meta class for ordering and plural name(settings)
     class Meta:
         verbose_name_plural = 'Parties'
+        indexes = [
+            # Party lists are filtered by type
+            models.Index(fields=['Category_type', 'is_active'], name='party_type_active_idx'),
+        ]
        
 
     def __str__(self):
@@ -57,7 +119,7 @@ class Party(models.Model):
         elif hasattr(self, 'Supplier'):
             return f"Supplier: {self.Supplier.name}"
        
-class Customer(models.Model):
+class Customer(OptimisticLockMixin, models.Model):
     id = models.AutoField(primary_key=True)  # Explicit primary key
     party = models.OneToOneField(Party, on_delete=models.CASCADE, related_name='Customer')
     name = models.CharField(max_length=100)
@@ -81,6 +143,14 @@ class Customer(models.Model):
     #additional info
     referred_by = models.CharField(max_length=100, blank=True, null=True)
     notes = models.TextField(blank=True, null=True)
+    version = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        indexes = [
+            # Duplicate checks when a customer is created
+            models.Index(fields=['email'], name='customer_email_idx'),
+            models.Index(fields=['phone_no'], name='customer_phone_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -90,6 +160,12 @@ class Supplier(models.Model):
     party = models.OneToOneField(Party, on_delete=models.CASCADE, related_name='Supplier')
     name = models.CharField(max_length=100)
     code= models.CharField(max_length=50, unique=True)
+
+    class Meta:
+        indexes = [
+            # Duplicate check when a supplier is created
+            models.Index(fields=['name'], name='supplier_name_idx'),
+        ]
    
     def __str__(self):
         return self.name
@@ -130,23 +206,31 @@ class Expense(models.Model):
     ]
     
     id = models.AutoField(primary_key=True)
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='expenses')
+    # Indexed by expense_user_date_idx, which leads with the user
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='expenses', db_index=False)
     category = models.CharField(max_length=50, choices=CATEGORY_CHOICES)
     amount = models.DecimalField(max_digits=12, decimal_places=2)
     description = models.TextField(blank=True, null=True)
     date = models.DateField()
     is_necessary = models.BooleanField(default=True)
-   
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            # Dashboard totals read a user's expenses by date
+            models.Index(fields=['user', 'date'], name='expense_user_date_idx'),
+        ]
 
     def __str__(self):
         return self.user.username
 
-class Billing(models.Model):
+class Billing(OptimisticLockMixin, models.Model):
     id = models.AutoField(primary_key=True)  # Explicit primary key
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='billings')
+    # Indexed by billing_user_date_idx and the invoice number constraint, which lead with the user
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='billings', db_index=False)
     
     # Invoice details
-    invoice_number = models.CharField(max_length=50, unique=True)
+    invoice_number = models.CharField(max_length=50)
     invoice_date = models.DateField(null=True, blank=True)
     due_date = models.DateField(null=True, blank=True)
     payment_choices = [
@@ -178,12 +262,40 @@ class Billing(models.Model):
     discount = models.DecimalField(max_digits=12, decimal_places=2, default=0.00)
     tax = models.DecimalField(max_digits=12, decimal_places=2, default=0.00)
     sub_total = models.DecimalField(max_digits=12, decimal_places=2, default=0.00)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    version = models.PositiveIntegerField(default=1)
+    # Lower-cased number, party name, phone, VAT number and notes; maintained by api.search
+    search_document = models.TextField(blank=True, default='', editable=False)
+    # Last payment reminder emailed for this invoice; see api.tasks.send_payment_reminders
+    reminder_sent_at = models.DateTimeField(null=True, blank=True, editable=False)
+    # Loyalty points the customer earned on this invoice and spent against it; see api.loyalty
+    loyalty_points_earned = models.PositiveIntegerField(default=0)
+    loyalty_points_redeemed = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'invoice_number'], name='unique_invoice_number_per_user'),
+            models.CheckConstraint(condition=models.Q(due_amount__gte=0), name='billing_due_amount_gte_0'),
+        ]
+        indexes = [
+            # Party statements walk a party's invoices in date order
+            models.Index(fields=['party', 'invoice_date'], name='billing_party_date_idx'),
+            # Dashboard totals read a user's invoices by date
+            models.Index(fields=['user', 'invoice_date'], name='billing_user_date_idx'),
+            # Overdue invoices are found by status and due date
+            models.Index(fields=['invoice_status', 'due_date'], name='billing_status_due_idx'),
+            # Invoice lists and search filtered by status and date
+            models.Index(fields=['user', 'invoice_status', 'invoice_date'], name='billing_user_status_date_idx'),
+        ]
 
-    def calculate_totals(self):
-        """Calculate subtotal from all invoice items"""
-        self.subtotal = sum(item.total_price for item in self.items.all())
-        self.total = self.subtotal - self.discount + self.tax_vat
-        self.save()
+    def calculate_totals(self, items=None):
+        """Calculate subtotal, total and due amount from the invoice items"""
+        if items is None:
+            items = self.items.all()
+        self.sub_total = sum((Decimal(str(item.total_price)) for item in items), Decimal('0.00'))
+        self.total_amount = self.sub_total - Decimal(str(self.discount)) + Decimal(str(self.tax))
+        self.due_amount = max(self.total_amount - Decimal(str(self.paid_amount)), Decimal('0.00'))
+        self.save(update_fields=['sub_total', 'total_amount', 'due_amount', 'updated_at'])
 
     def __str__(self):
         return self.user.username
@@ -207,13 +319,338 @@ class BillingItem(models.Model):
     def __str__(self):
         return f"Item {self.id} for Billing {self.billing.id}"
     
+class InvoiceSequence(models.Model):
+    """Per-user, per-year invoice counter. Numbers are taken under a row lock."""
+    id = models.AutoField(primary_key=True)  # Explicit primary key
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='invoice_sequences')
+    year = models.PositiveIntegerField()
+    last_number = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'year'], name='unique_invoice_sequence_per_year'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} {self.year}: {self.last_number}"
+
+class InvoiceNumberBlock(models.Model):
+    """Range of invoice numbers reserved for an offline terminal to use locally."""
+    id = models.AutoField(primary_key=True)  # Explicit primary key
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='invoice_number_blocks')
+    terminal_id = models.CharField(max_length=64)
+    year = models.PositiveIntegerField()
+    first_number = models.PositiveIntegerField()
+    last_number = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'year', 'first_number'], name='invoiceblock_user_year_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.terminal_id}: {self.first_number}-{self.last_number} ({self.year})"
+
 class ForgetPasswordOTP(models.Model):
     id = models.AutoField(primary_key=True)  # Explicit primary key
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='forget_password_otps')
+    # Indexed by forgetotp_user_created_idx, which leads with the user
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='forget_password_otps', db_index=False)
     otp = models.CharField(max_length=6, null=True, blank=True)
     otp_created_at = models.DateTimeField(null=True, blank=True)
     is_verify = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            # The latest OTP of a user is checked on verify and reset
+            models.Index(fields=['user', 'otp_created_at'], name='forgetotp_user_created_idx'),
+        ]
+
     def __str__(self):
         return f"OTP for {self.user.username}"
-        
+
+
+class ChangeLog(models.Model):
+    """Append-only feed of row changes used by offline terminals to sync.
+
+    The id doubles as the sync token: a terminal asks for every change with
+    an id greater than the last one it has seen.
+    """
+    ENTITY_CHOICES = [
+        ('product', 'Product'),
+        ('party', 'Party'),
+        ('expense', 'Expense'),
+        ('billing', 'Billing'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)  # Explicit primary key
+    # Parties are shared between users, so their changes have no owner
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='changes', null=True, blank=True)
+    entity = models.CharField(max_length=20, choices=ENTITY_CHOICES)
+    object_id = models.IntegerField()
+    is_deleted = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'id'], name='changelog_user_id_idx'),
+            models.Index(fields=['entity', 'object_id'], name='changelog_entity_object_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.entity} {self.object_id} ({'deleted' if self.is_deleted else 'changed'})"
+
+
+class OutboxEvent(models.Model):
+    """Event written in the same transaction as the change it describes.
+
+    A Celery relay delivers pending events to the handlers registered in
+    ``api.outbox``, so side effects never run inside the request.
+    """
+    id = models.BigAutoField(primary_key=True)  # Explicit primary key
+    event_type = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+    available_at = models.DateTimeField(default=timezone.now)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True, default='')
+
+    class Meta:
+        indexes = [
+            # Leads with the id so the relay reads pending events in order without a sort
+            models.Index(fields=['id', 'available_at'], name='outbox_pending_idx',
+                         condition=models.Q(processed_at__isnull=True)),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} #{self.id} ({'processed' if self.processed_at else 'pending'})"
+
+
+class ProductSalesDaily(models.Model):
+    """Units sold and revenue per product per invoice day.
+
+    Maintained from billing events by ``api.analytics`` so sales reports
+    never have to scan BillingItem.
+    """
+    id = models.BigAutoField(primary_key=True)  # Explicit primary key
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='product_sales')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='daily_sales')
+    day = models.DateField()
+    quantity = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0.00)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'day'], name='unique_product_sales_day'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'day'], name='productsales_user_day_idx'),
+        ]
+
+    @property
+    def average_rate(self):
+        if not self.quantity:
+            return Decimal('0.00')
+        return (Decimal(self.revenue) / self.quantity).quantize(Decimal('0.01'))
+
+    def __str__(self):
+        return f"{self.product_id} on {self.day}: {self.quantity}"
+
+
+class StockMovement(models.Model):
+    """Append-only ledger of every change to a product's stock.
+
+    ``quantity`` is signed: negative for stock going out. The sum of a
+    product's movements always equals its current quantity.
+    """
+    SALE = 'sale'
+    PURCHASE = 'purchase'
+    ADJUSTMENT = 'adjustment'
+    RETURN = 'return'
+    KIND_CHOICES = [
+        (SALE, 'Sale'),
+        (PURCHASE, 'Purchase'),
+        (ADJUSTMENT, 'Adjustment'),
+        (RETURN, 'Return'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)  # Explicit primary key
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='stock_movements')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_movements')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    quantity = models.IntegerField()
+    # Cost per unit: the purchase price for purchases, else the average cost at the time
+    unit_cost = models.DecimalField(max_digits=12, decimal_places=4, default=0)
+    billing = models.ForeignKey(Billing, on_delete=models.SET_NULL, related_name='stock_movements', null=True, blank=True)
+    # The day the movement is reported on: the invoice date for stock moved by
+    # an invoice, so COGS lands on the same day as the invoice's revenue
+    booked_on = models.DateField(default=timezone.localdate)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['product', 'created_at'], name='stockmovement_product_time_idx'),
+            models.Index(fields=['user', 'created_at'], name='stockmovement_user_time_idx'),
+            models.Index(fields=['user', 'booked_on'], name='stockmovement_user_booked_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.quantity:+d} of {self.product_id}"
+
+
+class StockSnapshot(models.Model):
+    """A product's quantity at the end of a day, taken nightly."""
+    id = models.BigAutoField(primary_key=True)  # Explicit primary key
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_snapshots')
+    day = models.DateField()
+    quantity = models.IntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'day'], name='unique_stock_snapshot_day'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} on {self.day}: {self.quantity}"
+
+
+class PurchaseBill(models.Model):
+    """Stock bought from a supplier. Receiving it adds every line to stock at once."""
+    id = models.AutoField(primary_key=True)  # Explicit primary key
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='purchase_bills')
+    supplier = models.ForeignKey(Supplier, on_delete=models.CASCADE, related_name='purchase_bills')
+    bill_number = models.CharField(max_length=50)
+    bill_date = models.DateField(default=timezone.localdate)
+    due_date = models.DateField(null=True, blank=True)
+    total_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0.00)
+    paid_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0.00)
+    due_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0.00)
+    notes = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'supplier', 'bill_number'], name='unique_purchase_bill_number'),
+            models.CheckConstraint(condition=models.Q(due_amount__gte=0), name='purchasebill_due_amount_gte_0'),
+        ]
+        indexes = [
+            # Open payables only, for the aging report
+            models.Index(fields=['user', 'supplier', 'due_date'], name='purchasebill_open_idx',
+                         condition=models.Q(due_amount__gt=0)),
+        ]
+
+    def __str__(self):
+        return f"{self.bill_number} from {self.supplier_id}"
+
+
+class PurchaseBillItem(models.Model):
+    id = models.AutoField(primary_key=True)  # Explicit primary key
+    purchase_bill = models.ForeignKey(PurchaseBill, on_delete=models.CASCADE, related_name='items')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='purchase_items')
+    quantity = models.PositiveIntegerField()
+    unit_cost = models.DecimalField(max_digits=12, decimal_places=4)
+    total_cost = models.DecimalField(max_digits=14, decimal_places=2)
+
+    def __str__(self):
+        return f"Item {self.id} for purchase bill {self.purchase_bill_id}"
+
+
+class SupplierBalance(models.Model):
+    """What a user owes a supplier, kept in step with their purchase bills."""
+    id = models.AutoField(primary_key=True)  # Explicit primary key
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='supplier_balances')
+    supplier = models.ForeignKey(Supplier, on_delete=models.CASCADE, related_name='balances')
+    payable = models.DecimalField(max_digits=14, decimal_places=2, default=0.00)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'supplier'], name='unique_supplier_balance'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} owes {self.supplier_id}: {self.payable}"
+
+
+class RecurringSchedule(models.Model):
+    """When a recurring template is due; see api.recurring for the generator."""
+    WEEKLY = 'weekly'
+    MONTHLY = 'monthly'
+    QUARTERLY = 'quarterly'
+    YEARLY = 'yearly'
+    FREQUENCY_CHOICES = [
+        (WEEKLY, 'Weekly'),
+        (MONTHLY, 'Monthly'),
+        (QUARTERLY, 'Quarterly'),
+        (YEARLY, 'Yearly'),
+    ]
+
+    frequency = models.CharField(max_length=20, choices=FREQUENCY_CHOICES, default=MONTHLY)
+    start_date = models.DateField()
+    end_date = models.DateField(null=True, blank=True)
+    # Date of the next document; moves forward in the transaction that generates it
+    next_run_date = models.DateField()
+    # Documents generated so far; the next date is counted from start_date so month ends do not drift
+    occurrences = models.PositiveIntegerField(default=0)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        abstract = True
+
+
+class RecurringBilling(RecurringSchedule):
+    id = models.AutoField(primary_key=True)  # Explicit primary key
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='recurring_billings')
+    party = models.ForeignKey(Party, on_delete=models.CASCADE, related_name='recurring_billings', null=True, blank=True)
+    payment_method = models.CharField(max_length=20, choices=Billing.payment_choices, blank=True, null=True)
+    invoice_status = models.CharField(max_length=20, choices=Billing.invoice_choices, default='Unpaid')
+    # Days from the invoice date to its due date
+    due_days = models.PositiveIntegerField(null=True, blank=True)
+    phone = models.CharField(max_length=15, blank=True, null=True)
+    VAt_number = models.CharField(max_length=50, blank=True, null=True)
+    address = models.TextField(blank=True, null=True)
+    notes = models.TextField(blank=True, null=True)
+    discount = models.DecimalField(max_digits=12, decimal_places=2, default=0.00)
+    tax = models.DecimalField(max_digits=12, decimal_places=2, default=0.00)
+
+    class Meta:
+        indexes = [
+            # The generator only ever looks for active templates that are due
+            models.Index(fields=['next_run_date'], name='recurringbilling_due_idx',
+                         condition=models.Q(is_active=True)),
+        ]
+
+    def __str__(self):
+        return f"Recurring billing {self.id} ({self.frequency})"
+
+
+class RecurringBillingItem(models.Model):
+    id = models.AutoField(primary_key=True)  # Explicit primary key
+    template = models.ForeignKey(RecurringBilling, on_delete=models.CASCADE, related_name='items')
+    item = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='recurring_billing_items')
+    quantity = models.PositiveIntegerField()
+    rate = models.DecimalField(max_digits=10, decimal_places=2)
+    discount_percentage = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
+    tax_percentage = models.DecimalField(max_digits=10, decimal_places=2, default=13.00)
+
+    def __str__(self):
+        return f"Item {self.id} for recurring billing {self.template_id}"
+
+
+class RecurringExpense(RecurringSchedule):
+    id = models.AutoField(primary_key=True)  # Explicit primary key
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='recurring_expenses')
+    category = models.CharField(max_length=50, choices=Expense.CATEGORY_CHOICES)
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    description = models.TextField(blank=True, null=True)
+    is_necessary = models.BooleanField(default=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['next_run_date'], name='recurringexpense_due_idx',
+                         condition=models.Q(is_active=True)),
+        ]
+
+    def __str__(self):
+        return f"Recurring {self.category} expense {self.id} ({self.frequency})"
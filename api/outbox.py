@@ -0,0 +1,103 @@
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+# Events claimed per relay transaction
+OUTBOX_BATCH_SIZE = 100
+
+# Batches a single relay run handles before leaving the rest to the next run
+OUTBOX_MAX_BATCHES = 50
+
+# Longest wait between retries of an event whose handler keeps failing
+OUTBOX_MAX_RETRY_DELAY = timedelta(hours=1)
+
+# Processed events are kept this long for debugging, then pruned
+OUTBOX_RETENTION = timedelta(days=7)
+
+_handlers = defaultdict(list)
+
+
+def handles(event_type):
+    """
+    Register the decorated function as a handler for ``event_type``.
+
+    Handlers receive the event payload. Delivery is at-least-once: a handler
+    can see the same event again if a later handler, or the commit, fails,
+    so it must be idempotent.
+    """
+    def decorator(handler):
+        _handlers[event_type].append(handler)
+        return handler
+    return decorator
+
+
+def publish_event(event_type, **payload):
+    """
+    Queue an event for the relay.
+
+    Call inside the transaction that makes the change, so the event is
+    stored if and only if the change commits. Costs a single INSERT.
+    """
+    return OutboxEvent.objects.create(event_type=event_type, payload=payload)
+
+
+def _retry_delay(attempts):
+    return min(timedelta(seconds=2 ** attempts), OUTBOX_MAX_RETRY_DELAY)
+
+
+def relay_batch(batch_size=OUTBOX_BATCH_SIZE):
+    """
+    Deliver one batch of pending events and return how many were claimed.
+
+    Rows are claimed with ``SELECT ... FOR UPDATE SKIP LOCKED`` so several
+    relays can drain the outbox side by side. Each event's handlers run in
+    a savepoint within the same transaction that marks it processed: either
+    both commit or the event stays pending. A failing event is retried later
+    with exponential backoff and does not hold up the rest of the batch.
+    """
+    with transaction.atomic():
+        events = list(
+            OutboxEvent.objects
+            .select_for_update(skip_locked=True)
+            .filter(processed_at__isnull=True, available_at__lte=timezone.now())
+            .order_by('id')[:batch_size]
+        )
+        for event in events:
+            try:
+                with transaction.atomic():
+                    for handler in _handlers[event.event_type]:
+                        handler(event.payload)
+            except Exception as exc:
+                event.attempts += 1
+                event.last_error = repr(exc)
+                event.available_at = timezone.now() + _retry_delay(event.attempts)
+                logger.exception('Outbox event %s (%s) failed, attempt %s',
+                                 event.id, event.event_type, event.attempts)
+            else:
+                event.processed_at = timezone.now()
+        OutboxEvent.objects.bulk_update(events, ['processed_at', 'attempts', 'last_error', 'available_at'])
+    return len(events)
+
+
+def relay_events(batch_size=OUTBOX_BATCH_SIZE, max_batches=OUTBOX_MAX_BATCHES):
+    """Relay batches until the outbox is drained or ``max_batches`` is hit."""
+    relayed = 0
+    for _ in range(max_batches):
+        claimed = relay_batch(batch_size)
+        relayed += claimed
+        if claimed < batch_size:
+            break
+    return relayed
+
+
+def prune_outbox():
+    """Delete events processed more than ``OUTBOX_RETENTION`` ago."""
+    deleted, _ = OutboxEvent.objects.filter(processed_at__lt=timezone.now() - OUTBOX_RETENTION).delete()
+    return deleted
@@ -0,0 +1,114 @@
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db.models import F, Q, Sum
+
+from .inventory import adjust_stock
+from .models import Product, PurchaseBill, PurchaseBillItem, StockMovement, SupplierBalance
+from .serializers import PurchaseLineSerializer
+
+# Lines inserted per statement when receiving a large delivery
+PURCHASE_ITEM_BATCH_SIZE = 500
+
+# Upper bounds, in days past due, of the aging buckets; older bills go in the last one
+AGING_BUCKETS = (30, 60, 90)
+
+CENTS = Decimal('0.01')
+COST_PLACES = Decimal('0.0001')
+
+
+def change_payable(user, supplier_id, amount):
+    """Add ``amount`` (negative for payments) to what ``user`` owes the supplier."""
+    if not amount:
+        return
+    balance, _ = SupplierBalance.objects.get_or_create(user=user, supplier_id=supplier_id)
+    SupplierBalance.objects.filter(pk=balance.pk).update(payable=F('payable') + amount)
+
+
+def receive_purchase(bill, lines_data):
+    """
+    Add the lines of a new purchase bill and receive them into stock.
+
+    The lines are one bulk INSERT and the stock for every product is one
+    UPDATE that also re-averages their cost. The bill totals and the
+    supplier's payable balance follow. Returns a dict of validation errors,
+    or None once received. Must run inside a transaction.
+    """
+    serializer = PurchaseLineSerializer(data=lines_data, many=True)
+    if not serializer.is_valid():
+        return {'items': serializer.errors}
+    lines = serializer.validated_data
+    if not lines:
+        return {'items': ['At least one purchase item is required.']}
+
+    product_ids = {line['product'] for line in lines}
+    owned = set(Product.objects.filter(user=bill.user, id__in=product_ids).values_list('id', flat=True))
+    if product_ids - owned:
+        return {'items': [f"Product(s) not found: {', '.join(map(str, sorted(product_ids - owned)))}"]}
+
+    received = defaultdict(int)
+    cost = defaultdict(Decimal)
+    items = []
+    for line in lines:
+        line_cost = line['quantity'] * line['unit_cost']
+        received[line['product']] += line['quantity']
+        cost[line['product']] += line_cost
+        items.append(PurchaseBillItem(purchase_bill=bill, product_id=line['product'], quantity=line['quantity'],
+                                      unit_cost=line['unit_cost'], total_cost=line_cost.quantize(CENTS)))
+    # Checked before anything is written, so a rejected bill leaves stock and costs alone
+    total = sum((item.total_cost for item in items), Decimal('0.00'))
+    if Decimal(str(bill.paid_amount)) > total:
+        return {'paid_amount': ['Cannot be more than the bill total.']}
+    PurchaseBillItem.objects.bulk_create(items, batch_size=PURCHASE_ITEM_BATCH_SIZE)
+
+    # A product listed on several lines is received once, at its average line cost
+    unit_costs = {product_id: (cost[product_id] / quantity).quantize(COST_PLACES)
+                  for product_id, quantity in received.items()}
+    adjust_stock(bill.user, received, StockMovement.PURCHASE, unit_costs=unit_costs)
+
+    bill.total_amount = total
+    bill.due_amount = bill.total_amount - Decimal(str(bill.paid_amount))
+    bill.save(update_fields=['total_amount', 'due_amount'])
+    change_payable(bill.user, bill.supplier_id, bill.due_amount)
+    return None
+
+
+def record_purchase_payment(bill, paid_amount):
+    """Set the amount paid on ``bill`` and move the supplier balance by the difference."""
+    bill = PurchaseBill.objects.select_for_update().get(pk=bill.pk)
+    previous_due = bill.due_amount
+    bill.paid_amount = paid_amount
+    bill.due_amount = bill.total_amount - paid_amount
+    bill.save(update_fields=['paid_amount', 'due_amount'])
+    change_payable(bill.user, bill.supplier_id, bill.due_amount - previous_due)
+    return bill
+
+
+def payables_aging(user, today):
+    """
+    Open payables per supplier, bucketed by days past due.
+
+    Reads only unpaid bills, which is exactly what ``purchasebill_open_idx``
+    holds, and aggregates them in one query.
+    """
+    buckets = {'current': Sum('due_amount', filter=Q(due_date__isnull=True) | Q(due_date__gte=today))}
+    lower = 1
+    for upper in AGING_BUCKETS:
+        buckets[f'days_{lower}_{upper}'] = Sum('due_amount', filter=Q(
+            due_date__lt=today - timedelta(days=lower - 1), due_date__gte=today - timedelta(days=upper)))
+        lower = upper + 1
+    buckets[f'days_over_{AGING_BUCKETS[-1]}'] = Sum(
+        'due_amount', filter=Q(due_date__lt=today - timedelta(days=AGING_BUCKETS[-1])))
+
+    rows = list(
+        PurchaseBill.objects
+        .filter(user=user, due_amount__gt=0)
+        .values('supplier_id', 'supplier__name')
+        .annotate(total_due=Sum('due_amount'), **buckets)
+        .order_by('supplier__name', 'supplier_id')
+    )
+    for row in rows:
+        for key in ('total_due', *buckets):
+            row[key] = str((row[key] or Decimal('0.00')).quantize(CENTS))
+    return rows
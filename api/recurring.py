@@ -0,0 +1,244 @@
+import logging
+from calendar import monthrange
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+from itertools import groupby
+
+from django.db import transaction
+from django.utils import timezone
+
+from .invoicing import allocate_invoice_numbers, format_invoice_number
+from .inventory import InsufficientStock, adjust_stock, record_billing_movements
+from .loyalty import award_points
+from .models import (Billing, BillingItem, Expense, Product, RecurringBilling, RecurringBillingItem, RecurringExpense,
+                     RecurringSchedule, StockMovement)
+from .outbox import publish_event
+from .search import index_billings
+from .serializers import RecurringBillingLineSerializer
+from .sync import record_changes
+
+logger = logging.getLogger(__name__)
+
+# Templates claimed per generator transaction
+RECURRING_BATCH_SIZE = 500
+
+# Rows per INSERT when writing the generated documents
+RECURRING_INSERT_BATCH_SIZE = 1000
+
+# Periods one template can catch up on per transaction; the rest follow in the next batch
+RECURRING_MAX_CATCH_UP = 12
+
+_MONTHS = {
+    RecurringSchedule.MONTHLY: 1,
+    RecurringSchedule.QUARTERLY: 3,
+    RecurringSchedule.YEARLY: 12,
+}
+
+SCHEDULE_FIELDS = ['next_run_date', 'occurrences', 'is_active']
+
+
+def occurrence_date(start_date, frequency, n):
+    """
+    Date of the ``n``-th document (counting from 0) of a schedule.
+
+    Months are counted from ``start_date`` rather than from the previous
+    run, so a template started on the 31st falls on the last day of shorter
+    months and returns to the 31st afterwards.
+    """
+    if frequency == RecurringSchedule.WEEKLY:
+        return start_date + timedelta(weeks=n)
+    months = start_date.month - 1 + _MONTHS[frequency] * n
+    year, month = start_date.year + months // 12, months % 12 + 1
+    return date(year, month, min(start_date.day, monthrange(year, month)[1]))
+
+
+def take_due_dates(template, today):
+    """
+    Advance ``template`` past every period due by ``today`` and return the
+    dates of those periods, at most ``RECURRING_MAX_CATCH_UP`` at a time.
+
+    Only the instance changes; the caller saves it together with the
+    documents so a period is generated exactly once.
+    """
+    days = []
+    while (template.is_active and template.next_run_date <= today
+           and len(days) < RECURRING_MAX_CATCH_UP):
+        days.append(template.next_run_date)
+        template.occurrences += 1
+        template.next_run_date = occurrence_date(template.start_date, template.frequency, template.occurrences)
+        if template.end_date and template.next_run_date > template.end_date:
+            template.is_active = False
+    return days
+
+
+def set_template_lines(template, items_data):
+    """
+    Replace the lines of a recurring billing template with ``items_data``.
+
+    Returns a dict of validation errors, or None once saved. Must run
+    inside a transaction.
+    """
+    serializer = RecurringBillingLineSerializer(data=items_data, many=True)
+    if not serializer.is_valid():
+        return {'items': serializer.errors}
+    lines = serializer.validated_data
+    if not lines:
+        return {'items': ['At least one billing item is required.']}
+
+    product_ids = {line['item'] for line in lines}
+    owned = set(Product.objects.filter(user=template.user, id__in=product_ids).values_list('id', flat=True))
+    if product_ids - owned:
+        return {'items': [f"Product(s) not found: {', '.join(map(str, sorted(product_ids - owned)))}"]}
+
+    RecurringBillingItem.objects.filter(template=template).delete()
+    RecurringBillingItem.objects.bulk_create([
+        RecurringBillingItem(template=template, item_id=line.pop('item'), **line) for line in lines
+    ])
+    return None
+
+
+def _claim_due(model, today, batch_size, exclude_ids=()):
+    """
+    Lock a batch of due templates. ``SKIP LOCKED`` lets several generators
+    split the work, and a template another one holds is simply not seen.
+    """
+    return list(
+        model.objects
+        .select_for_update(skip_locked=True, of=('self',))
+        .select_related('user')
+        .filter(is_active=True, next_run_date__lte=today)
+        .exclude(id__in=exclude_ids)
+        .order_by('id')[:batch_size]
+    )
+
+
+def generate_expenses(today, batch_size=RECURRING_BATCH_SIZE):
+    """Create every recurring expense due by ``today`` and return how many were made."""
+    generated = 0
+    while True:
+        with transaction.atomic():
+            templates = _claim_due(RecurringExpense, today, batch_size)
+            expenses = [
+                Expense(user_id=template.user_id, category=template.category, amount=template.amount,
+                        description=template.description, is_necessary=template.is_necessary, date=day)
+                for template in templates
+                for day in take_due_dates(template, today)
+            ]
+            Expense.objects.bulk_create(expenses, batch_size=RECURRING_INSERT_BATCH_SIZE)
+            RecurringExpense.objects.bulk_update(templates, SCHEDULE_FIELDS, batch_size=RECURRING_INSERT_BATCH_SIZE)
+            # bulk_create skips post_save, so log the changes for sync here
+            expense_ids = defaultdict(list)
+            for expense in expenses:
+                expense_ids[expense.user_id].append(expense.pk)
+            for user_id, ids in expense_ids.items():
+                record_changes('expense', ids, user_id=user_id)
+        generated += len(expenses)
+        if len(templates) < batch_size:
+            return generated
+
+
+def _create_user_billings(user, runs, lines):
+    """
+    Write one user's generated invoices: numbers, invoices, lines, stock.
+
+    ``runs`` is a list of ``(template, invoice_date)``. Raises
+    InsufficientStock, with nothing written, when the lines need more stock
+    than the user has.
+    """
+    numbers = {}
+    for year, year_runs in groupby(sorted(day.year for _, day in runs)):
+        first, _ = allocate_invoice_numbers(user, year, len(list(year_runs)))
+        numbers[year] = first
+
+    billings = []
+    for template, day in runs:
+        sub_total = sum((line.quantity * line.rate for line in lines[template.id]), Decimal('0.00'))
+        total = sub_total - template.discount + template.tax
+        billings.append(Billing(
+            user=user, party_id=template.party_id, invoice_number=format_invoice_number(day.year, numbers[day.year]),
+            invoice_date=day, due_date=day + timedelta(days=template.due_days) if template.due_days is not None else None,
+            payment_method=template.payment_method, invoice_status=template.invoice_status,
+            phone=template.phone, VAt_number=template.VAt_number, address=template.address, notes=template.notes,
+            discount=template.discount, tax=template.tax, sub_total=sub_total, total_amount=total,
+            due_amount=max(total, Decimal('0.00')),
+        ))
+        numbers[day.year] += 1
+    award_points(billings)
+    Billing.objects.bulk_create(billings, batch_size=RECURRING_INSERT_BATCH_SIZE)
+
+    stock = defaultdict(int)
+    items = []
+    sold = []
+    for billing, (template, _) in zip(billings, runs):
+        billing_stock = defaultdict(int)
+        for line in lines[template.id]:
+            stock[line.item_id] -= line.quantity
+            billing_stock[line.item_id] -= line.quantity
+            items.append(BillingItem(
+                billing=billing, item_id=line.item_id, quantity=line.quantity, rate=line.rate,
+                discount_percentage=line.discount_percentage, tax_percentage=line.tax_percentage,
+                total_price=line.quantity * line.rate))
+        sold.append((billing, billing_stock))
+    BillingItem.objects.bulk_create(items, batch_size=RECURRING_INSERT_BATCH_SIZE)
+    # One stock UPDATE for the whole run, but each invoice's own movements,
+    # booked on its invoice date
+    adjust_stock(user, stock, StockMovement.SALE, record=False)
+    record_billing_movements(user, sold, StockMovement.SALE)
+
+    billing_ids = [billing.pk for billing in billings]
+    record_changes('billing', billing_ids, user_id=user.pk)
+    index_billings(Billing.objects.filter(id__in=billing_ids))
+    publish_event('billing.generated', user_id=user.pk, billing_ids=billing_ids,
+                  invoice_dates=sorted({day for _, day in runs}))
+    return len(billings)
+
+
+def generate_billings(today, batch_size=RECURRING_BATCH_SIZE):
+    """
+    Create every recurring invoice due by ``today`` and return how many were made.
+
+    Each batch of templates is one transaction: per user, one counter
+    update for the invoice numbers, bulk inserts for the invoices and their
+    lines, and one stock UPDATE. A user short of stock has their invoices
+    rolled back and their templates left due, to be tried again on the
+    next run; everyone else's still go out.
+    """
+    generated = 0
+    skipped = set()
+    while True:
+        with transaction.atomic():
+            templates = _claim_due(RecurringBilling, today, batch_size, skipped)
+            lines = defaultdict(list)
+            for line in RecurringBillingItem.objects.filter(template__in=templates):
+                lines[line.template_id].append(line)
+
+            runs_by_user = defaultdict(list)
+            advanced = []
+            for template in templates:
+                before = (template.next_run_date, template.occurrences, template.is_active)
+                days = take_due_dates(template, today)
+                # A template whose products were all deleted has nothing to invoice
+                if lines[template.id]:
+                    runs_by_user[template.user_id].extend((template, day) for day in days)
+                advanced.append((template, before))
+
+            for user_id, runs in runs_by_user.items():
+                try:
+                    with transaction.atomic():
+                        generated += _create_user_billings(runs[0][0].user, runs, lines)
+                except InsufficientStock as exc:
+                    logger.warning('Recurring invoices for user %s not generated: %s', user_id, exc)
+                    for template, before in advanced:
+                        if template.user_id == user_id:
+                            template.next_run_date, template.occurrences, template.is_active = before
+                            skipped.add(template.id)
+            RecurringBilling.objects.bulk_update(templates, SCHEDULE_FIELDS, batch_size=RECURRING_INSERT_BATCH_SIZE)
+        if len(templates) < batch_size:
+            return generated
+
+
+def generate_recurring_documents(today=None):
+    """Generate the invoices and expenses due by ``today``; returns ``(billings, expenses)``."""
+    today = today or timezone.localdate()
+    return generate_billings(today), generate_expenses(today)
@@ -0,0 +1,108 @@
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+logger = logging.getLogger(__name__)
+
+# Set for the duration of a request (or block) whose reads may be served by a replica
+_reads_from_replica = ContextVar('reads_from_replica', default=False)
+
+_health_lock = threading.Lock()
+_replica_checked_at = {}
+_replica_healthy = {}
+
+
+@contextmanager
+def use_replica():
+    """
+    Send reads in this block to a replica, e.g. for reports run from a task.
+
+    Reads inside a transaction on the primary stay on the primary, and
+    writes always go there.
+    """
+    token = _reads_from_replica.set(True)
+    try:
+        yield
+    finally:
+        _reads_from_replica.reset(token)
+
+
+@contextmanager
+def use_primary():
+    """Keep every read in this block on the primary."""
+    token = _reads_from_replica.set(False)
+    try:
+        yield
+    finally:
+        _reads_from_replica.reset(token)
+
+
+def _check_replica(alias):
+    try:
+        with connections[alias].cursor() as cursor:
+            cursor.execute('SELECT 1')
+        return True
+    except Exception:
+        logger.warning('Read replica %s failed its health check; using the primary', alias, exc_info=True)
+        connections[alias].close()
+        return False
+
+
+def healthy_replicas():
+    """
+    Replica aliases that passed their last health check.
+
+    Each replica is checked at most once every
+    ``REPLICA_HEALTH_CHECK_INTERVAL`` seconds per process, so a replica
+    that goes down is skipped within that window and picked up again once
+    it answers.
+    """
+    now = time.monotonic()
+    healthy = []
+    for alias in settings.REPLICA_DATABASES:
+        if now - _replica_checked_at.get(alias, float('-inf')) >= settings.REPLICA_HEALTH_CHECK_INTERVAL:
+            with _health_lock:
+                if now - _replica_checked_at.get(alias, float('-inf')) >= settings.REPLICA_HEALTH_CHECK_INTERVAL:
+                    _replica_healthy[alias] = _check_replica(alias)
+                    _replica_checked_at[alias] = now
+        if _replica_healthy.get(alias):
+            healthy.append(alias)
+    return healthy
+
+
+class ReplicaRouter:
+    """
+    Route reads to a healthy replica while ``use_replica`` is active.
+
+    ``ReplicaRoutingMiddleware`` turns it on for safe requests. Everything
+    else (writes, reads inside a transaction on the primary, and requests
+    pinned after a recent write) uses the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        if not _reads_from_replica.get() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        replicas = healthy_replicas()
+        return random.choice(replicas) if replicas else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        pool = {DEFAULT_DB_ALIAS, *settings.REPLICA_DATABASES}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema through replication
+        if db in settings.REPLICA_DATABASES:
+            return False
+        return None
@@ -0,0 +1,91 @@
+from functools import partial
+
+from django.db import connection, transaction
+from django.db.models import Case, F, IntegerField, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce, Concat, Lower
+
+from .conditional import bump_resource_version
+from .models import Billing, Customer, Supplier
+from .outbox import handles
+
+# Shortest query worth running; shorter terms match almost every invoice
+SEARCH_MIN_LENGTH = 3
+
+# Words of a query beyond this are ignored
+SEARCH_MAX_TERMS = 5
+
+
+def search_document():
+    """
+    Expression for a billing's search document.
+
+    The invoice number, the party's name, the phone, the VAT number and the
+    notes, lower-cased and space-separated. The party name is a subquery
+    rather than a join so the expression can be used in a bulk UPDATE.
+    """
+    party_name = Coalesce(
+        Subquery(Customer.objects.filter(party_id=OuterRef('party_id')).values('name')[:1]),
+        Subquery(Supplier.objects.filter(party_id=OuterRef('party_id')).values('name')[:1]),
+        Value(''),
+    )
+    parts = [F('invoice_number'), party_name, F('phone'), F('VAt_number'), F('notes')]
+    separated = []
+    for part in parts:
+        separated += [Coalesce(part, Value('')), Value(' ')]
+    return Lower(Concat(*separated[:-1]))
+
+
+def index_billings(billings):
+    """Rebuild the search document of every billing in ``billings`` with one UPDATE."""
+    return billings.update(search_document=search_document())
+
+
+@handles('party.updated')
+def reindex_party_billings(payload):
+    # A renamed customer or supplier has to be findable under the new name
+    billings = Billing.objects.filter(party_id=payload['party_id'])
+    index_billings(billings)
+    # The UPDATE skips record_changes, so expire cached search results here
+    for user_id in billings.order_by().values_list('user_id', flat=True).distinct():
+        transaction.on_commit(partial(bump_resource_version, 'billing', user_id))
+
+
+def search_terms(query):
+    return [term for term in query.lower().split() if term][:SEARCH_MAX_TERMS]
+
+
+def search_billings(billings, query):
+    """
+    Billings in ``billings`` whose search document contains every word of
+    ``query``, best matches first.
+
+    Each word is a substring match, so invoice number and phone fragments
+    work as well as names. On PostgreSQL the match is served by the trigram
+    index ``billing_search_trgm_idx`` and ranked by trigram word similarity;
+    elsewhere the same filter runs as a plain LIKE. In both cases an exact
+    invoice number comes first and ties go to the most recent invoice.
+    """
+    terms = search_terms(query)
+    for term in terms:
+        billings = billings.filter(search_document__contains=term)
+
+    exact = Case(When(invoice_number__iexact=query.strip(), then=Value(1)),
+                 default=Value(0), output_field=IntegerField())
+    billings = billings.annotate(exact_match=exact)
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import TrigramWordSimilarity
+        billings = billings.annotate(rank=TrigramWordSimilarity(' '.join(terms), 'search_document'))
+        return billings.order_by('-exact_match', '-rank', F('invoice_date').desc(nulls_last=True), '-id')
+    return billings.order_by('-exact_match', F('invoice_date').desc(nulls_last=True), '-id')
+
+
+def filter_billings(billings, status=None, start=None, end=None):
+    """Narrow ``billings`` to an invoice status and an inclusive date range."""
+    conditions = Q()
+    if status:
+        conditions &= Q(invoice_status=status)
+    if start:
+        conditions &= Q(invoice_date__gte=start)
+    if end:
+        conditions &= Q(invoice_date__lte=end)
+    return billings.filter(conditions)
@@ -1,6 +1,12 @@
+import decimal
+from decimal import Decimal
+
 from django.contrib.auth.models import User
+from django.utils.functional import cached_property
 from rest_framework import serializers
-from .models import Billing, BillingItem, UserProfile, Product, Party, Customer, Supplier, SupplierInfo, Expense
+from rest_framework.settings import api_settings
+from .catalog import get_category
+from .models import Billing, BillingItem, Category, UserProfile, Product, Party, Customer, Supplier, SupplierInfo, Expense, PurchaseBill, PurchaseBillItem, RecurringBilling, RecurringBillingItem, RecurringExpense
 
 class UserProfileSerializer(serializers.ModelSerializer):
     class Meta:
@@ -21,10 +27,34 @@ class UserSerializer(serializers.ModelSerializer):
         UserProfile.objects.create(user=user, **profile_data)
         return user
 
+class CachedCategoryField(serializers.PrimaryKeyRelatedField):
+    """Category by id, resolved from the in-process catalog instead of a query per product."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        category = get_category(pk)
+        if category is None:
+            self.fail('does_not_exist', pk_value=data)
+        return category
+
 class ProductSerializer(serializers.ModelSerializer):
+    category = CachedCategoryField(queryset=Category.objects.all())
+
     class Meta:
         model = Product
-        fields = ['id', 'user', 'product_name', 'category', 'product_Img', 'unit_price', 'quantity', 'description']
+        fields = ['id', 'user', 'product_name', 'category', 'product_Img', 'unit_price', 'quantity', 'reorder_level', 'average_cost', 'description', 'version']
+        read_only_fields = ['version']
+
+    def update(self, instance, validated_data):
+        # average_cost is the opening cost on create; after that only stock
+        # received at a cost moves it (see api.inventory.adjust_stock)
+        validated_data.pop('average_cost', None)
+        return super().update(instance, validated_data)
 
 class PartySerializer(serializers.ModelSerializer):
     class Meta:
@@ -35,6 +65,7 @@ class CustomerSerializer(serializers.ModelSerializer):
     class Meta:
         model = Customer
         fields = "__all__"
+        read_only_fields = ['version', 'loyalty_points']
 
 class SupplierSerializer(serializers.ModelSerializer):
     class Meta:
@@ -54,9 +85,188 @@ class ExpenseSerializer(serializers.ModelSerializer):
 class BillingSerializer(serializers.ModelSerializer):
     class Meta:
         model = Billing
-        fields = "__all__"
+        exclude = ['search_document', 'reminder_sent_at']
+        # The money fields are derived from the lines by Billing.calculate_totals
+        read_only_fields = ['version', 'loyalty_points_earned', 'loyalty_points_redeemed',
+                            'sub_total', 'total_amount', 'due_amount']
+        extra_kwargs = {'paid_amount': {'min_value': 0}}
 
 class BillingItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = BillingItem
-        fields = "__all__"
\ No newline at end of file
+        fields = "__all__"
+        # Always derived from quantity and rate
+        extra_kwargs = {'total_price': {'read_only': True}}
+
+class BillingLineSerializer(serializers.ModelSerializer):
+    """Validates one invoice line without a query per line; products are checked in bulk."""
+    id = serializers.IntegerField(required=False)
+    item = serializers.IntegerField()
+
+    class Meta:
+        model = BillingItem
+        fields = ['id', 'item', 'quantity', 'rate', 'discount_percentage', 'tax_percentage']
+
+class PurchaseBillSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = PurchaseBill
+        fields = "__all__"
+        read_only_fields = ['total_amount', 'due_amount', 'created_at']
+        extra_kwargs = {'paid_amount': {'min_value': 0}}
+
+    def validate_paid_amount(self, value):
+        # A new bill has no total until its lines are received; see api.purchasing.receive_purchase
+        if self.instance is not None and value > self.instance.total_amount:
+            raise serializers.ValidationError('Cannot be more than the bill total.')
+        return value
+
+class PurchaseBillItemSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = PurchaseBillItem
+        fields = "__all__"
+
+class PurchaseLineSerializer(serializers.ModelSerializer):
+    """Validates one purchase line without a query per line; products are checked in bulk."""
+    product = serializers.IntegerField()
+
+    class Meta:
+        model = PurchaseBillItem
+        fields = ['product', 'quantity', 'unit_cost']
+        extra_kwargs = {'quantity': {'min_value': 1}, 'unit_cost': {'min_value': 0}}
+
+# Schedules cannot be moved once documents are being generated from them;
+# replace the template instead
+RECURRING_READ_ONLY_FIELDS = ['next_run_date', 'occurrences', 'created_at']
+RECURRING_FIXED_FIELDS = ('frequency', 'start_date')
+
+class RecurringBillingSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = RecurringBilling
+        fields = "__all__"
+        read_only_fields = RECURRING_READ_ONLY_FIELDS
+
+class RecurringBillingItemSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = RecurringBillingItem
+        fields = "__all__"
+
+class RecurringBillingLineSerializer(serializers.ModelSerializer):
+    """Validates one template line without a query per line; products are checked in bulk."""
+    item = serializers.IntegerField()
+
+    class Meta:
+        model = RecurringBillingItem
+        fields = ['item', 'quantity', 'rate', 'discount_percentage', 'tax_percentage']
+
+class RecurringExpenseSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = RecurringExpense
+        fields = "__all__"
+        read_only_fields = RECURRING_READ_ONLY_FIELDS
+
+class FlatReadSerializer:
+    """
+    Read-only fast path for list endpoints.
+
+    Produces the same rows as ``serializer_class(queryset, many=True).data``
+    but works on plain ``.values_list()`` tuples. The field order, database
+    columns and per-field converters are worked out once from the serializer,
+    so rendering a row is a single pass over precompiled converters instead
+    of a full ModelSerializer ``to_representation`` per instance.
+    """
+
+    def __init__(self, serializer_class, fields=None):
+        self.serializer_class = serializer_class
+        self.requested = fields
+        self._subsets = {}
+
+    @cached_property
+    def _compiled(self):
+        model = self.serializer_class.Meta.model
+        names, columns, converters = [], [], []
+        for name, field in self.serializer_class().fields.items():
+            if field.write_only or (self.requested is not None and name not in self.requested):
+                continue
+            names.append(name)
+            columns.append(model._meta.get_field(field.source).attname)
+            converters.append(_representation_converter(field))
+        return tuple(names), tuple(columns), tuple(converters)
+
+    @property
+    def fields(self):
+        return self._compiled[0]
+
+    @property
+    def columns(self):
+        return self._compiled[1]
+
+    def only(self, fields):
+        """
+        Return a serializer restricted to ``fields`` (a sparse fieldset).
+
+        The primary key is always kept so rows can still be addressed and
+        expanded. Unknown names raise a ValidationError.
+        """
+        fields = frozenset(field for field in fields if field) | {'id'}
+        if fields not in self._subsets:
+            unknown = fields.difference(self.fields)
+            if unknown:
+                raise serializers.ValidationError(
+                    {'fields': f"Unknown field(s): {', '.join(sorted(unknown))}"})
+            self._subsets[fields] = FlatReadSerializer(self.serializer_class, fields)
+        return self._subsets[fields]
+
+    def values(self, queryset):
+        """Narrow ``queryset`` down to exactly the columns this serializer reads."""
+        return queryset.values_list(*self.columns)
+
+    def to_representation(self, rows):
+        names, _, converters = self._compiled
+        fields = tuple(zip(names, converters))
+        return [
+            {name: value if value is None or convert is None else convert(value)
+             for (name, convert), value in zip(fields, row)}
+            for row in rows
+        ]
+
+
+def _representation_converter(field):
+    """
+    Return a callable mirroring ``field.to_representation`` for raw column
+    values, or None when the database value can be emitted unchanged.
+    """
+    if isinstance(field, serializers.DecimalField):
+        if not getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING) \
+                or field.normalize_output or field.localize:
+            return field.to_representation
+        if field.decimal_places is None:
+            return lambda value: f'{value:f}'
+        exponent = Decimal('.1') ** field.decimal_places
+        context = decimal.getcontext().copy()
+        if field.max_digits is not None:
+            context.prec = field.max_digits
+        rounding = field.rounding
+        return lambda value: f'{value.quantize(exponent, rounding=rounding, context=context):f}'
+    if isinstance(field, (serializers.DateTimeField, serializers.DateField, serializers.TimeField)):
+        return field.to_representation
+    if isinstance(field, serializers.ChoiceField) and not isinstance(field, serializers.MultipleChoiceField):
+        lookup = field.choice_strings_to_values
+        return lambda value: lookup.get(str(value), value)
+    if isinstance(field, (serializers.CharField, serializers.IntegerField, serializers.BooleanField,
+                          serializers.PrimaryKeyRelatedField)):
+        return None
+    return field.to_representation
+
+
+ProductReadSerializer = FlatReadSerializer(ProductSerializer)
+PartyReadSerializer = FlatReadSerializer(PartySerializer)
+CustomerReadSerializer = FlatReadSerializer(CustomerSerializer)
+SupplierReadSerializer = FlatReadSerializer(SupplierSerializer)
+ExpenseReadSerializer = FlatReadSerializer(ExpenseSerializer)
+BillingReadSerializer = FlatReadSerializer(BillingSerializer)
+BillingItemReadSerializer = FlatReadSerializer(BillingItemSerializer)
+PurchaseBillReadSerializer = FlatReadSerializer(PurchaseBillSerializer)
+PurchaseBillItemReadSerializer = FlatReadSerializer(PurchaseBillItemSerializer)
+RecurringBillingReadSerializer = FlatReadSerializer(RecurringBillingSerializer)
+RecurringBillingItemReadSerializer = FlatReadSerializer(RecurringBillingItemSerializer)
+RecurringExpenseReadSerializer = FlatReadSerializer(RecurringExpenseSerializer)
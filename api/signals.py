@@ -0,0 +1,69 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .catalog import invalidate_categories
+from .conditional import bump_resource_version
+from .models import Billing, BillingItem, Category, Customer, Expense, Party, Product, Supplier
+from .sync import record_changes
+
+
+def _deleted_with(origin, model):
+    """True when a cascade started from deleting ``model`` rows."""
+    if isinstance(origin, QuerySet):
+        return origin.model is model
+    return isinstance(origin, model)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Expense)
+@receiver(post_save, sender=Billing)
+def record_owned_change(sender, instance, **kwargs):
+    record_changes(sender._meta.model_name, [instance.pk], user_id=instance.user_id)
+
+
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Expense)
+@receiver(post_delete, sender=Billing)
+def record_owned_delete(sender, instance, **kwargs):
+    record_changes(sender._meta.model_name, [instance.pk], user_id=instance.user_id, deleted=True)
+
+
+@receiver(post_save, sender=BillingItem)
+@receiver(post_delete, sender=BillingItem)
+def record_billing_item_change(sender, instance, origin=None, **kwargs):
+    # Items removed along with their invoice are covered by the invoice's own
+    # tombstone, and bulk item deletes are recorded by whoever issued them.
+    if _deleted_with(origin, Billing) or isinstance(origin, QuerySet):
+        return
+    record_changes('billing', [instance.billing_id], user_id=instance.billing.user_id)
+
+
+@receiver(post_save, sender=Party)
+def record_party_change(sender, instance, **kwargs):
+    record_changes('party', [instance.pk])
+
+
+@receiver(post_delete, sender=Party)
+def record_party_delete(sender, instance, **kwargs):
+    record_changes('party', [instance.pk], deleted=True)
+
+
+@receiver(post_save, sender=Customer)
+@receiver(post_save, sender=Supplier)
+@receiver(post_delete, sender=Customer)
+@receiver(post_delete, sender=Supplier)
+def record_party_detail_change(sender, instance, origin=None, **kwargs):
+    if _deleted_with(origin, Party):
+        return
+    record_changes('party', [instance.party_id])
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def broadcast_category_change(sender, instance, **kwargs):
+    transaction.on_commit(invalidate_categories)
+    transaction.on_commit(partial(bump_resource_version, 'category'))
@@ -0,0 +1,75 @@
+from datetime import timedelta
+from functools import partial
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from .conditional import bump_resource_version
+from .models import ChangeLog
+
+# Changes younger than this are held back from sync pages. Ids are handed out
+# when a row is inserted, not when its transaction commits, so a slow writer
+# can still commit an id lower than one a terminal has already seen.
+SYNC_SETTLE_TIME = timedelta(seconds=5)
+
+
+def record_changes(entity, object_ids, user_id=None, deleted=False):
+    """
+    Append one ChangeLog row per object id.
+
+    Call this inside the same transaction as the write it describes so the
+    change and the row commit (or roll back) together. ``user_id`` is None
+    for shared rows such as parties. Once the transaction commits, cached
+    ETags for the entity are invalidated and, for entities the dashboard
+    shows, a dashboard refresh is queued.
+    """
+    # api.dashboard reaches this module through api.inventory
+    from .dashboard import DASHBOARD_ENTITIES, schedule_dashboard_refresh
+
+    ChangeLog.objects.bulk_create([
+        ChangeLog(user_id=user_id, entity=entity, object_id=object_id, is_deleted=deleted)
+        for object_id in object_ids
+    ])
+    transaction.on_commit(partial(bump_resource_version, entity, user_id))
+    if user_id is not None and entity in DASHBOARD_ENTITIES:
+        transaction.on_commit(partial(schedule_dashboard_refresh, user_id))
+
+
+def changes_since(user, since, limit):
+    """
+    Return ``(changed, deleted, token, has_more)`` for up to ``limit`` log
+    entries after ``since``.
+
+    ``changed`` and ``deleted`` map each entity to a list of object ids. Only
+    the latest entry per object counts, so a product edited twice and then
+    deleted appears once, as deleted. ``token`` is the id to send as the next
+    ``since``.
+    """
+    entries = list(
+        ChangeLog.objects
+        .filter(Q(user=user) | Q(user__isnull=True), id__gt=since,
+                created_at__lte=timezone.now() - SYNC_SETTLE_TIME)
+        .order_by('id')
+        .values_list('id', 'entity', 'object_id', 'is_deleted')[:limit]
+    )
+
+    latest = {}
+    for _, entity, object_id, is_deleted in entries:
+        latest[entity, object_id] = is_deleted
+
+    changed = {entity: [] for entity, _ in ChangeLog.ENTITY_CHOICES}
+    deleted = {entity: [] for entity, _ in ChangeLog.ENTITY_CHOICES}
+    for (entity, object_id), is_deleted in latest.items():
+        (deleted if is_deleted else changed)[entity].append(object_id)
+
+    token = entries[-1][0] if entries else since
+    return changed, deleted, token, len(entries) == limit
+
+
+def prune_change_log():
+    """Delete log entries superseded by a newer entry for the same object."""
+    newer = ChangeLog.objects.filter(
+        entity=OuterRef('entity'), object_id=OuterRef('object_id'), id__gt=OuterRef('id'))
+    deleted, _ = ChangeLog.objects.filter(Exists(newer)).delete()
+    return deleted
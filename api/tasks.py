@@ -1,12 +1,24 @@
 from celery import shared_task
-from django.core.mail import send_mail
+from django.core.mail import EmailMessage, get_connection, send_mail
 from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+from datetime import timedelta
+from itertools import groupby
 import logging
 
+from .dashboard import clear_refresh_pending, refresh_dashboard
+from .inventory import low_stock_products, take_stock_snapshots
+from .models import Billing
+from .outbox import prune_outbox, relay_events
+from .recurring import generate_recurring_documents
+from .sync import prune_change_log
+
 logger = logging.getLogger(__name__)
 
 
-@shared_task
+@shared_task(ignore_result=True)
 def send_otp_email(email, otp):
     try:
         subject = 'Your OTP Code'
@@ -20,3 +32,189 @@ def send_otp_email(email, otp):
     except Exception as e:
         logger.error(f"Failed to send OTP email to {email}: {str(e)}")
         return False
+
+
+@shared_task(ignore_result=True)
+def prune_sync_change_log():
+    deleted = prune_change_log()
+    logger.info(f"Pruned {deleted} superseded change log entries")
+    return deleted
+
+
+@shared_task(ignore_result=True)
+def relay_outbox():
+    relayed = relay_events()
+    if relayed:
+        logger.info(f"Relayed {relayed} outbox events")
+    return relayed
+
+
+@shared_task(ignore_result=True)
+def prune_outbox_events():
+    deleted = prune_outbox()
+    logger.info(f"Pruned {deleted} processed outbox events")
+    return deleted
+
+
+# Low-stock rows fetched per round trip while building digests
+LOW_STOCK_BATCH_SIZE = 1000
+
+# Digests handed to the SMTP connection at a time
+DIGEST_SEND_BATCH_SIZE = 100
+
+
+def _low_stock_digest(email, products):
+    lines = [f"- {name}: {quantity} left (reorder at {reorder_level})"
+             for name, quantity, reorder_level in products]
+    return EmailMessage(
+        subject=f'{len(lines)} product(s) running low on stock',
+        body='These products are at or below their reorder level:\n\n' + '\n'.join(lines),
+        from_email=settings.EMAIL_HOST_USER,
+        to=[email],
+    )
+
+
+@shared_task(ignore_result=True)
+def send_low_stock_digests():
+    """
+    Email each user one digest of their low-stock products.
+
+    Low-stock rows are streamed from the partial index in user order, so
+    only one user's products are held at a time, and the digests go out in
+    batches over a single SMTP connection.
+    """
+    rows = (low_stock_products()
+            .filter(user__email__gt='')
+            .order_by('user_id', 'id')
+            .values_list('user_id', 'user__email', 'product_name', 'quantity', 'reorder_level')
+            .iterator(chunk_size=LOW_STOCK_BATCH_SIZE))
+
+    sent = 0
+    with get_connection() as connection:
+        messages = []
+        for (_, email), products in groupby(rows, key=lambda row: row[:2]):
+            messages.append(_low_stock_digest(email, [row[2:] for row in products]))
+            if len(messages) >= DIGEST_SEND_BATCH_SIZE:
+                sent += connection.send_messages(messages) or 0
+                messages = []
+        if messages:
+            sent += connection.send_messages(messages) or 0
+    logger.info(f"Sent {sent} low stock digests")
+    return sent
+
+
+# Invoices in these states are chased once they are past due
+REMINDER_STATUSES = ('Unpaid', 'Pending')
+
+# An invoice is not reminded about again until this long after the last reminder
+REMINDER_INTERVAL = timedelta(days=7)
+
+# Reminder digests sent per run; the rest follow after REMINDER_BATCH_DELAY
+REMINDER_BATCH_SIZE = 100
+REMINDER_BATCH_DELAY = timedelta(minutes=1)
+
+# Overdue invoice rows fetched per round trip while building reminders
+REMINDER_FETCH_SIZE = 1000
+
+# Held while a run is sending so overlapping runs cannot send the same digest twice
+REMINDER_LOCK_KEY = 'payment-reminders-running'
+REMINDER_LOCK_TIMEOUT = timedelta(minutes=10)
+
+
+def overdue_billings(today):
+    """
+    Overdue invoices due a reminder, served by ``billing_status_due_idx``.
+
+    Only invoices of customers with an email address are returned, since
+    nobody else can be reminded.
+    """
+    return (Billing.objects
+            .filter(invoice_status__in=REMINDER_STATUSES, due_date__lt=today, due_amount__gt=0,
+                    party__Customer__email__gt='')
+            .filter(Q(reminder_sent_at__isnull=True) | Q(reminder_sent_at__lt=timezone.now() - REMINDER_INTERVAL)))
+
+
+def _payment_reminder(shop, customer, email, invoices, today):
+    lines = [f"- {number} dated {invoice_date or '-'}, due {due_date} ({(today - due_date).days} days ago): {due_amount}"
+             for _, number, invoice_date, due_date, due_amount in invoices]
+    total = sum(invoice[4] for invoice in invoices)
+    return EmailMessage(
+        subject=f'Payment reminder from {shop}: {len(lines)} overdue invoice(s)',
+        body=(f'Dear {customer},\n\nThe following invoice(s) from {shop} are past due:\n\n'
+              + '\n'.join(lines) + f'\n\nTotal due: {total}\n'),
+        from_email=settings.EMAIL_HOST_USER,
+        to=[email],
+    )
+
+
+@shared_task(ignore_result=True)
+def send_payment_reminders():
+    """
+    Email each customer one digest of their overdue invoices per shop.
+
+    Runs in batches of ``REMINDER_BATCH_SIZE`` digests over one SMTP
+    connection and queues itself again after ``REMINDER_BATCH_DELAY`` while
+    any are left, which keeps the send rate under the mail provider's limit.
+    Invoices are stamped as reminded right after their digest goes out, so
+    a rerun, or the next batch, never repeats one.
+    """
+    if not cache.add(REMINDER_LOCK_KEY, 1, REMINDER_LOCK_TIMEOUT.total_seconds()):
+        logger.info("Payment reminders are already being sent")
+        return 0
+
+    today = timezone.localdate()
+    try:
+        rows = (overdue_billings(today)
+                .order_by('user_id', 'party_id', 'due_date', 'id')
+                .values_list('user_id', 'party_id', 'user__profile__business_name', 'user__username',
+                             'party__Customer__name', 'party__Customer__email',
+                             'id', 'invoice_number', 'invoice_date', 'due_date', 'due_amount')
+                .iterator(chunk_size=REMINDER_FETCH_SIZE))
+
+        sent, reminded, more = 0, [], False
+        with get_connection() as connection:
+            for (_, _, business_name, username, customer, email), invoices in groupby(rows, key=lambda row: row[:6]):
+                if sent >= REMINDER_BATCH_SIZE:
+                    more = True
+                    break
+                invoices = [row[6:] for row in invoices]
+                message = _payment_reminder(business_name or username, customer, email, invoices, today)
+                try:
+                    connection.send_messages([message])
+                except Exception:
+                    logger.exception(f"Could not send a payment reminder to {email}")
+                    continue
+                sent += 1
+                # Stamped before the next digest, so a crash part-way through
+                # the batch cannot send these again
+                invoice_ids = [invoice[0] for invoice in invoices]
+                Billing.objects.filter(id__in=invoice_ids).update(reminder_sent_at=timezone.now())
+                reminded += invoice_ids
+    finally:
+        cache.delete(REMINDER_LOCK_KEY)
+
+    logger.info(f"Sent {sent} payment reminders covering {len(reminded)} invoices")
+    if more:
+        send_payment_reminders.apply_async(countdown=REMINDER_BATCH_DELAY.total_seconds())
+    return sent
+
+
+@shared_task(ignore_result=True)
+def snapshot_stock():
+    day = timezone.localdate() - timedelta(days=1)
+    taken = take_stock_snapshots(day)
+    logger.info(f"Took {taken} stock snapshots for {day}")
+    return taken
+
+
+@shared_task(ignore_result=True)
+def refresh_user_dashboard(user_id):
+    clear_refresh_pending(user_id)
+    refresh_dashboard(user_id)
+
+
+@shared_task(ignore_result=True)
+def generate_recurring():
+    billings, expenses = generate_recurring_documents()
+    logger.info(f"Generated {billings} recurring invoices and {expenses} recurring expenses")
+    return billings, expenses
@@ -0,0 +1,69 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api.models import Billing, Category, Product, ProductSalesDaily
+from api.outbox import publish_event, relay_events
+
+
+class SalesRollupTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('shop', 'shop@example.com', 'password')
+        self.client.force_authenticate(self.user)
+        category = Category.objects.create(name='Grocery', slug='grocery')
+        self.rice = Product.objects.create(user=self.user, product_name='Rice', category=category, sku='RICE',
+                                           unit_price=Decimal('100.00'), quantity=50)
+        self.oil = Product.objects.create(user=self.user, product_name='Oil', category=category, sku='OIL',
+                                          unit_price=Decimal('300.00'), quantity=50)
+        self.today = timezone.localdate()
+
+    def sell(self, **invoice):
+        response = self.client.post('/api/billing/', {
+            'items': [{'item': self.rice.id, 'quantity': 1, 'rate': '100.00'},
+                      {'item': self.oil.id, 'quantity': 1, 'rate': '300.00'}],
+            **invoice,
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        relay_events()
+        return Billing.objects.get(pk=response.data['billing']['id'])
+
+    def top_products(self):
+        response = self.client.get('/api/analytics/top-products/', {'days': 7, 'by': 'revenue'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return {row['product_name']: (row['quantity_sold'], row['revenue']) for row in response.data['results']}
+
+    def test_revenue_adds_up_to_the_invoice_total(self):
+        # 400 of lines, 40 off and 52 of tax: 412, spread over the lines by their share
+        billing = self.sell(discount='40.00', tax='52.00')
+        self.assertEqual(billing.total_amount, Decimal('412.00'))
+
+        self.assertEqual(self.top_products(), {'Oil': (1, '309.00'), 'Rice': (1, '103.00')})
+        response = self.client.get('/api/analytics/cogs/', {'from': self.today, 'to': self.today})
+        self.assertEqual(response.data['revenue'], '412.00')
+
+    def test_replayed_and_edited_invoices_are_recomputed_not_added(self):
+        billing = self.sell()
+        # The outbox may deliver an event again
+        publish_event('billing.updated', billing_id=billing.id, user_id=self.user.id,
+                      invoice_date=billing.invoice_date.isoformat(), previous_invoice_date=None)
+        relay_events()
+        self.assertEqual(self.top_products(), {'Oil': (1, '300.00'), 'Rice': (1, '100.00')})
+
+        response = self.client.put(f'/api/billing/?id={billing.id}', {'discount': '100.00'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        relay_events()
+        self.assertEqual(self.top_products(), {'Oil': (1, '225.00'), 'Rice': (1, '75.00')})
+
+    def test_moved_and_deleted_invoices_leave_their_day(self):
+        billing = self.sell()
+        yesterday = self.today - timezone.timedelta(days=1)
+        self.client.put(f'/api/billing/?id={billing.id}', {'invoice_date': yesterday.isoformat()}, format='json')
+        relay_events()
+        self.assertEqual(set(ProductSalesDaily.objects.values_list('day', flat=True)), {yesterday})
+
+        self.client.delete(f'/api/billing/?id={billing.id}')
+        relay_events()
+        self.assertFalse(ProductSalesDaily.objects.exists())
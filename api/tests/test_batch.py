@@ -0,0 +1,73 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api.models import Billing, Category, Expense, Product
+
+
+class BatchTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('shop', 'shop@example.com', 'password')
+        self.client.force_authenticate(self.user)
+        category = Category.objects.create(name='Grocery', slug='grocery')
+        self.product = Product.objects.create(user=self.user, product_name='Rice', category=category,
+                                              unit_price=Decimal('10.00'), quantity=3)
+
+    def expense(self, amount='500.00'):
+        return {'method': 'POST', 'resource': 'expenses',
+                'body': {'category': 'Rent', 'amount': amount, 'date': '2026-10-01'}}
+
+    def oversold_billing(self):
+        # Writes the invoice before its stock is found short, so only a
+        # savepoint keeps that invoice out
+        return {'method': 'POST', 'resource': 'billing',
+                'body': {'items': [{'item': self.product.id, 'quantity': 5, 'rate': '10.00'}]}}
+
+    def batch(self, operations, **options):
+        response = self.client.post('/api/batch/', {'operations': operations, **options}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_failed_operation_is_rolled_back_on_its_own(self):
+        data = self.batch([self.expense(), self.oversold_billing(), self.expense('not a number'),
+                           self.expense('75.00')])
+
+        self.assertTrue(data['committed'])
+        self.assertEqual([result['status'] for result in data['results']], [201, 400, 400, 201])
+        self.assertIn('amount', data['results'][2]['body'])
+        self.assertEqual(sorted(Expense.objects.values_list('amount', flat=True)),
+                         [Decimal('75.00'), Decimal('500.00')])
+        self.assertFalse(Billing.objects.exists())
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 3)
+
+    def test_atomic_batch_is_rolled_back_by_the_first_failure(self):
+        data = self.batch([self.expense(), self.oversold_billing(), self.expense('75.00')], atomic=True)
+
+        self.assertFalse(data['committed'])
+        self.assertEqual([result['status'] for result in data['results']], [201, 400, 424])
+        self.assertFalse(Expense.objects.exists())
+        self.assertFalse(Billing.objects.exists())
+
+    def test_atomic_batch_commits_when_every_operation_succeeds(self):
+        data = self.batch([self.expense(), {
+            'method': 'PUT', 'resource': 'products', 'id': self.product.id, 'body': {'unit_price': '12.00'},
+        }], atomic=True)
+
+        self.assertTrue(data['committed'])
+        self.assertEqual([result['status'] for result in data['results']], [201, 200])
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.unit_price, Decimal('12.00'))
+
+    def test_unsupported_operations_are_reported_per_operation(self):
+        data = self.batch([{'method': 'GET', 'resource': 'expenses'}, {'method': 'POST', 'resource': 'users'},
+                           'not an object', self.expense()])
+
+        self.assertEqual([result['status'] for result in data['results']], [400, 400, 400, 201])
+        self.assertEqual(Expense.objects.count(), 1)
+
+    def test_empty_batch_is_rejected(self):
+        response = self.client.post('/api/batch/', {'operations': []}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,39 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api.models import Billing, Category, Product
+
+
+class BillingTotalsTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('shop', 'shop@example.com', 'password')
+        self.client.force_authenticate(self.user)
+        category = Category.objects.create(name='Grocery', slug='grocery')
+        self.product = Product.objects.create(user=self.user, product_name='Rice', category=category,
+                                              unit_price=Decimal('10.00'), quantity=10)
+
+    def create_billing(self, **data):
+        return self.client.post('/api/billing/', {
+            'items': [{'item': self.product.id, 'quantity': 2, 'rate': '10.00'}], **data,
+        }, format='json')
+
+    def test_client_cannot_set_the_derived_totals(self):
+        response = self.create_billing(due_amount='-50.00', total_amount='1.00', sub_total='1.00')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        billing = Billing.objects.get(user=self.user)
+        self.assertEqual((billing.sub_total, billing.total_amount, billing.due_amount),
+                         (Decimal('20.00'), Decimal('20.00'), Decimal('20.00')))
+
+        response = self.client.put(f'/api/billing/?id={billing.id}', {'due_amount': '-5.00'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        billing.refresh_from_db()
+        self.assertEqual(billing.due_amount, Decimal('20.00'))
+
+    def test_negative_paid_amount_is_rejected(self):
+        response = self.create_billing(paid_amount='-1.00')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('paid_amount', response.data)
+        self.assertFalse(Billing.objects.exists())
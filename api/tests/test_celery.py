@@ -0,0 +1,65 @@
+import time
+from types import SimpleNamespace
+
+from django.test import SimpleTestCase
+
+from api import tasks
+from backend.celery import app, record_queue_latency, record_task_runtime, stamp_published_at
+
+
+class TaskRoutingTests(SimpleTestCase):
+    def route(self, name):
+        return app.amqp.router.route({}, name)
+
+    def test_tasks_go_to_their_queues(self):
+        self.assertEqual(self.route('api.tasks.send_otp_email')['queue'].name, 'auth')
+        self.assertEqual(self.route('api.tasks.send_low_stock_digests')['queue'].name, 'email')
+        self.assertEqual(self.route('api.tasks.generate_recurring')['queue'].name, 'reports')
+        self.assertEqual(self.route('api.tasks.prune_outbox_events')['queue'].name, 'maintenance')
+        self.assertEqual(self.route('api.tasks.unrouted')['queue'].name, 'default')
+
+    def test_otps_jump_the_queue(self):
+        self.assertEqual(self.route('api.tasks.send_otp_email')['priority'], 0)
+        self.assertEqual(self.route('api.tasks.prune_sync_change_log')['priority'], 9)
+
+    def test_only_rerunnable_tasks_ack_late(self):
+        self.assertTrue(tasks.relay_outbox.acks_late)
+        self.assertTrue(tasks.relay_outbox.reject_on_worker_lost)
+        self.assertTrue(tasks.generate_recurring.acks_late)
+        self.assertFalse(tasks.send_otp_email.acks_late)
+        self.assertFalse(tasks.send_low_stock_digests.acks_late)
+
+
+class QueueMetricsTests(SimpleTestCase):
+    def test_published_at_is_stamped_once(self):
+        headers = {}
+        stamp_published_at(headers=headers)
+        self.assertAlmostEqual(headers['published_at'], time.time(), delta=5)
+
+        headers = {'published_at': 1.0}
+        stamp_published_at(headers=headers)
+        self.assertEqual(headers['published_at'], 1.0)
+
+    def test_latency_and_runtime_are_logged(self):
+        request = SimpleNamespace(published_at=time.time() - 2, delivery_info={'routing_key': 'auth'})
+        task = SimpleNamespace(name='api.tasks.send_otp_email', request=request)
+
+        with self.assertLogs('celery.metrics', 'INFO') as logs:
+            record_queue_latency(task=task)
+            record_task_runtime(task=task, state='SUCCESS')
+
+        latency, runtime = logs.records
+        self.assertIn('task=api.tasks.send_otp_email queue=auth latency_ms=', latency.getMessage())
+        self.assertGreaterEqual(float(latency.getMessage().rsplit('=', 1)[1]), 2000)
+        self.assertIn('task=api.tasks.send_otp_email state=SUCCESS runtime_ms=', runtime.getMessage())
+
+    def test_unstamped_messages_log_runtime_only(self):
+        task = SimpleNamespace(name='api.tasks.relay_outbox',
+                               request=SimpleNamespace(delivery_info=None))
+
+        with self.assertLogs('celery.metrics', 'INFO') as logs:
+            record_queue_latency(task=task)
+            record_task_runtime(task=task, state='SUCCESS')
+
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn('celery.task_runtime', logs.records[0].getMessage())
@@ -0,0 +1,72 @@
+import gzip
+from decimal import Decimal
+from unittest import mock
+
+import brotli
+from django.contrib.auth.models import User
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+from rest_framework.test import APITestCase
+
+from api.middleware import CompressionMiddleware
+from api.models import Category, Product
+
+
+class CompressionTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('shop', 'shop@example.com', 'password')
+        self.client.force_authenticate(self.user)
+        category = Category.objects.create(name='Grocery', slug='grocery')
+        for i in range(10):
+            Product.objects.create(user=self.user, product_name=f'Product {i}', category=category, sku=f'SKU-{i}',
+                                   unit_price=Decimal('10.00'), quantity=i, description='A product ' * 10)
+        self.plain = self.client.get('/api/products/').content
+        self.assertGreater(len(self.plain), 1024)
+
+    def get(self, accept_encoding):
+        return self.client.get('/api/products/', HTTP_ACCEPT_ENCODING=accept_encoding)
+
+    def test_brotli_is_preferred_when_accepted(self):
+        response = self.get('gzip, deflate, br')
+
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(brotli.decompress(response.content), self.plain)
+        self.assertEqual(int(response['Content-Length']), len(response.content))
+
+    def test_gzip_when_brotli_is_not_accepted(self):
+        response = self.get('gzip, deflate')
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(response.content), self.plain)
+
+    def test_gzip_when_brotli_is_not_installed(self):
+        with mock.patch('api.middleware.brotli', None):
+            response = self.get('br, gzip')
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), self.plain)
+
+    def test_uncompressed_without_accept_encoding(self):
+        response = self.get('')
+
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.content, self.plain)
+
+    @override_settings(COMPRESSION_MIN_SIZE=10 ** 6)
+    def test_small_responses_are_sent_as_is(self):
+        response = self.get('gzip, br')
+
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.content, self.plain)
+
+    def test_strong_etag_is_weakened_when_compressed(self):
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='br')
+        response = HttpResponse(self.plain)
+        response['ETag'] = '"3.abc"'
+
+        response = CompressionMiddleware(lambda request: response)(request)
+
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(response['ETag'], 'W/"3.abc"')
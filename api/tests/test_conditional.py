@@ -0,0 +1,81 @@
+import time
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api.conditional import _version_key
+from api.models import Billing, Category, Customer, Party, Product
+from api.search import index_billings, reindex_party_billings
+
+
+class ConditionalGetTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('shop', 'shop@example.com', 'password')
+        self.client.force_authenticate(self.user)
+        self.category = Category.objects.create(name='Grocery', slug='grocery')
+        self.product = Product.objects.create(user=self.user, product_name='Rice', category=self.category,
+                                              sku='RICE', unit_price=Decimal('120.00'), quantity=10)
+
+    def test_detail_etag_is_accepted_as_if_match(self):
+        etag = self.client.get(f'/api/products/?id={self.product.id}')['ETag']
+        self.assertTrue(etag.startswith('"1.'))
+
+        response = self.client.put(f'/api/products/?id={self.product.id}', {'unit_price': '125.00'},
+                                   format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.put(f'/api/products/?id={self.product.id}', {'unit_price': '130.00'},
+                                   format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+
+    def test_unchanged_detail_is_not_modified(self):
+        etag = self.client.get(f'/api/products/?id={self.product.id}')['ETag']
+
+        response = self.client.get(f'/api/products/?id={self.product.id}', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_category_change_expires_category_list(self):
+        etag = self.client.get('/api/categories/')['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.name = 'Groceries'
+            self.category.save()
+
+        response = self.client.get('/api/categories/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['name'], 'Groceries')
+
+    def test_party_rename_expires_billing_search(self):
+        party = Party.objects.create(Category_type='Customer')
+        customer = Customer.objects.create(party=party, name='Ram')
+        billing = Billing.objects.create(user=self.user, party=party, invoice_number='INV-1')
+        index_billings(Billing.objects.filter(pk=billing.pk))
+        etag = self.client.get('/api/billing/search/?q=sita')['ETag']
+
+        customer.name = 'Sita'
+        customer.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            reindex_party_billings({'party_id': party.id})
+
+        response = self.client.get('/api/billing/search/?q=sita', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 1)
+
+    def test_last_modified(self):
+        cache.set(_version_key('product', self.user.pk), time.time_ns() - 5 * 10 ** 9)
+        last_modified = self.client.get('/api/products/')['Last-Modified']
+
+        response = self.client.get('/api/products/', HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.filter(pk=self.product.pk).update(quantity=5)
+            self.product.refresh_from_db()
+            self.product.save()
+        response = self.client.get('/api/products/', HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('Last-Modified', response)
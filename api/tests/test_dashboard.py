@@ -0,0 +1,97 @@
+from datetime import date
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api.dashboard import DASHBOARD_REFRESH_DELAY, clear_refresh_pending, compute_dashboard, get_dashboard
+from api.models import Billing, Category, Customer, Expense, Party, Product
+
+
+class DashboardTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('shop', 'shop@example.com', 'password')
+        self.client.force_authenticate(self.user)
+        self.category = Category.objects.create(name='Grocery', slug='grocery')
+
+    def customer(self, name):
+        party = Party.objects.create(Category_type='Customer')
+        Customer.objects.create(party=party, name=name)
+        return party
+
+    def billing(self, invoice_date, total, due, party=None):
+        number = f'INV-{Billing.objects.count() + 1}'
+        return Billing.objects.create(user=self.user, party=party, invoice_number=number, invoice_date=invoice_date,
+                                      total_amount=Decimal(total), due_amount=Decimal(due))
+
+    def test_kpis_per_period(self):
+        # A Wednesday: the week starts on the 12th and the month on the 1st
+        today = date(2026, 10, 14)
+        asha, bikash, chandra = self.customer('Asha'), self.customer('Bikash'), self.customer('Chandra')
+        self.billing(date(2026, 9, 20), '70', '70', asha)
+        self.billing(date(2026, 10, 5), '50', '50', bikash)
+        self.billing(date(2026, 10, 13), '200', '0', bikash)
+        self.billing(date(2026, 10, 14), '100', '40', asha)
+        self.billing(date(2026, 10, 14), '30', '30', chandra)
+        self.billing(date(2026, 10, 15), '999', '999', chandra)
+        for day, amount in ((date(2026, 9, 30), 100), (date(2026, 10, 2), 5),
+                            (date(2026, 10, 12), 15), (date(2026, 10, 14), 20)):
+            Expense.objects.create(user=self.user, category='Rent', amount=amount, date=day)
+        Product.objects.create(user=self.user, product_name='Rice', sku='RICE', category=self.category,
+                               unit_price=10, quantity=2, reorder_level=5)
+        Product.objects.create(user=self.user, product_name='Oil', sku='OIL', category=self.category,
+                               unit_price=10, quantity=10, reorder_level=5)
+
+        dashboard = compute_dashboard(self.user.pk, today)
+
+        self.assertEqual(dashboard['date'], '2026-10-14')
+        self.assertEqual(dashboard['today'], {'sales': '130.00', 'dues': '70.00', 'expenses': '20.00',
+                                              'new_customers': 1})
+        self.assertEqual(dashboard['week'], {'sales': '330.00', 'dues': '70.00', 'expenses': '35.00',
+                                             'new_customers': 1})
+        self.assertEqual(dashboard['month'], {'sales': '380.00', 'dues': '120.00', 'expenses': '40.00',
+                                              'new_customers': 2})
+        self.assertEqual(dashboard['low_stock_count'], 1)
+
+    def test_reads_are_served_from_the_cache(self):
+        self.billing(timezone.localdate(), '100', '0')
+        first = self.client.get('/api/dashboard/')
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(first.data['today']['sales'], '100.00')
+
+        # Changed behind the dashboard's back: the cached figures stand
+        Billing.objects.update(total_amount=Decimal('500'))
+        with mock.patch('api.dashboard.compute_dashboard') as compute:
+            second = self.client.get('/api/dashboard/')
+        compute.assert_not_called()
+        self.assertEqual(second.data, first.data)
+
+    def test_a_billing_write_refreshes_the_cached_dashboard(self):
+        self.assertEqual(get_dashboard(self.user.pk)['today']['sales'], '0.00')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.billing(timezone.localdate(), '100', '25')
+
+        with mock.patch('api.dashboard.compute_dashboard') as compute:
+            dashboard = get_dashboard(self.user.pk)
+        compute.assert_not_called()
+        self.assertEqual(dashboard['today']['sales'], '100.00')
+        self.assertEqual(dashboard['today']['dues'], '25.00')
+
+    def test_a_burst_of_writes_queues_one_refresh(self):
+        with mock.patch('api.tasks.refresh_user_dashboard.apply_async') as queue:
+            with self.captureOnCommitCallbacks(execute=True):
+                for total in ('10', '20', '30'):
+                    self.billing(timezone.localdate(), total, '0')
+            queue.assert_called_once_with((self.user.pk,), countdown=DASHBOARD_REFRESH_DELAY.total_seconds())
+
+            # The refresh clears the marker before it reads, so the next write queues another
+            clear_refresh_pending(self.user.pk)
+            with self.captureOnCommitCallbacks(execute=True):
+                Expense.objects.create(user=self.user, category='Rent', amount=5, date=timezone.localdate())
+            self.assertEqual(queue.call_count, 2)
@@ -0,0 +1,59 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.test import APITransactionTestCase
+
+from api.models import Expense
+
+
+class IdempotencyKeyTests(APITransactionTestCase):
+    # Real commits, since a response is only stored once its transaction commits
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('shop', 'shop@example.com', 'password')
+        self.client.force_authenticate(self.user)
+
+    def create_expense(self, key, amount='500.00'):
+        return self.client.post('/api/expenses/', {'category': 'Rent', 'amount': amount, 'date': '2026-10-01'},
+                                format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_replays_the_stored_response(self):
+        first = self.create_expense('expense-1')
+        retry = self.create_expense('expense-1')
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual((retry.status_code, retry.data), (first.status_code, first.data))
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Expense.objects.count(), 1)
+
+        # Another key is another request
+        self.assertEqual(self.create_expense('expense-2').status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Expense.objects.count(), 2)
+
+    def test_key_reused_for_a_different_body_is_rejected(self):
+        self.create_expense('expense-1')
+        response = self.create_expense('expense-1', amount='750.00')
+
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(Expense.objects.count(), 1)
+
+    def test_rolled_back_operation_runs_again_on_retry(self):
+        expense = {'method': 'POST', 'resource': 'expenses', 'idempotency_key': 'expense-1',
+                   'body': {'category': 'Rent', 'amount': '500.00', 'date': '2026-10-01'}}
+        failing = {'method': 'PUT', 'resource': 'expenses', 'id': 999999, 'body': {'amount': '1.00'}}
+
+        response = self.client.post('/api/batch/', {'operations': [expense, failing], 'atomic': True}, format='json')
+        self.assertFalse(response.data['committed'])
+        self.assertFalse(Expense.objects.exists())
+
+        # Not replayed (nothing was committed) and not locked out until the lock expires
+        response = self.client.post('/api/batch/', {'operations': [expense], 'atomic': True}, format='json')
+        self.assertTrue(response.data['committed'])
+        self.assertEqual(response.data['results'][0]['status'], status.HTTP_201_CREATED)
+        self.assertEqual(Expense.objects.count(), 1)
+
+        # Now committed, the same operation is replayed
+        response = self.client.post('/api/batch/', {'operations': [expense]}, format='json')
+        self.assertEqual(response.data['results'][0]['status'], status.HTTP_201_CREATED)
+        self.assertEqual(Expense.objects.count(), 1)
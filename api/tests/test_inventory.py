@@ -0,0 +1,288 @@
+from datetime import date, datetime, time
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core import mail
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api.catalog import invalidate_categories
+from api.inventory import adjust_stock, stock_as_of, take_stock_snapshots
+from api.models import (Billing, Category, CategoryStock, Party, Product, StockMovement, StockSnapshot,
+                        Supplier)
+from api.outbox import relay_events
+from api.recurring import generate_billings
+from api.tasks import send_low_stock_digests
+
+
+class ProductCostTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('shop', 'shop@example.com', 'password')
+        self.client.force_authenticate(self.user)
+        self.category = Category.objects.create(name='Grocery', slug='grocery')
+
+    def test_average_cost_is_only_set_on_create(self):
+        response = self.client.post('/api/products/', {
+            'product_name': 'Rice', 'category': self.category.id, 'unit_price': '120.00', 'quantity': 45,
+            'average_cost': '4.00',
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        product = Product.objects.get(user=self.user, product_name='Rice')
+        self.assertEqual(product.average_cost, Decimal('4.0000'))
+
+        response = self.client.put(f'/api/products/?id={product.id}', {'average_cost': '99.00', 'unit_price': '125.00'},
+                                   format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        product.refresh_from_db()
+        self.assertEqual(product.average_cost, Decimal('4.0000'))
+        self.assertEqual(product.unit_price, Decimal('125.00'))
+
+    def test_receiving_stock_reaverages_the_cost(self):
+        product = Product.objects.create(user=self.user, product_name='Rice', category=self.category,
+                                         unit_price=Decimal('120.00'), quantity=45, average_cost=Decimal('4'))
+        adjust_stock(self.user, {product.id: 10}, StockMovement.PURCHASE, unit_costs={product.id: Decimal('6')})
+        product.refresh_from_db()
+        self.assertEqual(product.quantity, 55)
+        # (45 * 4 + 10 * 6) / 55, not the integer 4 a bare division gives on SQLite
+        self.assertEqual(product.average_cost, Decimal('4.3636'))
+
+    def cogs(self, start, end):
+        return self.client.get(f'/api/analytics/cogs/?from={start}&to={end}').json()
+
+    def test_cogs_is_booked_on_the_invoice_date(self):
+        product = Product.objects.create(user=self.user, product_name='Rice', category=self.category,
+                                         unit_price=Decimal('10.00'), quantity=10, average_cost=Decimal('4'))
+        response = self.client.post('/api/billing/', {
+            'invoice_date': '2026-01-31', 'items': [{'item': product.id, 'quantity': 4, 'rate': '10'}],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        relay_events()
+
+        january = self.cogs(date(2026, 1, 1), date(2026, 1, 31))
+        self.assertEqual(january['revenue'], '40.00')
+        self.assertEqual(january['cost_of_goods_sold'], '16.00')
+
+        billing = Billing.objects.get(user=self.user)
+        response = self.client.put(f'/api/billing/?id={billing.id}', {'invoice_date': '2026-02-01'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        relay_events()
+        self.assertEqual(self.cogs(date(2026, 1, 1), date(2026, 1, 31))['cost_of_goods_sold'], '0.00')
+        february = self.cogs(date(2026, 2, 1), date(2026, 2, 28))
+        self.assertEqual(february['revenue'], '40.00')
+        self.assertEqual(february['cost_of_goods_sold'], '16.00')
+
+    def test_generated_invoices_book_their_own_movements(self):
+        product = Product.objects.create(user=self.user, product_name='Service', category=self.category,
+                                         unit_price=Decimal('50.00'), quantity=100, average_cost=Decimal('20'))
+        response = self.client.post('/api/recurring/billing/', {
+            'frequency': 'monthly', 'start_date': '2026-08-15', 'items': [{'item': product.id, 'quantity': 2, 'rate': '50'}],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(generate_billings(date(2026, 10, 19)), 3)
+
+        movements = StockMovement.objects.filter(kind=StockMovement.SALE).order_by('booked_on')
+        self.assertEqual([(m.billing.invoice_date, m.booked_on, m.quantity) for m in movements], [
+            (date(2026, 8, 15), date(2026, 8, 15), -2),
+            (date(2026, 9, 15), date(2026, 9, 15), -2),
+            (date(2026, 10, 15), date(2026, 10, 15), -2),
+        ])
+        self.assertEqual(self.cogs(date(2026, 9, 1), date(2026, 9, 30))['cost_of_goods_sold'], '40.00')
+
+
+class LowStockTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('shop', 'shop@example.com', 'password')
+        self.client.force_authenticate(self.user)
+        self.category = Category.objects.create(name='Grocery', slug='grocery')
+        self.rice = self.product(self.user, 'Rice', quantity=3, reorder_level=5)
+        self.oil = self.product(self.user, 'Oil', quantity=5, reorder_level=5)
+        self.product(self.user, 'Salt', quantity=6, reorder_level=5)
+        self.product(self.user, 'Sugar', quantity=0, reorder_level=0)
+
+    def product(self, user, name, quantity, reorder_level):
+        return Product.objects.create(user=user, product_name=name, category=self.category,
+                                      sku=f'{user.username}-{name}', unit_price=Decimal('10.00'),
+                                      quantity=quantity, reorder_level=reorder_level)
+
+    def low_stock(self):
+        response = self.client.get('/api/products/low-stock/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [row['product_name'] for row in response.data['results']]
+
+    def test_products_at_or_below_their_reorder_level(self):
+        other = User.objects.create_user('other', 'other@example.com', 'password')
+        self.product(other, 'Flour', quantity=1, reorder_level=5)
+
+        self.assertEqual(self.low_stock(), ['Rice', 'Oil', 'Sugar'])
+
+    def test_a_sale_puts_a_product_on_the_list(self):
+        response = self.client.post('/api/billing/', {
+            'items': [{'item': Product.objects.get(product_name='Salt').id, 'quantity': 1, 'rate': '10.00'}],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        self.assertEqual(self.low_stock(), ['Rice', 'Oil', 'Salt', 'Sugar'])
+
+    def test_one_digest_per_user_with_an_email(self):
+        other = User.objects.create_user('other', 'other@example.com', 'password')
+        self.product(other, 'Flour', quantity=1, reorder_level=5)
+        silent = User.objects.create_user('silent', '', 'password')
+        self.product(silent, 'Tea', quantity=0, reorder_level=2)
+
+        self.assertEqual(send_low_stock_digests(), 2)
+
+        digests = {message.to[0]: message for message in mail.outbox}
+        self.assertEqual(set(digests), {'shop@example.com', 'other@example.com'})
+        shop = digests['shop@example.com']
+        self.assertEqual(shop.subject, '3 product(s) running low on stock')
+        self.assertIn('- Rice: 3 left (reorder at 5)', shop.body)
+        self.assertIn('- Oil: 5 left (reorder at 5)', shop.body)
+        self.assertNotIn('Salt', shop.body)
+        self.assertNotIn('Flour', shop.body)
+
+    def test_digests_are_sent_in_batches(self):
+        for i in range(3):
+            user = User.objects.create_user(f'shop{i}', f'shop{i}@example.com', 'password')
+            self.product(user, 'Rice', quantity=0, reorder_level=1)
+
+        with mock.patch('api.tasks.DIGEST_SEND_BATCH_SIZE', 2), \
+                mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages',
+                           side_effect=lambda messages: len(messages)) as send:
+            self.assertEqual(send_low_stock_digests(), 4)
+
+        self.assertEqual([len(call.args[0]) for call in send.call_args_list], [2, 2])
+
+
+class StockAsOfTests(APITestCase):
+    """Rice: 10 in on the 1st, 3 out on the 2nd, 2 out on the 3rd and 5 in on the 4th of March."""
+
+    def setUp(self):
+        self.user = User.objects.create_user('shop', 'shop@example.com', 'password')
+        self.client.force_authenticate(self.user)
+        category = Category.objects.create(name='Grocery', slug='grocery')
+        self.rice = Product.objects.create(user=self.user, product_name='Rice', category=category, sku='RICE',
+                                           unit_price=Decimal('10.00'), quantity=10)
+        for day, quantity in ((1, 10), (2, -3), (3, -2), (4, 5)):
+            self.move(quantity, date(2026, 3, day))
+
+    def move(self, quantity, day):
+        movement = StockMovement.objects.create(user=self.user, product=self.rice, quantity=quantity,
+                                                kind=StockMovement.ADJUSTMENT, booked_on=day)
+        at = timezone.make_aware(datetime.combine(day, time(12)))
+        StockMovement.objects.filter(pk=movement.pk).update(created_at=at)
+
+    def as_of(self, day):
+        return stock_as_of(Product.objects.filter(pk=self.rice.pk), day)[self.rice.pk]
+
+    def test_replays_the_ledger_without_snapshots(self):
+        self.assertEqual([self.as_of(date(2026, 3, day)) for day in range(1, 5)], [10, 7, 5, 10])
+        self.assertEqual(self.as_of(date(2026, 2, 28)), 0)
+
+    def test_snapshot_is_the_closing_stock_of_its_day(self):
+        self.assertEqual(take_stock_snapshots(date(2026, 3, 2)), 1)
+        self.assertEqual(StockSnapshot.objects.get(product=self.rice, day=date(2026, 3, 2)).quantity, 7)
+
+        # Running it again for the same day overwrites rather than duplicates
+        take_stock_snapshots(date(2026, 3, 2))
+        self.assertEqual(StockSnapshot.objects.filter(product=self.rice).count(), 1)
+
+    def test_starts_from_the_latest_snapshot_and_adds_the_tail(self):
+        take_stock_snapshots(date(2026, 3, 2))
+        # Only the snapshot can still know what happened up to the 2nd
+        StockMovement.objects.filter(created_at__lt=timezone.make_aware(datetime(2026, 3, 3))).delete()
+
+        self.assertEqual(self.as_of(date(2026, 3, 2)), 7)
+        self.assertEqual(self.as_of(date(2026, 3, 3)), 5)
+        self.assertEqual(self.as_of(date(2026, 3, 4)), 10)
+
+    def test_endpoint(self):
+        response = self.client.get('/api/products/stock-as-of/', {'date': '2026-03-03'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'], [{'id': self.rice.id, 'product_name': 'Rice', 'quantity': 5}])
+
+        for params in ({'date': '03/03/2026'}, {'date': '2026-03-03', 'id': 'rice'}):
+            response = self.client.get('/api/products/stock-as-of/', params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class CategoryStockTests(APITestCase):
+    """The per-category counters always equal what the products add up to."""
+
+    def setUp(self):
+        self.user = User.objects.create_user('shop', 'shop@example.com', 'password')
+        self.client.force_authenticate(self.user)
+        self.grocery = Category.objects.create(name='Grocery', slug='grocery')
+        self.drinks = Category.objects.create(name='Drinks', slug='drinks')
+        invalidate_categories()
+        party = Party.objects.create(Category_type='Supplier')
+        self.supplier = Supplier.objects.create(party=party, name='Wholesaler', code='WS-1')
+
+        response = self.client.post('/api/products/', {
+            'product_name': 'Rice', 'category': self.grocery.id, 'unit_price': '10.00', 'quantity': 10,
+            'average_cost': '5.00',
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.rice = Product.objects.get(product_name='Rice')
+
+    def counters(self):
+        return {
+            category_id: (products, quantity, value.quantize(Decimal('0.01')))
+            for category_id, products, quantity, value in CategoryStock.objects
+            .filter(user=self.user).values_list('category_id', 'product_count', 'quantity', 'stock_value')
+            if products or quantity or value
+        }
+
+    def assertCountersMatchProducts(self, expected):
+        from_products = {}
+        for product in Product.objects.filter(user=self.user):
+            products, quantity, value = from_products.get(product.category_id, (0, 0, Decimal('0')))
+            from_products[product.category_id] = (products + 1, quantity + product.quantity,
+                                                  value + product.quantity * product.average_cost)
+        from_products = {category_id: (products, quantity, value.quantize(Decimal('0.01')))
+                         for category_id, (products, quantity, value) in from_products.items()}
+        self.assertEqual(self.counters(), from_products)
+        self.assertEqual(self.counters(), expected)
+
+    def edit(self, **data):
+        response = self.client.put(f'/api/products/?id={self.rice.id}', data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_counters_follow_a_product_between_categories(self):
+        self.assertCountersMatchProducts({self.grocery.id: (1, 10, Decimal('50.00'))})
+
+        self.edit(category=self.drinks.id)
+        self.assertCountersMatchProducts({self.drinks.id: (1, 10, Decimal('50.00'))})
+
+        response = self.client.post('/api/billing/', {
+            'items': [{'item': self.rice.id, 'quantity': 3, 'rate': '10.00'}],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertCountersMatchProducts({self.drinks.id: (1, 7, Decimal('35.00'))})
+
+        response = self.client.post('/api/purchase-bills/', {
+            'supplier': self.supplier.id, 'bill_number': 'PB-1',
+            'items': [{'product': self.rice.id, 'quantity': 5, 'unit_cost': '11.00'}],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertCountersMatchProducts({self.drinks.id: (1, 12, Decimal('90.00'))})
+
+        # Category and quantity changed in the same write
+        self.edit(category=self.grocery.id, quantity=20)
+        self.assertCountersMatchProducts({self.grocery.id: (1, 20, Decimal('150.00'))})
+
+        response = self.client.delete(f'/api/products/?id={self.rice.id}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertCountersMatchProducts({})
+
+    def test_category_list_reads_the_counters(self):
+        self.edit(category=self.drinks.id)
+
+        response = self.client.get('/api/categories/')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rows = {row['slug']: (row['products'], row['quantity'], row['stock_value'])
+                for row in response.data['results']}
+        self.assertEqual(rows, {'drinks': (1, 10, '50.00'), 'grocery': (0, 0, '0.00')})
@@ -0,0 +1,188 @@
+import threading
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import connections, transaction
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase, APITransactionTestCase
+
+from api.invoicing import allocate_invoice_numbers, parse_invoice_number
+from api.models import Billing, BillingItem, Category, Product, StockMovement
+
+THREADS = 8
+PER_THREAD = 5
+
+
+class ConcurrentInvoiceNumberTests(APITransactionTestCase):
+    """Numbers handed out from several threads at once are unique and leave no gaps."""
+
+    def setUp(self):
+        self.user = User.objects.create_user('shop', 'shop@example.com', 'password')
+        self.year = date.today().year
+        category = Category.objects.create(name='Grocery', slug='grocery')
+        self.product = Product.objects.create(user=self.user, product_name='Rice', category=category,
+                                              unit_price='10.00', quantity=THREADS * PER_THREAD)
+
+    def client_for(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        return client
+
+    def run_threads(self, work):
+        """Run ``work(index)`` in THREADS threads started together and return their results."""
+        start = threading.Barrier(THREADS)
+        results, errors = [None] * THREADS, []
+
+        def run(index):
+            try:
+                start.wait()
+                results[index] = work(index)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=run, args=(index,)) for index in range(THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        return results
+
+    def test_invoices_created_at_once_are_numbered_in_sequence(self):
+        def create_invoices(index):
+            client = self.client_for()
+            for _ in range(PER_THREAD):
+                response = client.post('/api/billing/', {
+                    'items': [{'item': self.product.id, 'quantity': 1, 'rate': '10.00'}],
+                }, format='json')
+                assert response.status_code == 201, response.content
+
+        self.run_threads(create_invoices)
+
+        numbers = [parse_invoice_number(number)
+                   for number in Billing.objects.filter(user=self.user).values_list('invoice_number', flat=True)]
+        self.assertEqual(sorted(numbers), [(self.year, n) for n in range(1, THREADS * PER_THREAD + 1)])
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 0)
+
+    def test_blocks_and_single_numbers_never_overlap(self):
+        def allocate(index):
+            client, taken = self.client_for(), []
+            for attempt in range(PER_THREAD):
+                if index % 2:
+                    response = client.post('/api/invoice-numbers/blocks/',
+                                           {'terminal_id': f'terminal-{index}', 'size': 10}, format='json')
+                    assert response.status_code == 201, response.content
+                    taken.append((response.data['first_number'], response.data['last_number']))
+                    continue
+                try:
+                    with transaction.atomic():
+                        first, last = allocate_invoice_numbers(self.user, self.year)
+                        if attempt == 0:
+                            # A rolled-back invoice gives its number back
+                            raise RuntimeError
+                except RuntimeError:
+                    continue
+                taken.append((first, last))
+            return taken
+
+        ranges = sorted(span for taken in self.run_threads(allocate) for span in taken)
+        numbers = [number for first, last in ranges for number in range(first, last + 1)]
+        self.assertEqual(numbers, list(range(1, len(numbers) + 1)))
+        # Half the threads reserve PER_THREAD blocks of 10, the rest keep PER_THREAD - 1 single numbers
+        self.assertEqual(len(numbers), THREADS // 2 * (PER_THREAD * 10 + PER_THREAD - 1))
+
+
+class SyncBillingItemsTests(APITestCase):
+    """Editing an invoice's lines through PUT billing/ with a full ``items`` list."""
+
+    def setUp(self):
+        self.user = User.objects.create_user('shop', 'shop@example.com', 'password')
+        self.client.force_authenticate(self.user)
+        category = Category.objects.create(name='Grocery', slug='grocery')
+        self.rice = Product.objects.create(user=self.user, product_name='Rice', category=category, sku='RICE',
+                                           unit_price='10.00', quantity=20)
+        self.oil = Product.objects.create(user=self.user, product_name='Oil', category=category, sku='OIL',
+                                          unit_price='50.00', quantity=5)
+        response = self.client.post('/api/billing/', {'items': [
+            {'item': self.rice.id, 'quantity': 4, 'rate': '10.00'},
+            {'item': self.oil.id, 'quantity': 1, 'rate': '50.00'},
+        ]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.billing = Billing.objects.get()
+        self.rice_line = self.billing.items.get(item=self.rice)
+        self.oil_line = self.billing.items.get(item=self.oil)
+
+    def put_items(self, items):
+        return self.client.put(f'/api/billing/?id={self.billing.id}', {'items': items}, format='json')
+
+    def stock(self):
+        return dict(Product.objects.values_list('product_name', 'quantity'))
+
+    def test_lines_are_updated_by_id(self):
+        response = self.put_items([
+            {'id': self.rice_line.id, 'item': self.rice.id, 'quantity': 6, 'rate': '9.50'},
+            {'id': self.oil_line.id, 'item': self.oil.id, 'quantity': 1, 'rate': '50.00'},
+        ])
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.rice_line.refresh_from_db()
+        self.assertEqual((self.rice_line.quantity, self.rice_line.rate, self.rice_line.total_price),
+                         (6, Decimal('9.50'), Decimal('57.00')))
+        self.assertEqual(self.billing.items.count(), 2)
+        self.billing.refresh_from_db()
+        self.assertEqual(self.billing.total_amount, Decimal('107.00'))
+        self.assertEqual(self.stock(), {'Rice': 14, 'Oil': 4})
+
+    def test_omitted_lines_are_removed_and_new_ones_added(self):
+        response = self.put_items([
+            {'id': self.rice_line.id, 'item': self.rice.id, 'quantity': 4, 'rate': '10.00'},
+            {'item': self.rice.id, 'quantity': 1, 'rate': '0.00'},
+        ])
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(BillingItem.objects.filter(id=self.oil_line.id).exists())
+        self.assertEqual(sorted(self.billing.items.values_list('quantity', flat=True)), [1, 4])
+        self.assertEqual(self.stock(), {'Rice': 15, 'Oil': 5})
+
+    def test_stock_moves_by_the_net_change_per_product(self):
+        # Rice: 4 out becomes 2 + 2 out on two lines, so nothing moves
+        response = self.put_items([
+            {'id': self.rice_line.id, 'item': self.rice.id, 'quantity': 2, 'rate': '10.00'},
+            {'item': self.rice.id, 'quantity': 2, 'rate': '10.00'},
+            {'id': self.oil_line.id, 'item': self.oil.id, 'quantity': 3, 'rate': '50.00'},
+        ])
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.stock(), {'Rice': 16, 'Oil': 2})
+        edits = StockMovement.objects.filter(billing=self.billing).order_by('id')[2:]
+        self.assertEqual([(movement.product_id, movement.quantity) for movement in edits], [(self.oil.id, -2)])
+
+    def test_unknown_or_repeated_ids_are_rejected(self):
+        other = Billing.objects.create(user=self.user, invoice_number='OTHER')
+        foreign = BillingItem.objects.create(billing=other, item=self.rice, quantity=1, rate='10.00')
+
+        for items in ([{'id': foreign.id, 'item': self.rice.id, 'quantity': 1, 'rate': '10.00'}],
+                      [{'id': self.rice_line.id, 'item': self.rice.id, 'quantity': 1, 'rate': '10.00'},
+                       {'id': self.rice_line.id, 'item': self.rice.id, 'quantity': 2, 'rate': '10.00'}]):
+            response = self.put_items(items)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('Unknown or repeated item id', response.data['items'][0])
+
+        self.assertEqual(self.billing.items.count(), 2)
+        self.assertEqual(self.stock(), {'Rice': 16, 'Oil': 4})
+
+    def test_insufficient_stock_leaves_the_invoice_alone(self):
+        response = self.put_items([
+            {'id': self.rice_line.id, 'item': self.rice.id, 'quantity': 4, 'rate': '10.00'},
+            {'id': self.oil_line.id, 'item': self.oil.id, 'quantity': 7, 'rate': '50.00'},
+        ])
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn(str(self.oil.id), response.data['error'])
+        self.oil_line.refresh_from_db()
+        self.assertEqual(self.oil_line.quantity, 1)
+        self.assertEqual(self.stock(), {'Rice': 16, 'Oil': 4})
@@ -0,0 +1,60 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db.models import F
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api.inventory import adjust_stock
+from api.models import Category, Customer, Party, Product, StockMovement
+
+
+class StaleRowTests(APITestCase):
+    """
+    An edit based on the current version must not write back fields of the
+    row as it was loaded, before a concurrent write the client already saw.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user('shop', 'shop@example.com', 'password')
+        self.client.force_authenticate(self.user)
+
+    def write_before_claim(self, model, write):
+        """Patch ``model.claim_version`` so ``write(instance)`` lands between the load and the claim."""
+        claim_version = model.claim_version
+
+        def claim(instance, expected_version=None):
+            write(instance)
+            return claim_version(instance, expected_version)
+        return mock.patch.object(model, 'claim_version', autospec=True, side_effect=claim)
+
+    def test_product_edit_keeps_stock_sold_after_the_load(self):
+        category = Category.objects.create(name='Grocery', slug='grocery')
+        product = Product.objects.create(user=self.user, product_name='Rice', category=category,
+                                         unit_price=Decimal('120.00'), quantity=10)
+
+        def sell(instance):
+            adjust_stock(self.user, {instance.id: -3}, StockMovement.SALE)
+
+        with self.write_before_claim(Product, sell):
+            response = self.client.put(f'/api/products/?id={product.id}', {'unit_price': '125.00'}, format='json',
+                                       HTTP_IF_MATCH='"2"')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        product.refresh_from_db()
+        self.assertEqual((product.quantity, product.unit_price, product.version), (7, Decimal('125.00'), 3))
+        self.assertEqual(response.data['product']['quantity'], 7)
+
+    def test_customer_edit_keeps_fields_it_did_not_send(self):
+        party = Party.objects.create(Category_type='Customer')
+        customer = Customer.objects.create(party=party, name='Asha', notes='')
+
+        def edit(instance):
+            Customer.objects.filter(pk=instance.pk).update(notes='Prefers email', version=F('version') + 1)
+
+        with self.write_before_claim(Customer, edit):
+            response = self.client.put(f'/api/parties/?id={party.id}', {'name': 'Asha Rai'}, format='json',
+                                       HTTP_IF_MATCH='"2"')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        customer.refresh_from_db()
+        self.assertEqual((customer.name, customer.notes), ('Asha Rai', 'Prefers email'))
@@ -0,0 +1,46 @@
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api.models import Billing, Category, Customer, Product
+from api.recurring import generate_billings
+
+
+@override_settings(LOYALTY_SPEND_PER_POINT=Decimal('100'))
+class LoyaltyPointsTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('shop', 'shop@example.com', 'password')
+        self.client.force_authenticate(self.user)
+
+    def create_customer(self, **data):
+        response = self.client.post('/api/parties/', {'Category_type': 'Customer', 'name': 'Asha', **data},
+                                    format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return Customer.objects.get(party_id=response.data['party']['id'])
+
+    def test_new_customers_cannot_be_given_points(self):
+        customer = self.create_customer(loyalty_points=5000)
+        self.assertEqual(customer.loyalty_points, 0)
+
+    def test_generated_paid_invoices_earn_points(self):
+        customer = self.create_customer()
+        category = Category.objects.create(name='Services', slug='services')
+        product = Product.objects.create(user=self.user, product_name='Service', category=category,
+                                         unit_price=Decimal('250.00'), quantity=10)
+        for invoice_status in ('Paid', 'Unpaid'):
+            response = self.client.post('/api/recurring/billing/', {
+                'party': customer.party_id, 'frequency': 'monthly', 'start_date': '2026-09-01',
+                'invoice_status': invoice_status, 'items': [{'item': product.id, 'quantity': 1, 'rate': '250'}],
+            }, format='json')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        self.assertEqual(generate_billings(date(2026, 10, 19)), 4)
+        customer.refresh_from_db()
+        # Two paid invoices of 250 earn 2 points each; the unpaid ones earn nothing
+        self.assertEqual(customer.loyalty_points, 4)
+        self.assertEqual(sorted(Billing.objects.values_list('invoice_status', 'loyalty_points_earned')),
+                         [('Paid', 2), ('Paid', 2), ('Unpaid', 0), ('Unpaid', 0)])
@@ -0,0 +1,33 @@
+from decimal import Decimal
+
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+
+
+class ClampNegativeDueAmountTests(TransactionTestCase):
+    before = [('api', '0029_category_stock')]
+    after = [('api', '0030_index_plan')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_overpaid_bills_are_cleared_before_the_constraint(self):
+        apps = self.migrate(self.before)
+        user = apps.get_model('auth', 'User').objects.create(username='shop')
+        party = apps.get_model('api', 'Party').objects.create(Category_type='Supplier')
+        supplier = apps.get_model('api', 'Supplier').objects.create(party=party, name='Mill', code='MILL')
+        apps.get_model('api', 'Billing').objects.create(user=user, invoice_number='INV-1', total_amount=100,
+                                                        due_amount=-20)
+        apps.get_model('api', 'PurchaseBill').objects.create(user=user, supplier=supplier, bill_number='PB-1',
+                                                             total_amount=100, due_amount=-5)
+
+        apps = self.migrate(self.after)
+        self.assertEqual(apps.get_model('api', 'Billing').objects.get().due_amount, Decimal('0.00'))
+        self.assertEqual(apps.get_model('api', 'PurchaseBill').objects.get().due_amount, Decimal('0.00'))
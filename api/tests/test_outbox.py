@@ -0,0 +1,74 @@
+from collections import defaultdict
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from api import outbox
+from api.models import Category, OutboxEvent
+from api.outbox import handles, prune_outbox, publish_event, relay_events
+
+
+class OutboxRelayTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(outbox, '_handlers', defaultdict(list))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.received = []
+
+        @handles('test.recorded')
+        def record(payload):
+            self.received.append(payload['n'])
+
+    def test_events_are_dispatched_to_their_handlers_once(self):
+        publish_event('test.recorded', n=1)
+        publish_event('test.recorded', n=2)
+        publish_event('test.unhandled', n=3)
+
+        self.assertEqual(relay_events(), 3)
+        self.assertEqual(self.received, [1, 2])
+        self.assertFalse(OutboxEvent.objects.filter(processed_at__isnull=True).exists())
+
+        # Processed events are not picked up again
+        self.assertEqual(relay_events(), 0)
+        self.assertEqual(self.received, [1, 2])
+
+    def test_failed_event_is_retried_later_without_its_writes(self):
+        failures = [RuntimeError('search index down')]
+
+        @handles('test.flaky')
+        def flaky(payload):
+            Category.objects.create(name=payload['name'], slug=payload['name'])
+            if failures:
+                raise failures.pop()
+
+        event = publish_event('test.flaky', name='dairy')
+        publish_event('test.recorded', n=1)
+
+        with self.assertLogs('api.outbox', 'ERROR'):
+            self.assertEqual(relay_events(), 2)
+        event.refresh_from_db()
+        self.assertIsNone(event.processed_at)
+        self.assertEqual(event.attempts, 1)
+        self.assertIn('search index down', event.last_error)
+        self.assertGreater(event.available_at, timezone.now())
+        # The failing handler's own writes were rolled back; the batch went on
+        self.assertFalse(Category.objects.exists())
+        self.assertEqual(self.received, [1])
+
+        # Not retried before its backoff is over
+        self.assertEqual(relay_events(), 0)
+        OutboxEvent.objects.filter(pk=event.pk).update(available_at=timezone.now())
+        self.assertEqual(relay_events(), 1)
+        event.refresh_from_db()
+        self.assertIsNotNone(event.processed_at)
+        self.assertEqual(Category.objects.get().name, 'dairy')
+
+    def test_old_processed_events_are_pruned(self):
+        old, recent = publish_event('test.recorded', n=1), publish_event('test.recorded', n=2)
+        relay_events()
+        OutboxEvent.objects.filter(pk=old.pk).update(processed_at=timezone.now() - timedelta(days=8))
+
+        self.assertEqual(prune_outbox(), 1)
+        self.assertEqual(list(OutboxEvent.objects.values_list('pk', flat=True)), [recent.pk])
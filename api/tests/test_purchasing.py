@@ -0,0 +1,81 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api.models import Category, Party, Product, PurchaseBill, PurchaseBillItem, Supplier
+from api.purchasing import receive_purchase
+
+
+class PurchaseBillTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('shop', 'shop@example.com', 'password')
+        self.client.force_authenticate(self.user)
+        category = Category.objects.create(name='Grocery', slug='grocery')
+        self.product = Product.objects.create(user=self.user, product_name='Rice', category=category, sku='RICE',
+                                              unit_price=Decimal('120.00'), quantity=0)
+        party = Party.objects.create(Category_type='Supplier')
+        self.supplier = Supplier.objects.create(party=party, name='Wholesaler', code='WS-1')
+
+    def purchase(self, items, **bill):
+        return self.client.post('/api/purchase-bills/', {
+            'supplier': self.supplier.id, 'bill_number': 'PB-1', 'items': items, **bill,
+        }, format='json')
+
+    def test_zero_quantity_line_is_rejected(self):
+        response = self.purchase([{'product': self.product.id, 'quantity': 0, 'unit_cost': '10.00'}])
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('quantity', response.data['items'][0])
+        self.assertFalse(PurchaseBill.objects.exists())
+
+    def test_negative_unit_cost_is_rejected(self):
+        response = self.purchase([{'product': self.product.id, 'quantity': 5, 'unit_cost': '-5'}])
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('unit_cost', response.data['items'][0])
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 0)
+
+    def test_purchase_receives_stock(self):
+        response = self.purchase([{'product': self.product.id, 'quantity': 5, 'unit_cost': '10.00'}])
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 5)
+        self.assertEqual(self.product.average_cost, Decimal('10.0000'))
+
+    def test_paid_amount_must_be_within_the_bill_total(self):
+        line = [{'product': self.product.id, 'quantity': 5, 'unit_cost': '10.00'}]
+        for paid_amount in ('-1.00', '50.01'):
+            response = self.purchase(line, paid_amount=paid_amount)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('paid_amount', response.data)
+        self.assertFalse(PurchaseBill.objects.exists())
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 0)
+
+        response = self.purchase(line, paid_amount='20.00')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        bill_id = response.data['purchase_bill']['id']
+        for paid_amount in ('-1.00', '50.01'):
+            response = self.client.put(f'/api/purchase-bills/?id={bill_id}', {'paid_amount': paid_amount},
+                                       format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('paid_amount', response.data)
+
+        response = self.client.put(f'/api/purchase-bills/?id={bill_id}', {'paid_amount': '50.00'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(PurchaseBill.objects.get(pk=bill_id).due_amount, Decimal('0.00'))
+
+    def test_overpaid_bill_is_rejected_before_stock_moves(self):
+        bill = PurchaseBill.objects.create(user=self.user, supplier=self.supplier, bill_number='PB-2',
+                                           paid_amount=Decimal('100.00'))
+        errors = receive_purchase(bill, [{'product': self.product.id, 'quantity': 5, 'unit_cost': '10.00'}])
+
+        # Nothing to roll back: the check runs before any write
+        self.assertEqual(errors, {'paid_amount': ['Cannot be more than the bill total.']})
+        self.assertFalse(PurchaseBillItem.objects.exists())
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.quantity, self.product.average_cost), (0, Decimal('0.0000')))
@@ -0,0 +1,19 @@
+from django.db import connection
+from django.test import TestCase
+
+from api.management.commands.check_query_plans import full_scans, prepare_planner, query_plans, seed_plan_data
+
+
+class QueryPlanTests(TestCase):
+    """Every endpoint's and background job's main query is served by an index."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.shop = seed_plan_data(users=2, rows=200)
+
+    def test_no_query_reads_a_whole_table(self):
+        prepare_planner()
+        for name, queryset in query_plans(self.shop):
+            with self.subTest(name):
+                plan = queryset.explain()
+                self.assertEqual(full_scans(plan), [], f'{name} on {connection.vendor}:\n{plan}')
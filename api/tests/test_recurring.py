@@ -0,0 +1,89 @@
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from api.models import (Billing, Category, Expense, Product, RecurringBilling, RecurringBillingItem, RecurringExpense,
+                        RecurringSchedule)
+from api.recurring import generate_recurring_documents
+
+
+class RecurringGeneratorTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('shop', 'shop@example.com', 'password')
+        category = Category.objects.create(name='Grocery', slug='grocery')
+        self.product = Product.objects.create(user=self.user, product_name='Rice', category=category,
+                                              unit_price=Decimal('10.00'), quantity=10)
+
+    def recurring_expense(self, start_date, frequency=RecurringSchedule.MONTHLY, **fields):
+        return RecurringExpense.objects.create(user=self.user, category='Rent', amount=Decimal('500.00'),
+                                               frequency=frequency, start_date=start_date,
+                                               next_run_date=start_date, **fields)
+
+    def recurring_billing(self, start_date, quantity=2, **fields):
+        template = RecurringBilling.objects.create(user=self.user, start_date=start_date, next_run_date=start_date,
+                                                   due_days=15, tax=Decimal('5.00'), **fields)
+        RecurringBillingItem.objects.create(template=template, item=self.product, quantity=quantity,
+                                            rate=Decimal('10.00'))
+        return template
+
+    def test_next_run_date_advances_past_every_due_period(self):
+        template = self.recurring_expense(date(2026, 1, 31))
+
+        self.assertEqual(generate_recurring_documents(date(2026, 4, 15)), (0, 3))
+
+        self.assertEqual(sorted(Expense.objects.values_list('date', flat=True)),
+                         [date(2026, 1, 31), date(2026, 2, 28), date(2026, 3, 31)])
+        template.refresh_from_db()
+        self.assertEqual((template.next_run_date, template.occurrences), (date(2026, 4, 30), 3))
+        self.assertTrue(template.is_active)
+
+    def test_schedule_stops_at_its_end_date(self):
+        template = self.recurring_expense(date(2026, 3, 2), RecurringSchedule.WEEKLY, end_date=date(2026, 3, 16))
+
+        self.assertEqual(generate_recurring_documents(date(2026, 4, 1)), (0, 3))
+        self.assertEqual(generate_recurring_documents(date(2026, 5, 1)), (0, 0))
+
+        self.assertEqual(sorted(Expense.objects.values_list('date', flat=True)),
+                         [date(2026, 3, 2), date(2026, 3, 9), date(2026, 3, 16)])
+        template.refresh_from_db()
+        self.assertFalse(template.is_active)
+        self.assertEqual(template.occurrences, 3)
+
+    def test_running_twice_on_the_same_day_generates_nothing_new(self):
+        self.recurring_expense(date(2026, 3, 1))
+        self.recurring_billing(date(2026, 3, 1))
+
+        self.assertEqual(generate_recurring_documents(date(2026, 4, 1)), (2, 2))
+        self.assertEqual(generate_recurring_documents(date(2026, 4, 1)), (0, 0))
+
+        self.assertEqual(Expense.objects.count(), 2)
+        self.assertEqual(Billing.objects.count(), 2)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 6)
+
+    def test_generated_invoices_are_numbered_dated_and_totalled(self):
+        self.recurring_billing(date(2026, 3, 1))
+
+        generate_recurring_documents(date(2026, 4, 1))
+
+        billings = list(Billing.objects.order_by('invoice_date'))
+        self.assertEqual([b.invoice_date for b in billings], [date(2026, 3, 1), date(2026, 4, 1)])
+        self.assertEqual([b.due_date for b in billings], [date(2026, 3, 16), date(2026, 4, 16)])
+        self.assertEqual(len({b.invoice_number for b in billings}), 2)
+        self.assertEqual([(b.sub_total, b.total_amount, b.due_amount) for b in billings],
+                         [(Decimal('20.00'), Decimal('25.00'), Decimal('25.00'))] * 2)
+        self.assertEqual([b.items.get().quantity for b in billings], [2, 2])
+
+    def test_template_short_of_stock_stays_due(self):
+        template = self.recurring_billing(date(2026, 3, 1), quantity=6)
+
+        with self.assertLogs('api.recurring', 'WARNING'):
+            self.assertEqual(generate_recurring_documents(date(2026, 4, 1)), (0, 0))
+
+        self.assertFalse(Billing.objects.exists())
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 10)
+        template.refresh_from_db()
+        self.assertEqual((template.next_run_date, template.occurrences), (date(2026, 3, 1), 0))
@@ -0,0 +1,43 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core import mail
+from django.test import TestCase
+from django.utils import timezone
+
+from api import tasks
+from api.models import Billing, Customer, Party
+
+
+class PaymentReminderTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('shop', 'shop@example.com', 'password')
+        today = timezone.localdate()
+        for i, name in enumerate(('Asha', 'Bikash')):
+            party = Party.objects.create(Category_type='Customer')
+            Customer.objects.create(party=party, name=name, email=f'{name.lower()}@example.com')
+            Billing.objects.create(user=self.user, party=party, invoice_number=f'INV-{i}', invoice_status='Unpaid',
+                                   invoice_date=today - timedelta(days=30), due_date=today - timedelta(days=5),
+                                   due_amount=100)
+
+    def test_each_digest_is_stamped_as_it_is_sent(self):
+        build = tasks._payment_reminder
+        built = []
+
+        def crash_on_second_digest(*args):
+            built.append(args)
+            if len(built) > 1:
+                raise RuntimeError('worker lost')
+            return build(*args)
+
+        with mock.patch.object(tasks, '_payment_reminder', side_effect=crash_on_second_digest):
+            with self.assertRaises(RuntimeError):
+                tasks.send_payment_reminders()
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(list(Billing.objects.filter(reminder_sent_at__isnull=False)
+                              .values_list('invoice_number', flat=True)), ['INV-0'])
+        # The rerun only reminds the customer whose digest never went out
+        self.assertEqual(tasks.send_payment_reminders(), 1)
+        self.assertEqual(mail.outbox[1].to, ['bikash@example.com'])
@@ -0,0 +1,92 @@
+import time
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITransactionTestCase
+
+from api import routers
+from api.conditional import _version_key
+from api.models import Category, Product
+
+
+@override_settings(REPLICA_DATABASES=['replica_1'])
+class ReplicaRoutingTests(APITransactionTestCase):
+    # A mirror only sees committed rows, hence a TransactionTestCase
+    databases = {'default', 'replica_1'}
+
+    def setUp(self):
+        cache.clear()
+        self.reset_health()
+        self.addCleanup(self.reset_health)
+        self.user = User.objects.create_user('shop', 'shop@example.com', 'password')
+        self.client.force_authenticate(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer shop-token')
+        category = Category.objects.create(name='Grocery', slug='grocery')
+        self.product = Product.objects.create(user=self.user, product_name='Rice', category=category,
+                                              unit_price='120.00', quantity=10)
+        self.age_product_version()
+
+    def age_product_version(self):
+        """Date the last product change back past REPLICA_PIN_SECONDS, so the replica has caught up with it."""
+        cache.set(_version_key('product', self.user.pk), time.time_ns() - 60 * 10 ** 9)
+
+    @staticmethod
+    def reset_health():
+        routers._replica_checked_at.clear()
+        routers._replica_healthy.clear()
+
+    def get_products(self):
+        with CaptureQueriesContext(connections['replica_1']) as replica:
+            response = self.client.get('/api/products/')
+        self.assertEqual(response.status_code, 200)
+        return len(replica)
+
+    def test_safe_requests_read_from_the_replica(self):
+        self.assertGreater(self.get_products(), 0)
+
+    def test_client_is_pinned_to_the_primary_after_a_write(self):
+        response = self.client.put(f'/api/products/?id={self.product.id}', {'unit_price': '125.00'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.age_product_version()
+        self.assertEqual(self.get_products(), 0)
+
+        # Only the client that wrote is pinned
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer other-token')
+        self.assertGreater(self.get_products(), 0)
+
+    def test_conditional_reads_stay_on_the_primary_after_any_write(self):
+        # A second device of the same shop, not pinned by the first one's write
+        response = self.client.put(f'/api/products/?id={self.product.id}', {'unit_price': '125.00'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer second-device')
+
+        # The new ETag must not be handed out with rows a lagging replica
+        # still has from before the write
+        with CaptureQueriesContext(connections['replica_1']) as replica:
+            response = self.client.get('/api/products/')
+        self.assertEqual(len(replica), 0)
+        self.assertEqual(response.data['results'][0]['unit_price'], '125.00')
+
+        self.age_product_version()
+        self.assertGreater(self.get_products(), 0)
+
+    def test_unhealthy_replica_falls_back_to_the_primary(self):
+        with mock.patch.object(routers, '_check_replica', return_value=False) as check:
+            self.assertEqual(self.get_products(), 0)
+            self.assertEqual(self.get_products(), 0)
+        # Checked once per REPLICA_HEALTH_CHECK_INTERVAL, not per query
+        check.assert_called_once_with('replica_1')
+
+    def test_router_keeps_writes_and_transactions_on_the_primary(self):
+        router = routers.ReplicaRouter()
+        self.assertEqual(router.db_for_read(Product), DEFAULT_DB_ALIAS)
+        with routers.use_replica():
+            self.assertEqual(router.db_for_read(Product), 'replica_1')
+            self.assertEqual(router.db_for_write(Product), DEFAULT_DB_ALIAS)
+            with transaction.atomic():
+                self.assertEqual(router.db_for_read(Product), DEFAULT_DB_ALIAS)
+        self.assertFalse(router.allow_migrate('replica_1', 'api'))
@@ -0,0 +1,91 @@
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api.models import Billing, Category, Customer, Party, Product
+from api.search import index_billings, reindex_party_billings, search_billings
+
+
+class BillingSearchTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('shop', 'shop@example.com', 'password')
+        self.client.force_authenticate(self.user)
+        category = Category.objects.create(name='Grocery', slug='grocery')
+        self.product = Product.objects.create(user=self.user, product_name='Rice', category=category,
+                                              unit_price=Decimal('10.00'), quantity=100)
+        self.asha = self.customer('Asha Traders')
+        self.bikash = self.customer('Bikash Stores')
+
+    def customer(self, name):
+        party = Party.objects.create(Category_type='Customer')
+        Customer.objects.create(party=party, name=name)
+        return party
+
+    def create_billing(self, number, party, invoice_date, invoice_status='Unpaid', **data):
+        response = self.client.post('/api/billing/', {
+            'invoice_number': number, 'party': party.id, 'invoice_date': invoice_date.isoformat(),
+            'invoice_status': invoice_status,
+            'items': [{'item': self.product.id, 'quantity': 1, 'rate': '10.00'}], **data,
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        return Billing.objects.get(invoice_number=number)
+
+    def search(self, **params):
+        response = self.client.get('/api/billing/search/', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        return [row['invoice_number'] for row in response.data['results']]
+
+    def test_matches_by_invoice_number_with_the_exact_number_first(self):
+        self.create_billing('INV-1001', self.asha, date(2026, 3, 2))
+        self.create_billing('INV-100', self.bikash, date(2026, 3, 1))
+        self.create_billing('INV-2000', self.asha, date(2026, 3, 3))
+
+        self.assertEqual(self.search(q='INV-100'), ['INV-100', 'INV-1001'])
+        self.assertEqual(self.search(q='inv-2000'), ['INV-2000'])
+
+    def test_matches_by_customer_name_on_every_word(self):
+        self.create_billing('INV-1', self.asha, date(2026, 3, 1))
+        self.create_billing('INV-2', self.bikash, date(2026, 3, 2))
+        self.create_billing('INV-3', self.asha, date(2026, 3, 3), notes='Bikash collected')
+
+        self.assertEqual(self.search(q='asha'), ['INV-3', 'INV-1'])
+        self.assertEqual(self.search(q='bikash'), ['INV-3', 'INV-2'])
+        self.assertEqual(self.search(q='asha bikash'), ['INV-3'])
+
+    def test_status_and_dates_narrow_the_matches(self):
+        self.create_billing('INV-1', self.asha, date(2026, 2, 28), 'Unpaid')
+        self.create_billing('INV-2', self.asha, date(2026, 3, 1), 'Unpaid')
+        self.create_billing('INV-3', self.asha, date(2026, 3, 15), 'Paid', paid_amount='10.00')
+        self.create_billing('INV-4', self.asha, date(2026, 3, 31), 'Unpaid')
+        self.create_billing('INV-5', self.asha, date(2026, 4, 1), 'Unpaid')
+
+        self.assertEqual(self.search(q='asha', status='Unpaid', **{'from': '2026-03-01', 'to': '2026-03-31'}),
+                         ['INV-4', 'INV-2'])
+        self.assertEqual(self.search(q='asha', status='Paid'), ['INV-3'])
+        self.assertEqual(self.search(q='asha', **{'from': '2026-04-01'}), ['INV-5'])
+
+    def test_other_users_invoices_are_not_searched(self):
+        self.create_billing('INV-1', self.asha, date(2026, 3, 1))
+        other = User.objects.create_user('other', 'other@example.com', 'password')
+        billing = Billing.objects.create(user=other, party=self.asha, invoice_number='INV-9')
+        index_billings(Billing.objects.filter(pk=billing.pk))
+
+        self.assertEqual(self.search(q='asha'), ['INV-1'])
+
+    def test_renamed_customer_is_found_under_the_new_name(self):
+        billing = self.create_billing('INV-1', self.asha, date(2026, 3, 1))
+        Customer.objects.filter(party=self.asha).update(name='Chandra Mart')
+
+        reindex_party_billings({'party_id': self.asha.id})
+
+        billings = Billing.objects.filter(user=self.user)
+        self.assertEqual(list(search_billings(billings, 'chandra')), [billing])
+        self.assertFalse(search_billings(billings, 'asha').exists())
+
+    def test_bad_queries_are_rejected(self):
+        for params in ({'q': 'as'}, {'q': 'asha', 'status': 'Lost'}, {'q': 'asha', 'from': '01/03/2026'}):
+            response = self.client.get('/api/billing/search/', params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
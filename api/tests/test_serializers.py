@@ -0,0 +1,148 @@
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api.models import (Billing, BillingItem, Category, Customer, Expense, Party, Product, PurchaseBill,
+                        PurchaseBillItem, RecurringBilling, RecurringBillingItem, RecurringExpense, Supplier)
+from api.serializers import (BillingItemSerializer, BillingSerializer, CustomerSerializer, ExpenseSerializer,
+                             PartySerializer, ProductSerializer, PurchaseBillItemSerializer, PurchaseBillSerializer,
+                             RecurringBillingItemSerializer, RecurringBillingSerializer, RecurringExpenseSerializer,
+                             SupplierSerializer)
+
+
+class FlatReadParityTests(APITestCase):
+    """Every list endpoint renders exactly what its ModelSerializer would."""
+
+    def setUp(self):
+        self.user = User.objects.create_user('shop', 'shop@example.com', 'password')
+        self.client.force_authenticate(self.user)
+        category = Category.objects.create(name='Grocery', slug='grocery')
+        self.rice = Product.objects.create(user=self.user, product_name='Rice', category=category, sku='RICE',
+                                           unit_price=Decimal('12.5'), quantity=40, reorder_level=5,
+                                           average_cost=Decimal('9.1235'), description='Long grain')
+        self.oil = Product.objects.create(user=self.user, product_name='Oil', category=category, sku='OIL',
+                                          unit_price=Decimal('210'), quantity=0)
+
+        customer_party = Party.objects.create(Category_type='Customer')
+        self.customer = Customer.objects.create(party=customer_party, name='Asha', email='asha@example.com')
+        supplier_party = Party.objects.create(Category_type='Supplier')
+        self.supplier = Supplier.objects.create(party=supplier_party, name='Wholesaler', code='WS-1')
+
+        Expense.objects.create(user=self.user, category='Utilities', amount=Decimal('99.9'),
+                               date=date(2026, 3, 1), is_necessary=False)
+        Expense.objects.create(user=self.user, category='Rent', amount=Decimal('1500'), date=date(2026, 3, 2))
+
+        billing = Billing.objects.create(user=self.user, party=customer_party, invoice_number='INV-1',
+                                         invoice_date=date(2026, 3, 5), due_date=date(2026, 3, 20),
+                                         invoice_status='Unpaid', payment_method='Cash',
+                                         discount=Decimal('2.5'), tax=Decimal('3.25'), paid_amount=Decimal('10'))
+        BillingItem.objects.create(billing=billing, item=self.rice, quantity=3, rate=Decimal('12.5'),
+                                   discount_percentage=Decimal('1.5'))
+        Billing.objects.create(user=self.user, invoice_number='INV-2')
+
+        bill = PurchaseBill.objects.create(user=self.user, supplier=self.supplier, bill_number='PB-1',
+                                           bill_date=date(2026, 2, 28), total_amount=Decimal('91.24'),
+                                           due_amount=Decimal('91.24'))
+        PurchaseBillItem.objects.create(purchase_bill=bill, product=self.rice, quantity=10,
+                                        unit_cost=Decimal('9.124'), total_cost=Decimal('91.24'))
+
+        template = RecurringBilling.objects.create(user=self.user, party=customer_party, frequency='quarterly',
+                                                   start_date=date(2026, 1, 31), next_run_date=date(2026, 4, 30),
+                                                   due_days=15, discount=Decimal('1'), tax=Decimal('0.5'))
+        RecurringBillingItem.objects.create(template=template, item=self.oil, quantity=2, rate=Decimal('210'))
+        RecurringExpense.objects.create(user=self.user, category='Rent', amount=Decimal('1500'),
+                                        start_date=date(2026, 1, 1), next_run_date=date(2026, 4, 1),
+                                        end_date=date(2026, 12, 31))
+
+    def list(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return sorted(response.json()['results'], key=lambda row: row['id'])
+
+    def expected(self, serializer_class, queryset):
+        return [dict(row) for row in serializer_class(queryset.order_by('id'), many=True).data]
+
+    def test_products(self):
+        self.assertEqual(self.list('/api/products/'),
+                         self.expected(ProductSerializer, Product.objects.filter(user=self.user)))
+
+    def test_parties(self):
+        self.assertEqual(self.list('/api/parties/'), self.expected(PartySerializer, Party.objects.all()))
+
+    def test_party_details(self):
+        for party, serializer_class, key in ((self.customer.party, CustomerSerializer, 'customer'),
+                                             (self.supplier.party, SupplierSerializer, 'supplier')):
+            response = self.client.get('/api/parties/', {'id': party.id})
+            self.assertEqual(response.json()[key], dict(serializer_class(getattr(party, key.capitalize())).data))
+
+    def test_expenses(self):
+        self.assertEqual(self.list('/api/expenses/'),
+                         self.expected(ExpenseSerializer, Expense.objects.filter(user=self.user)))
+
+    def test_billings_with_their_items(self):
+        billings = self.list('/api/billing/', expand='items')
+        items = [billing.pop('items') for billing in billings]
+
+        self.assertEqual(billings, self.expected(BillingSerializer, Billing.objects.filter(user=self.user)))
+        self.assertEqual(items, [self.expected(BillingItemSerializer, BillingItem.objects.filter(billing_id=row['id']))
+                                 for row in billings])
+
+    def test_purchase_bills_with_their_items(self):
+        bill = PurchaseBill.objects.get()
+        self.assertEqual(self.list('/api/purchase-bills/'),
+                         self.expected(PurchaseBillSerializer, PurchaseBill.objects.all()))
+
+        detail = self.client.get('/api/purchase-bills/', {'id': bill.id}).json()
+        self.assertEqual(detail.pop('items'), self.expected(PurchaseBillItemSerializer, bill.items.all()))
+        self.assertEqual(detail, dict(PurchaseBillSerializer(bill).data))
+
+    def test_recurring_billings_with_their_items(self):
+        templates = self.list('/api/recurring/billing/', expand='items')
+        items = [template.pop('items') for template in templates]
+
+        self.assertEqual(templates, self.expected(RecurringBillingSerializer, RecurringBilling.objects.all()))
+        self.assertEqual(items, [self.expected(RecurringBillingItemSerializer,
+                                               RecurringBillingItem.objects.filter(template_id=row['id']))
+                                 for row in templates])
+
+    def test_recurring_expenses(self):
+        self.assertEqual(self.list('/api/recurring/expenses/'),
+                         self.expected(RecurringExpenseSerializer, RecurringExpense.objects.all()))
+
+
+class SparseFieldsetTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('shop', 'shop@example.com', 'password')
+        self.client.force_authenticate(self.user)
+        category = Category.objects.create(name='Grocery', slug='grocery')
+        self.product = Product.objects.create(user=self.user, product_name='Rice', category=category, sku='RICE',
+                                              unit_price=Decimal('12.5'), quantity=40)
+        party = Party.objects.create(Category_type='Customer')
+        self.customer = Customer.objects.create(party=party, name='Asha', phone_no='9800000000')
+
+    def test_only_the_requested_fields_and_the_id_are_returned(self):
+        response = self.client.get('/api/products/', {'fields': 'product_name,unit_price'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['results'],
+                         [{'id': self.product.id, 'product_name': 'Rice', 'unit_price': '12.50'}])
+
+    def test_nested_fields_narrow_the_nested_object(self):
+        response = self.client.get('/api/parties/', {'id': self.customer.party_id,
+                                                     'fields': 'Category_type,customer.name'})
+
+        self.assertEqual(response.json(), {'id': self.customer.party_id, 'Category_type': 'Customer',
+                                           'customer': {'id': self.customer.id, 'name': 'Asha'}})
+
+    def test_unknown_field_is_rejected(self):
+        for url in ('/api/products/', '/api/billing/', '/api/expenses/'):
+            response = self.client.get(url, {'fields': 'id,secret'})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, url)
+            self.assertIn('secret', str(response.json()['fields']))
+
+    def test_excluded_fields_cannot_be_requested(self):
+        response = self.client.get('/api/billing/', {'fields': 'search_document'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
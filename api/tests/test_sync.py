@@ -0,0 +1,71 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api.models import ChangeLog, Expense
+from api.sync import SYNC_SETTLE_TIME
+
+
+class DeltaSyncTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('shop', 'shop@example.com', 'password')
+        self.client.force_authenticate(self.user)
+
+    def expense(self, user=None, amount='500.00'):
+        return Expense.objects.create(user=user or self.user, category='Rent', amount=Decimal(amount),
+                                      date=date(2026, 10, 1))
+
+    def settle(self):
+        ChangeLog.objects.update(created_at=timezone.now() - SYNC_SETTLE_TIME - timedelta(seconds=1))
+
+    def sync(self, since=0, **params):
+        response = self.client.get('/api/sync/', {'since': since, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_changes_are_held_back_until_they_settle(self):
+        self.expense()
+        data = self.sync()
+        self.assertEqual(data['changes']['expense'], [])
+        self.assertEqual(data['next'], 0)
+
+        self.settle()
+        data = self.sync()
+        self.assertEqual([row['amount'] for row in data['changes']['expense']], ['500.00'])
+        self.assertGreater(data['next'], 0)
+
+    def test_pages_follow_the_token(self):
+        expenses = [self.expense(amount=amount) for amount in ('1.00', '2.00', '3.00')]
+        self.expense(user=User.objects.create_user('other', 'other@example.com', 'password'))
+        self.settle()
+
+        first = self.sync(limit=2)
+        self.assertTrue(first['has_more'])
+        second = self.sync(first['next'], limit=2)
+        self.assertFalse(second['has_more'])
+        synced = [row['id'] for page in (first, second) for row in page['changes']['expense']]
+        # Every change of this shop exactly once, and none of the other shop's
+        self.assertEqual(synced, [expense.id for expense in expenses])
+        self.assertEqual(self.sync(second['next'])['changes']['expense'], [])
+
+    def test_deleted_rows_come_back_as_tombstones(self):
+        kept, removed = self.expense(), self.expense()
+        removed.amount = Decimal('600.00')
+        removed.save()
+        removed_id = removed.id
+        response = self.client.delete(f'/api/expenses/?id={removed_id}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.settle()
+
+        data = self.sync()
+        self.assertEqual([row['id'] for row in data['changes']['expense']], [kept.id])
+        # Created, edited and deleted in the same window: reported once, as deleted
+        self.assertEqual(data['deleted']['expense'], [removed_id])
+
+    def test_invalid_token_is_rejected(self):
+        self.assertEqual(self.client.get('/api/sync/', {'since': 'abc'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get('/api/sync/', {'since': -1}).status_code, status.HTTP_400_BAD_REQUEST)
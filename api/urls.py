@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import SignupView, VerifySignupOtpView, VerifyLoginOtpView, ApiProductView, LoginView, ApiPartyView, ApiExpenseView, ApiBillingView, ForgetPasswordView, VerifyForgetPasswordOtpView, ResetPasswordView
+from .views import SignupView, VerifySignupOtpView, VerifyLoginOtpView, ApiProductView, LoginView, ApiPartyView, ApiExpenseView, ApiBillingView, ForgetPasswordView, VerifyForgetPasswordOtpView, ResetPasswordView, SyncView, BatchView, InvoiceNumberBlockView, LowStockProductView, StockAsOfView, TopProductsView, StockCoverView, SlowMoversView, StockValuationView, CostOfGoodsSoldView, PurchaseBillView, PayablesAgingView, PartyStatementView, BillingSearchView, DashboardView, RecurringBillingView, RecurringExpenseView, CategoryView
 from rest_framework_simplejwt.views import TokenRefreshView
 
 urlpatterns = [
@@ -11,15 +11,36 @@ urlpatterns = [
 
     path('products/', ApiProductView.as_view(), name='ApiProductView'),
     path('products/<int:product_id>', ApiProductView.as_view(), name='ApiProductView'),
+    path('products/low-stock/', LowStockProductView.as_view(), name='low-stock-products'),
+    path('products/stock-as-of/', StockAsOfView.as_view(), name='stock-as-of'),
+    path('categories/', CategoryView.as_view(), name='categories'),
 
     path('parties/', ApiPartyView.as_view(), name='ApiPartyView'),
     path('parties/<int:party_id>', ApiPartyView.as_view(), name='ApiPartyView'),
+    path('parties/statement/', PartyStatementView.as_view(), name='party-statement'),
 
     path('expenses/', ApiExpenseView.as_view(), name='ApiExpenseView'),
     path('expenses/<int:expense_id>', ApiExpenseView.as_view(), name='ApiExpenseView'),
 
     path('billing/', ApiBillingView.as_view(), name='ApiBillingView'),
     path('billing/<int:billing_id>', ApiBillingView.as_view(), name='ApiBillingView'),
+    path('billing/search/', BillingSearchView.as_view(), name='billing-search'),
+    path('purchase-bills/', PurchaseBillView.as_view(), name='purchase-bills'),
+    path('payables/aging/', PayablesAgingView.as_view(), name='payables-aging'),
+    path('recurring/billing/', RecurringBillingView.as_view(), name='recurring-billing'),
+    path('recurring/expenses/', RecurringExpenseView.as_view(), name='recurring-expenses'),
+    path('invoice-numbers/blocks/', InvoiceNumberBlockView.as_view(), name='invoice-number-blocks'),
+
+    path('sync/', SyncView.as_view(), name='sync'),
+    path('batch/', BatchView.as_view(), name='batch'),
+
+    path('dashboard/', DashboardView.as_view(), name='dashboard'),
+
+    path('analytics/top-products/', TopProductsView.as_view(), name='analytics-top-products'),
+    path('analytics/stock-cover/', StockCoverView.as_view(), name='analytics-stock-cover'),
+    path('analytics/slow-movers/', SlowMoversView.as_view(), name='analytics-slow-movers'),
+    path('analytics/valuation/', StockValuationView.as_view(), name='analytics-valuation'),
+    path('analytics/cogs/', CostOfGoodsSoldView.as_view(), name='analytics-cogs'),
 
     path('forget-password/', ForgetPasswordView.as_view(), name='forget-password'),
     path('verify-forget-password-otp/', VerifyForgetPasswordOtpView.as_view(), name='verify-forget-password-otp'),
@@ -5,14 +5,39 @@ from rest_framework import status
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from django.core.mail import send_mail
 import random
-from .models import Customer, ForgetPasswordOTP, Party, Product, Supplier, UserProfile, Expense, Billing, BillingItem
-from .serializers import ProductSerializer, PartySerializer, CustomerSerializer, SupplierSerializer, ExpenseSerializer, BillingSerializer, BillingItemSerializer
+from .models import CategoryStock, ChangeLog, Customer, ForgetPasswordOTP, Party, Product, PurchaseBill, PurchaseBillItem, RecurringBilling, RecurringBillingItem, RecurringExpense, StockMovement, Supplier, UserProfile, Expense, Billing, BillingItem
+from .serializers import ProductSerializer, PartySerializer, CustomerSerializer, SupplierSerializer, ExpenseSerializer, BillingSerializer, BillingItemSerializer, ProductReadSerializer, PartyReadSerializer, CustomerReadSerializer, SupplierReadSerializer, ExpenseReadSerializer, BillingReadSerializer, BillingItemReadSerializer, PurchaseBillSerializer, PurchaseBillReadSerializer, PurchaseBillItemReadSerializer, RECURRING_FIXED_FIELDS, RecurringBillingSerializer, RecurringBillingReadSerializer, RecurringBillingItemReadSerializer, RecurringExpenseSerializer, RecurringExpenseReadSerializer
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.utils import timezone
-from datetime import timedelta
+from datetime import date, timedelta
 from rest_framework.pagination import PageNumberPagination
 from django.db import transaction
+from django.db.models import DecimalField, F, Sum, Value, Window
+from django.db.models.functions import Upper
+from django.http import StreamingHttpResponse
+from decimal import Decimal
 from .tasks import send_otp_email
+from .sync import changes_since
+from .idempotency import idempotent
+from .conditional import conditional_get
+from .outbox import publish_event
+from .inventory import cost_of_goods_sold, low_stock_products, record_movements, stock_as_of, stock_valuation
+from .purchasing import payables_aging, receive_purchase, record_purchase_payment
+from .analytics import SALES_MAX_WINDOW_DAYS, SALES_WINDOW_DAYS, products_with_velocity, sales_revenue, top_products
+from .dashboard import get_dashboard
+from .catalog import categories, move_category_stock, product_state
+from .loyalty import redeem_points, redemption_value, release_loyalty_points, sync_loyalty_points
+from .recurring import set_template_lines
+from .search import SEARCH_MIN_LENGTH, filter_billings, index_billings, search_billings
+from .invoicing import INVOICE_BLOCK_MAX_SIZE, assign_invoice_number, format_invoice_number, is_reserved_for, pending_invoice_number, release_billing_stock, reserve_invoice_block, sync_billing_items
+from django.core.handlers.wsgi import WSGIRequest
+from django.urls import reverse
+from urllib.parse import urlencode
+import io
+import logging
+import orjson
+
+logger = logging.getLogger(__name__)
 
 # OTP Expiry Time (5 minutes)
 OTP_EXPIRY_TIME = timedelta(minutes=5)
@@ -20,6 +45,133 @@ OTP_EXPIRY_TIME = timedelta(minutes=5)
 # Inactivity period after which a party is considered inactive (e.g., 90 days)
 PARTY_INACTIVITY_PERIOD = timedelta(days=90)
 
+# Change log entries returned per sync page
+SYNC_PAGE_SIZE = 500
+SYNC_MAX_PAGE_SIZE = 2000
+
+# Largest number of operations accepted by a single batch/ request
+BATCH_MAX_OPERATIONS = 500
+BATCH_METHODS = ('POST', 'PUT', 'PATCH', 'DELETE')
+
+# Longest top-N list the analytics endpoints return
+ANALYTICS_MAX_LIMIT = 100
+
+
+# -----------------------------
+# Read helpers
+# -----------------------------
+def sparse_fieldset(request, read_serializer, prefix=None):
+    """
+    Narrow ``read_serializer`` to the ``?fields=a,b,c`` sparse fieldset.
+
+    Plain names apply to the top-level object; ``prefix.name`` entries (e.g.
+    ``customer.phone_no``) apply to the nested object called ``prefix``, which
+    is returned in full when none are given.
+    """
+    fields = request.query_params.get('fields')
+    if not fields:
+        return read_serializer
+    names = [name.strip() for name in fields.split(',')]
+    if prefix is None:
+        return read_serializer.only(name for name in names if '.' not in name)
+    nested = [name[len(prefix) + 1:] for name in names if name.startswith(prefix + '.')]
+    return read_serializer.only(nested) if nested else read_serializer
+
+
+def wants_expand(request, name):
+    return name in request.query_params.get('expand', '').split(',')
+
+
+def get_detail_row(read_serializer, queryset, object_id, lookup='id'):
+    """Return the serialized row matching ``object_id`` in ``queryset``, or None."""
+    try:
+        object_id = int(object_id)
+    except (TypeError, ValueError):
+        return None
+    rows = read_serializer.to_representation(
+        read_serializer.values(queryset.filter(**{lookup: object_id})))
+    return rows[0] if rows else None
+
+
+def attach_billing_items(rows):
+    """Nest every billing's items under ``items`` using one query for all rows."""
+    items_by_billing = {row['id']: [] for row in rows}
+    items = BillingItemReadSerializer.values(BillingItem.objects.filter(billing_id__in=items_by_billing))
+    for item in BillingItemReadSerializer.to_representation(items):
+        items_by_billing[item['billing']].append(item)
+    for row in rows:
+        row['items'] = items_by_billing[row['id']]
+    return rows
+
+
+def attach_party_details(rows):
+    """Nest customer/supplier details under each party using one query per kind."""
+    rows_by_party = {row['id']: row for row in rows}
+    for key, model, read_serializer in (('customer', Customer, CustomerReadSerializer),
+                                        ('supplier', Supplier, SupplierReadSerializer)):
+        details = read_serializer.values(model.objects.filter(party_id__in=rows_by_party))
+        for detail in read_serializer.to_representation(details):
+            rows_by_party[detail['party']][key] = detail
+    return rows
+
+
+# -----------------------------
+# Optimistic concurrency helpers
+# -----------------------------
+def expected_version(request):
+    """
+    Version the client's edit is based on, from an ``If-Match: "<version>"``
+    header or a ``version`` field in the body.
+
+    Returns None when neither is sent (or for ``If-Match: *``), in which case
+    the version read at the start of the request is used. The ETag of a
+    detail GET, ``"<version>.<digest>"``, is accepted as is. A value that is
+    not a version, such as the weak ETag of a list GET, is returned as 0,
+    which never matches.
+    """
+    value = request.headers.get('If-Match')
+    if value is None:
+        value = request.data.get('version') if hasattr(request.data, 'get') else None
+    if value is None or str(value).strip() == '*':
+        return None
+    try:
+        return int(str(value).strip().removeprefix('W/').strip('"').partition('.')[0])
+    except ValueError:
+        return 0
+
+
+def version_etag(version):
+    return f'"{version}"'
+
+
+def stale_write_response(name):
+    return Response({'error': f'This {name} was changed by someone else. Reload it and try again.'},
+                    status=status.HTTP_412_PRECONDITION_FAILED)
+
+
+def users_with_email(email):
+    """
+    Users whose email is ``email``, ignoring case.
+
+    Compared as UPPER(email) = UPPER(%s), the expression of
+    ``auth_user_email_upper_idx``, so every backend can use the index;
+    ``iexact`` is a LIKE on SQLite, which cannot.
+    """
+    return User.objects.alias(email_upper=Upper('email')).filter(email_upper=Upper(Value(email)))
+
+
+def get_user_by_email(email):
+    """
+    The user with ``email``, ignoring case, or raise User.DoesNotExist.
+
+    Accounts created before sign-up lower-cased emails may differ only in
+    case; the exact match wins then.
+    """
+    users = list(users_with_email(email)) if email else []
+    if not users:
+        raise User.DoesNotExist
+    return next((user for user in users if user.email == email), users[0])
+
 # -----------------------------
 # Signup View
 # -----------------------------
@@ -71,7 +223,7 @@ class VerifySignupOtpView(APIView):
         otp_provided = request.data.get('otp', '').strip()
 
         try:
-            user = User.objects.get(email=email.lower())
+            user = get_user_by_email(email.lower())
             user_profile = user.profile
         except User.DoesNotExist:
             return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
@@ -107,7 +259,7 @@ class LoginView(APIView):
         password = request.data.get('password')
 
         try:
-            user = User.objects.get(email=email)
+            user = get_user_by_email(email)
             if not user.check_password(password):
                 return Response({'error': 'Invalid credentials'}, status=status.HTTP_401_UNAUTHORIZED)
         except User.DoesNotExist:
@@ -139,7 +291,7 @@ class VerifyLoginOtpView(APIView):
         otp_provided = request.data.get('otp', '').strip()
 
         try:
-            user = User.objects.get(email=email)
+            user = get_user_by_email(email)
             user_profile = user.profile
         except User.DoesNotExist:
             return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
@@ -178,13 +330,22 @@ class VerifyLoginOtpView(APIView):
 class ApiProductView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @conditional_get('product', versioned=Product)
     def get(self, request, *args, **kwargs):
+        read_serializer = sparse_fieldset(request, ProductReadSerializer)
+        products = Product.objects.filter(user=request.user)
+
+        product_id = request.query_params.get('id')
+        if product_id:
+            product = get_detail_row(read_serializer, products, product_id)
+            if product is None:
+                return Response({'error': 'Product not found'}, status=status.HTTP_404_NOT_FOUND)
+            return Response(product, status=status.HTTP_200_OK)
+
         paginator = PageNumberPagination()
         paginator.page_size = 10
-        products = Product.objects.filter(user=request.user)
-        result_page = paginator.paginate_queryset(products, request)
-        serializer = ProductSerializer(result_page, many=True)
-        return paginator.get_paginated_response(serializer.data)
+        result_page = paginator.paginate_queryset(read_serializer.values(products), request)
+        return paginator.get_paginated_response(read_serializer.to_representation(result_page))
 
     def post(self, request, *args, **kwargs):
         product_data = request.data.copy()
@@ -195,7 +356,11 @@ class ApiProductView(APIView):
 
         serializer = ProductSerializer(data=product_data)
         if serializer.is_valid():
-            serializer.save()
+            with transaction.atomic():
+                product = serializer.save()
+                # Opening stock is the product's first ledger entry
+                record_movements(request.user, {product.id: product.quantity}, StockMovement.ADJUSTMENT)
+                move_category_stock(request.user.id, after=product_state(product))
             return Response({'message': 'Product created successfully!',
                              'product': serializer.data}, status=status.HTTP_201_CREATED)
         else:
@@ -223,9 +388,24 @@ class ApiProductView(APIView):
         serializer = ProductSerializer(
             product, data=request.data, partial=True)
         if serializer.is_valid():
-            serializer.save()
-            return Response({'message': 'Product updated successfully!',
-                             'product': serializer.data}, status=status.HTTP_200_OK)
+            # Refuse the write if the product changed since the client (or
+            # this request) read it, e.g. a sale took stock out in between
+            with transaction.atomic():
+                if not product.claim_version(expected_version(request)):
+                    return stale_write_response('product')
+                # The client's version may be newer than the row loaded above;
+                # edit the locked row as it is now, not as it was then
+                product.refresh_from_db()
+                previous_quantity = product.quantity
+                previous_state = product_state(product)
+                serializer.save()
+                record_movements(request.user, {product.id: product.quantity - previous_quantity},
+                                 StockMovement.ADJUSTMENT)
+                move_category_stock(request.user.id, previous_state, product_state(product))
+            response = Response({'message': 'Product updated successfully!',
+                                 'product': serializer.data}, status=status.HTTP_200_OK)
+            response['ETag'] = version_etag(product.version)
+            return response
         else:
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -241,33 +421,114 @@ class ApiProductView(APIView):
         except Product.DoesNotExist:
             return Response({'error': 'Product not found or you do not have permission to delete it.'}, status=status.HTTP_404_NOT_FOUND)
 
-        product.delete()
+        with transaction.atomic():
+            # Locked so the counters lose exactly what a concurrent sale left
+            product = Product.objects.select_for_update().get(pk=product.pk)
+            move_category_stock(request.user.id, before=product_state(product))
+            product.delete()
         return Response({'message': 'Product deleted successfully!'}, status=status.HTTP_200_OK)
 
 
+class CategoryView(APIView):
+    """
+    ``GET categories/`` - every category with the user's product count,
+    units in stock and stock value in it, read from maintained counters.
+    """
+    permission_classes = [IsAuthenticated]
+
+    @conditional_get('product', shared_entities=('category',))
+    def get(self, request, *args, **kwargs):
+        paginator = PageNumberPagination()
+        paginator.page_size = 10
+        result_page = paginator.paginate_queryset(list(categories().values()), request)
+        counters = {
+            category_id: (products, quantity, value)
+            for category_id, products, quantity, value in CategoryStock.objects
+            .filter(user=request.user, category_id__in=[category.pk for category in result_page])
+            .values_list('category_id', 'product_count', 'quantity', 'stock_value')
+        }
+        rows = []
+        for category in result_page:
+            products, quantity, value = counters.get(category.pk, (0, 0, Decimal('0')))
+            rows.append({'id': category.pk, 'name': category.name, 'slug': category.slug,
+                         'products': products, 'quantity': quantity,
+                         'stock_value': str(value.quantize(Decimal('0.01')))})
+        return paginator.get_paginated_response(rows)
+
+
+class LowStockProductView(APIView):
+    """Products at or below their reorder level, served from a partial index."""
+    permission_classes = [IsAuthenticated]
+
+    @conditional_get('product')
+    def get(self, request, *args, **kwargs):
+        read_serializer = sparse_fieldset(request, ProductReadSerializer)
+        products = low_stock_products(request.user).order_by('id')
+
+        paginator = PageNumberPagination()
+        paginator.page_size = 10
+        result_page = paginator.paginate_queryset(read_serializer.values(products), request)
+        return paginator.get_paginated_response(read_serializer.to_representation(result_page))
+
+
+class StockAsOfView(APIView):
+    """``GET products/stock-as-of/?date=YYYY-MM-DD`` - stock at the end of a past day."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        try:
+            day = date.fromisoformat(request.query_params.get('date', ''))
+        except ValueError:
+            return Response({'error': 'date must be YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+
+        products = Product.objects.filter(user=request.user).order_by('id')
+        product_id = request.query_params.get('id')
+        if product_id:
+            if not product_id.isdigit():
+                return Response({'error': 'Invalid Product ID'}, status=status.HTTP_400_BAD_REQUEST)
+            products = products.filter(id=product_id)
+
+        paginator = PageNumberPagination()
+        paginator.page_size = 10
+        result_page = paginator.paginate_queryset(products.values('id', 'product_name'), request)
+        quantities = stock_as_of(Product.objects.filter(id__in=[row['id'] for row in result_page]), day)
+        for row in result_page:
+            row['quantity'] = quantities[row['id']]
+        return paginator.get_paginated_response(result_page)
+
+
+# Customer fields a party PUT can change
+CUSTOMER_EDITABLE_FIELDS = ['name', 'email', 'phone_no', 'address', 'Customer_code', 'open_balance',
+                            'credit_limmit', 'preferred_payment_method', 'referred_by', 'notes']
+
+
 class ApiPartyView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @conditional_get('party', shared=True, versioned=Customer, lookup='party_id')
     def get(self, request, *args, **kwargs):
         party_id = request.query_params.get('id')
         category_type = request.query_params.get('category_type')
 
+        read_serializer = sparse_fieldset(request, PartyReadSerializer)
+
         if party_id:
-            try:
-                party = Party.objects.get(id=party_id)
-                serializer = PartySerializer(party)
-                # Include related customer/supplier data
-                response_data = serializer.data
-                if hasattr(party, 'Customer'):
-                    response_data['customer'] = CustomerSerializer(
-                        party.Customer).data
-                elif hasattr(party, 'Supplier'):
-                    response_data['supplier'] = SupplierSerializer(
-                        party.Supplier).data
-                return Response(response_data, status=status.HTTP_200_OK)
-            except Party.DoesNotExist:
+            response_data = get_detail_row(read_serializer, Party.objects.all(), party_id)
+            if response_data is None:
                 return Response({'error': 'Party not found'}, status=status.HTTP_404_NOT_FOUND)
 
+            # Include related customer/supplier data
+            customer = get_detail_row(sparse_fieldset(request, CustomerReadSerializer, 'customer'),
+                                      Customer.objects.all(), party_id, lookup='party_id')
+            if customer is not None:
+                response_data['customer'] = customer
+            else:
+                supplier = get_detail_row(sparse_fieldset(request, SupplierReadSerializer, 'supplier'),
+                                          Supplier.objects.all(), party_id, lookup='party_id')
+                if supplier is not None:
+                    response_data['supplier'] = supplier
+            return Response(response_data, status=status.HTTP_200_OK)
+
         # Filter by category type if provided
         if category_type:
             parties = Party.objects.filter(Category_type=category_type)
@@ -276,10 +537,10 @@ class ApiPartyView(APIView):
 
         paginator = PageNumberPagination()
         paginator.page_size = 10
-        result_page = paginator.paginate_queryset(parties, request)
-        serializer = PartySerializer(result_page, many=True)
-        return paginator.get_paginated_response(serializer.data)
+        result_page = paginator.paginate_queryset(read_serializer.values(parties), request)
+        return paginator.get_paginated_response(read_serializer.to_representation(result_page))
 
+    @idempotent
     def post(self, request, *args, **kwargs):
         data = request.data
         category = data.get('Category_type')
@@ -359,6 +620,7 @@ class ApiPartyView(APIView):
                 Category_type=category,
                 is_active=data.get('is_active', True)
             )
+            publish_event('party.created', party_id=party.id, category=category)
 
             # Branching Logic based on the Category
             if category == 'Customer':
@@ -373,7 +635,7 @@ class ApiPartyView(APIView):
                     credit_limmit=data.get('credit_limmit', 0.0),
                     preferred_payment_method=data.get(
                         'preferred_payment_method'),
-                    loyalty_points=data.get('loyalty_points', 0),
+                    # loyalty_points starts at zero and only moves with paid invoices, see api.loyalty
                     referred_by=data.get('referred_by'),
                     notes=data.get('notes', ''),
                 )
@@ -412,36 +674,46 @@ class ApiPartyView(APIView):
         # Update related customer or supplier
         if party.Category_type == 'Customer' and hasattr(party, 'Customer'):
             customer = party.Customer
-            customer.name = data.get('name', customer.name)
-            customer.email = data.get('email', customer.email)
-            customer.phone_no = data.get('phone_no', customer.phone_no)
-            customer.address = data.get('address', customer.address)
-            customer.Customer_code = data.get(
-                'Customer_code', customer.Customer_code)
-            customer.open_balance = data.get(
-                'open_balance', customer.open_balance)
-            customer.credit_limmit = data.get(
-                'credit_limmit', customer.credit_limmit)
-            customer.preferred_payment_method = data.get(
-                'preferred_payment_method', customer.preferred_payment_method)
-            customer.loyalty_points = data.get(
-                'loyalty_points', customer.loyalty_points)
-            customer.referred_by = data.get(
-                'referred_by', customer.referred_by)
-            customer.notes = data.get('notes', customer.notes)
-            customer.save()
-
-            return Response({
+            with transaction.atomic():
+                if not customer.claim_version(expected_version(request)):
+                    return stale_write_response('customer')
+                # Unsent fields keep the values of the locked row, not of the
+                # one loaded before the claim
+                customer.refresh_from_db()
+                customer.name = data.get('name', customer.name)
+                customer.email = data.get('email', customer.email)
+                customer.phone_no = data.get('phone_no', customer.phone_no)
+                customer.address = data.get('address', customer.address)
+                customer.Customer_code = data.get(
+                    'Customer_code', customer.Customer_code)
+                customer.open_balance = data.get(
+                    'open_balance', customer.open_balance)
+                customer.credit_limmit = data.get(
+                    'credit_limmit', customer.credit_limmit)
+                customer.preferred_payment_method = data.get(
+                    'preferred_payment_method', customer.preferred_payment_method)
+                customer.referred_by = data.get(
+                    'referred_by', customer.referred_by)
+                customer.notes = data.get('notes', customer.notes)
+                # loyalty_points is left out: it only moves with F() updates from api.loyalty
+                customer.save(update_fields=CUSTOMER_EDITABLE_FIELDS)
+                publish_event('party.updated', party_id=party.id, category=party.Category_type)
+
+            response = Response({
                 'message': 'Customer updated successfully!',
                 'party': PartySerializer(party).data,
                 'customer': CustomerSerializer(customer).data
             }, status=status.HTTP_200_OK)
+            response['ETag'] = version_etag(customer.version)
+            return response
 
         elif party.Category_type == 'Supplier' and hasattr(party, 'Supplier'):
             supplier = party.Supplier
             supplier.name = data.get('name', supplier.name)
             supplier.code = data.get('code', supplier.code)
-            supplier.save()
+            with transaction.atomic():
+                supplier.save()
+                publish_event('party.updated', party_id=party.id, category=party.Category_type)
 
             return Response({
                 'message': 'Supplier updated successfully!',
@@ -466,21 +738,110 @@ class ApiPartyView(APIView):
         except Party.DoesNotExist:
             return Response({'error': 'Party not found'}, status=status.HTTP_404_NOT_FOUND)
 
-        party.delete()
+        with transaction.atomic():
+            publish_event('party.deleted', party_id=party.id, category=party.Category_type)
+            party.delete()
         return Response({'message': 'Party deleted successfully!'}, status=status.HTTP_200_OK)
 
 
+# Statement rows fetched per round trip while streaming
+STATEMENT_CHUNK_SIZE = 500
+
+
+class PartyStatementView(APIView):
+    """
+    ``GET parties/statement/?id=<party>&from=YYYY-MM-DD&to=YYYY-MM-DD``
+
+    The opening balance, then every invoice in the range (debit the total,
+    credit the amount paid) with its running balance, then the closing
+    balance. The running balance is a window function in the database and
+    the rows are streamed, so parties with thousands of invoices are never
+    held in memory.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        party_id = request.query_params.get('id', '')
+        if not party_id.isdigit():
+            return Response({'error': 'Party ID is required'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            start = request.query_params.get('from')
+            start = date.fromisoformat(start) if start else None
+            end = request.query_params.get('to')
+            end = date.fromisoformat(end) if end else None
+        except ValueError:
+            return Response({'error': 'from and to must be YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+
+        party = Party.objects.filter(id=party_id).first()
+        if party is None:
+            return Response({'error': 'Party not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        amount_field = DecimalField(max_digits=14, decimal_places=2)
+        outstanding = Sum(F('total_amount') - F('paid_amount'), output_field=amount_field)
+        billings = Billing.objects.filter(user=request.user, party=party)
+
+        opening = Decimal(str(Customer.objects.filter(party=party).values_list('open_balance', flat=True).first() or 0))
+        if start:
+            opening += billings.filter(invoice_date__lt=start).aggregate(total=outstanding)['total'] or 0
+            billings = billings.filter(invoice_date__gte=start)
+        opening = opening.quantize(Decimal('0.01'))
+        if end:
+            billings = billings.filter(invoice_date__lte=end)
+
+        order = (F('invoice_date').asc(nulls_first=True), F('id').asc())
+        entries = (billings
+                   .annotate(running=Window(outstanding, order_by=order))
+                   .order_by(*order)
+                   .values_list('id', 'invoice_number', 'invoice_date', 'due_date', 'invoice_status',
+                                'total_amount', 'paid_amount', 'running'))
+
+        header = {'party': party.id, 'from': start, 'to': end, 'opening_balance': str(opening)}
+        return StreamingHttpResponse(self.stream(header, opening, entries), content_type='application/json')
+
+    @staticmethod
+    def stream(header, opening, entries):
+        cents = Decimal('0.01')
+        yield orjson.dumps(header)[:-1] + b',"entries":['
+        balance = opening
+        separator = b''
+        for row_id, number, invoice_date, due_date, invoice_status, debit, credit, running in entries.iterator(
+                chunk_size=STATEMENT_CHUNK_SIZE):
+            balance = (opening + running).quantize(cents)
+            yield separator + orjson.dumps({
+                'id': row_id,
+                'invoice_number': number,
+                'invoice_date': invoice_date,
+                'due_date': due_date,
+                'invoice_status': invoice_status,
+                'debit': str(debit),
+                'credit': str(credit),
+                'balance': str(balance),
+            })
+            separator = b','
+        yield b'],"closing_balance":' + orjson.dumps(str(balance)) + b'}'
+
+
 class ApiExpenseView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @conditional_get('expense')
     def get(self, request, *args, **kwargs):
+        read_serializer = sparse_fieldset(request, ExpenseReadSerializer)
+        expenses = Expense.objects.filter(user=request.user)
+
+        expense_id = request.query_params.get('id')
+        if expense_id:
+            expense = get_detail_row(read_serializer, expenses, expense_id)
+            if expense is None:
+                return Response({'error': 'Expense not found'}, status=status.HTTP_404_NOT_FOUND)
+            return Response(expense, status=status.HTTP_200_OK)
+
         paginator = PageNumberPagination()
         paginator.page_size = 10
-        expenses = Expense.objects.filter(user=request.user)
-        result_page = paginator.paginate_queryset(expenses, request)
-        serializer = ExpenseSerializer(result_page, many=True)
-        return paginator.get_paginated_response(serializer.data)
+        result_page = paginator.paginate_queryset(read_serializer.values(expenses), request)
+        return paginator.get_paginated_response(read_serializer.to_representation(result_page))
 
+    @idempotent
     def post(self, request, *args, **kwargs):
         expense_data = request.data.copy()
         expense_data['user'] = request.user.id
@@ -532,38 +893,92 @@ class ApiExpenseView(APIView):
 class ApiBillingView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @conditional_get('billing', versioned=Billing)
     def get(self, request, *args, **kwargs):
+        read_serializer = sparse_fieldset(request, BillingReadSerializer)
+        billings = Billing.objects.filter(user=request.user)
+
+        billing_id = request.query_params.get('id')
+        if billing_id:
+            billing = get_detail_row(read_serializer, billings, billing_id)
+            if billing is None:
+                return Response({'error': 'Billing not found'}, status=status.HTTP_404_NOT_FOUND)
+            if wants_expand(request, 'items'):
+                attach_billing_items([billing])
+            return Response(billing, status=status.HTTP_200_OK)
+
         paginator = PageNumberPagination()
         paginator.page_size = 10
-        billings = Billing.objects.filter(user=request.user)
-        result_page = paginator.paginate_queryset(billings, request)
-        serializer = BillingSerializer(result_page, many=True)
-        return paginator.get_paginated_response(serializer.data)
+        result_page = paginator.paginate_queryset(read_serializer.values(billings), request)
+        rows = read_serializer.to_representation(result_page)
+        if wants_expand(request, 'items'):
+            attach_billing_items(rows)
+        return paginator.get_paginated_response(rows)
     
+    @idempotent
     def post(self, request, *args, **kwargs):
         billing_data = request.data.copy()
         billing_data['user'] = request.user.id
+        # Sales reports are bucketed by invoice day, so every invoice needs one
+        if not billing_data.get('invoice_date'):
+            billing_data['invoice_date'] = timezone.localdate()
+
+        # Number the invoice on the server unless the client brings one,
+        # e.g. from a block reserved for an offline terminal
+        allocate_number = not billing_data.get('invoice_number')
+        if allocate_number:
+            billing_data['invoice_number'] = pending_invoice_number()
+        elif not is_reserved_for(request.user, billing_data['invoice_number']):
+            return Response({'error': 'This invoice number was not reserved for you.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        # Loyalty points the customer spends on this invoice, taken off as a discount
+        redeem = str(request.data.get('redeem_points') or 0)
+        if not redeem.isdigit():
+            return Response({'error': 'redeem_points must be a whole number'}, status=status.HTTP_400_BAD_REQUEST)
+        redeem = int(redeem)
+
         try:
             with transaction.atomic():
                 serializer = BillingSerializer(data=billing_data)
                 if serializer.is_valid():
-                    billing = serializer.save()
-
-                    # If there are billing items, create them
-                    items_data = request.data.pop('items', [])
+                    redemption = {}
+                    if redeem:
+                        party = serializer.validated_data.get('party')
+                        redeem_points(party.pk if party else None, redeem)
+                        redemption = {'loyalty_points_redeemed': redeem,
+                                      'discount': serializer.validated_data.get('discount', Decimal('0.00'))
+                                      + redemption_value(redeem)}
+                    billing = serializer.save(**redemption)
+
+                    # Create the billing items, take them out of stock and total the invoice
+                    items_data = request.data.get('items', [])
                     if not items_data:
+                        transaction.set_rollback(True)
                         return Response({'error': 'At least one billing item is required.'},
                                          status=status.HTTP_400_BAD_REQUEST)
-                    for item_data in items_data:
-                        item_data['billing'] = billing.id
-                        item_serializer = BillingItemSerializer(data=item_data)
-                        if item_serializer.is_valid():
-                            item_serializer.save()
-                        else:
-                            return Response(item_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+                    item_errors = sync_billing_items(billing, items_data)
+                    if item_errors:
+                        transaction.set_rollback(True)
+                        return Response(item_errors, status=status.HTTP_400_BAD_REQUEST)
+                    if redeem and billing.total_amount < 0:
+                        transaction.set_rollback(True)
+                        return Response({'error': 'The redeemed points are worth more than the invoice.'},
+                                        status=status.HTTP_400_BAD_REQUEST)
+                    sync_loyalty_points(billing, None)
+
+                    publish_event('billing.created', billing_id=billing.id, user_id=request.user.id,
+                                  invoice_date=billing.invoice_date)
+
+                    # Last statements before commit, so the counter is locked only briefly
+                    if allocate_number:
+                        assign_invoice_number(billing)
+                    index_billings(Billing.objects.filter(pk=billing.pk))
 
                     return Response({'message': 'Billing created successfully!',
-                                     'billing': BillingSerializer(billing).data}, status=status.HTTP_201_CREATED)
+                                     'billing': BillingSerializer(billing).data,
+                                     'items': attach_billing_items([{'id': billing.id}])[0]['items']},
+                                    status=status.HTTP_201_CREATED)
                 else:
                     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -585,13 +1000,48 @@ class ApiBillingView(APIView):
 
         serializer = BillingSerializer(
             billing, data=request.data, partial=True)
-        if serializer.is_valid():
-            serializer.save()
-            return Response({'message': 'Billing updated successfully!',
-                             'billing': serializer.data}, status=status.HTTP_200_OK)
-        else:
+        if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-        
+
+        try:
+            with transaction.atomic():
+                if not billing.claim_version(expected_version(request)):
+                    return stale_write_response('billing')
+                # The client's version may be newer than the row loaded above;
+                # edit the locked row as it is now, not as it was then
+                billing.refresh_from_db()
+                previous_invoice_date = billing.invoice_date
+                previous_party_id = billing.party_id
+                billing = serializer.save()
+                # A full item list replaces the invoice lines; otherwise only
+                # the header changed and the totals follow discount/tax/paid
+                if 'items' in request.data:
+                    item_errors = sync_billing_items(billing, request.data['items'])
+                    if item_errors:
+                        transaction.set_rollback(True)
+                        return Response(item_errors, status=status.HTTP_400_BAD_REQUEST)
+                else:
+                    billing.calculate_totals()
+                if billing.invoice_date and billing.invoice_date != previous_invoice_date:
+                    # Its cost of goods moves to the new day with its revenue
+                    billing.stock_movements.update(booked_on=billing.invoice_date)
+                sync_loyalty_points(billing, previous_party_id)
+                index_billings(Billing.objects.filter(pk=billing.pk))
+                publish_event('billing.updated', billing_id=billing.id, user_id=request.user.id,
+                              invoice_date=billing.invoice_date, previous_invoice_date=previous_invoice_date)
+        except ValueError as ve:
+            return Response({'error': str(ve)}, status=status.HTTP_400_BAD_REQUEST)
+
+        response = Response({'message': 'Billing updated successfully!',
+                             'billing': BillingSerializer(billing).data,
+                             'items': attach_billing_items([{'id': billing.id}])[0]['items']},
+                            status=status.HTTP_200_OK)
+        response['ETag'] = version_etag(billing.version)
+        return response
+
+    def patch(self, request, *args, **kwargs):
+        return self.put(request, *args, **kwargs)
+
     def delete(self, request, *args, **kwargs):
         billing_id = request.query_params.get('id')
         if not billing_id:
@@ -602,10 +1052,667 @@ class ApiBillingView(APIView):
         except Billing.DoesNotExist:
             return Response({'error': 'Billing not found or you do not have permission to delete it.'}, status=status.HTTP_404_NOT_FOUND)
 
-        billing.delete()
+        with transaction.atomic():
+            # Locked so the points released are the ones a concurrent edit left behind
+            billing = Billing.objects.select_for_update().get(pk=billing.pk)
+            release_billing_stock(billing)
+            release_loyalty_points(billing)
+            publish_event('billing.deleted', billing_id=billing.id, user_id=request.user.id,
+                          invoice_date=billing.invoice_date)
+            billing.delete()
         return Response({'message': 'Billing deleted successfully!'}, status=status.HTTP_200_OK)
     
 
+class BillingSearchView(APIView):
+    """
+    ``GET billing/search/?q=<words>&status=<status>&from=YYYY-MM-DD&to=YYYY-MM-DD``
+
+    Invoices whose number, party name, phone, VAT number or notes contain
+    every word of ``q``, best matches first, ten per page.
+    """
+    permission_classes = [IsAuthenticated]
+
+    @conditional_get('billing')
+    def get(self, request, *args, **kwargs):
+        query = request.query_params.get('q', '').strip()
+        if len(query) < SEARCH_MIN_LENGTH:
+            return Response({'error': f'q must be at least {SEARCH_MIN_LENGTH} characters'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        invoice_status = request.query_params.get('status')
+        if invoice_status and invoice_status not in dict(Billing.invoice_choices):
+            return Response({'error': 'Invalid status'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            start = request.query_params.get('from')
+            start = date.fromisoformat(start) if start else None
+            end = request.query_params.get('to')
+            end = date.fromisoformat(end) if end else None
+        except ValueError:
+            return Response({'error': 'from and to must be YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+
+        read_serializer = sparse_fieldset(request, BillingReadSerializer)
+        billings = filter_billings(Billing.objects.filter(user=request.user), invoice_status, start, end)
+        billings = search_billings(billings, query)
+
+        paginator = PageNumberPagination()
+        paginator.page_size = 10
+        result_page = paginator.paginate_queryset(read_serializer.values(billings), request)
+        return paginator.get_paginated_response(read_serializer.to_representation(result_page))
+
+
+# -----------------------------
+# Purchase Bill API View
+# -----------------------------
+def attach_purchase_items(rows):
+    """Nest every purchase bill's lines under ``items`` using one query for all rows."""
+    items_by_bill = {row['id']: [] for row in rows}
+    items = PurchaseBillItemReadSerializer.values(PurchaseBillItem.objects.filter(purchase_bill_id__in=items_by_bill))
+    for item in PurchaseBillItemReadSerializer.to_representation(items):
+        items_by_bill[item['purchase_bill']].append(item)
+    for row in rows:
+        row['items'] = items_by_bill[row['id']]
+    return rows
+
+
+class PurchaseBillView(APIView):
+    """Purchase bills from suppliers. POST receives every line into stock at once."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        read_serializer = sparse_fieldset(request, PurchaseBillReadSerializer)
+        bills = PurchaseBill.objects.filter(user=request.user).order_by('-bill_date', '-id')
+
+        supplier_id = request.query_params.get('supplier')
+        if supplier_id:
+            bills = bills.filter(supplier_id=supplier_id)
+
+        bill_id = request.query_params.get('id')
+        if bill_id:
+            bill = get_detail_row(read_serializer, bills, bill_id)
+            if bill is None:
+                return Response({'error': 'Purchase bill not found'}, status=status.HTTP_404_NOT_FOUND)
+            attach_purchase_items([bill])
+            return Response(bill, status=status.HTTP_200_OK)
+
+        paginator = PageNumberPagination()
+        paginator.page_size = 10
+        result_page = paginator.paginate_queryset(read_serializer.values(bills), request)
+        rows = read_serializer.to_representation(result_page)
+        if wants_expand(request, 'items'):
+            attach_purchase_items(rows)
+        return paginator.get_paginated_response(rows)
+
+    @idempotent
+    def post(self, request, *args, **kwargs):
+        bill_data = request.data.copy()
+        bill_data['user'] = request.user.id
+        bill_data.pop('items', None)
+
+        serializer = PurchaseBillSerializer(data=bill_data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            bill = serializer.save()
+            item_errors = receive_purchase(bill, request.data.get('items', []))
+            if item_errors:
+                transaction.set_rollback(True)
+                return Response(item_errors, status=status.HTTP_400_BAD_REQUEST)
+            publish_event('purchase.received', purchase_bill_id=bill.id, user_id=request.user.id)
+
+        return Response({'message': 'Purchase bill received successfully!',
+                         'purchase_bill': PurchaseBillSerializer(bill).data,
+                         'items': attach_purchase_items([{'id': bill.id}])[0]['items']},
+                        status=status.HTTP_201_CREATED)
+
+    def put(self, request, *args, **kwargs):
+        """Record a payment: only ``paid_amount`` can change once a bill is received."""
+        try:
+            bill = PurchaseBill.objects.get(id=int(request.query_params.get('id', '')), user=request.user)
+        except ValueError:
+            return Response({'error': 'Invalid Purchase Bill ID'}, status=status.HTTP_400_BAD_REQUEST)
+        except PurchaseBill.DoesNotExist:
+            return Response({'error': 'Purchase bill not found or you do not have permission to edit it.'},
+                            status=status.HTTP_404_NOT_FOUND)
+
+        serializer = PurchaseBillSerializer(bill, data={'paid_amount': request.data.get('paid_amount')}, partial=True)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            bill = record_purchase_payment(bill, serializer.validated_data['paid_amount'])
+        return Response({'message': 'Payment recorded successfully!',
+                         'purchase_bill': PurchaseBillSerializer(bill).data}, status=status.HTTP_200_OK)
+
+
+class PayablesAgingView(APIView):
+    """Unpaid purchase bills per supplier, bucketed by days past due."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        return Response({'as_of': timezone.localdate(),
+                         'suppliers': payables_aging(request.user, timezone.localdate())},
+                        status=status.HTTP_200_OK)
+
+
+# -----------------------------
+# Recurring Template API Views
+# -----------------------------
+def attach_recurring_items(rows):
+    """Nest every recurring billing template's lines under ``items`` using one query for all rows."""
+    items_by_template = {row['id']: [] for row in rows}
+    items = RecurringBillingItemReadSerializer.values(
+        RecurringBillingItem.objects.filter(template_id__in=items_by_template))
+    for item in RecurringBillingItemReadSerializer.to_representation(items):
+        items_by_template[item['template']].append(item)
+    for row in rows:
+        row['items'] = items_by_template[row['id']]
+    return rows
+
+
+def fixed_schedule_response(data):
+    changed = [field for field in RECURRING_FIXED_FIELDS if field in data]
+    if changed:
+        return Response({'error': f"{', '.join(changed)} cannot be changed; create a new template instead."},
+                        status=status.HTTP_400_BAD_REQUEST)
+    return None
+
+
+class RecurringBillingView(APIView):
+    """Invoice templates; ``api.recurring`` generates the invoices as they fall due."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        read_serializer = sparse_fieldset(request, RecurringBillingReadSerializer)
+        templates = RecurringBilling.objects.filter(user=request.user).order_by('id')
+
+        template_id = request.query_params.get('id')
+        if template_id:
+            template = get_detail_row(read_serializer, templates, template_id)
+            if template is None:
+                return Response({'error': 'Recurring billing not found'}, status=status.HTTP_404_NOT_FOUND)
+            attach_recurring_items([template])
+            return Response(template, status=status.HTTP_200_OK)
+
+        paginator = PageNumberPagination()
+        paginator.page_size = 10
+        result_page = paginator.paginate_queryset(read_serializer.values(templates), request)
+        rows = read_serializer.to_representation(result_page)
+        if wants_expand(request, 'items'):
+            attach_recurring_items(rows)
+        return paginator.get_paginated_response(rows)
+
+    @idempotent
+    def post(self, request, *args, **kwargs):
+        template_data = request.data.copy()
+        template_data['user'] = request.user.id
+        template_data.pop('items', None)
+
+        serializer = RecurringBillingSerializer(data=template_data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            template = serializer.save(next_run_date=serializer.validated_data['start_date'])
+            item_errors = set_template_lines(template, request.data.get('items', []))
+            if item_errors:
+                transaction.set_rollback(True)
+                return Response(item_errors, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({'message': 'Recurring billing created successfully!',
+                         'recurring_billing': RecurringBillingSerializer(template).data,
+                         'items': attach_recurring_items([{'id': template.id}])[0]['items']},
+                        status=status.HTTP_201_CREATED)
+
+    def put(self, request, *args, **kwargs):
+        try:
+            template = RecurringBilling.objects.get(id=int(request.query_params.get('id', '')), user=request.user)
+        except ValueError:
+            return Response({'error': 'Invalid Recurring Billing ID'}, status=status.HTTP_400_BAD_REQUEST)
+        except RecurringBilling.DoesNotExist:
+            return Response({'error': 'Recurring billing not found or you do not have permission to edit it.'},
+                            status=status.HTTP_404_NOT_FOUND)
+
+        template_data = request.data.copy()
+        template_data.pop('items', None)
+        template_data.pop('user', None)
+        error = fixed_schedule_response(template_data)
+        if error:
+            return error
+        serializer = RecurringBillingSerializer(template, data=template_data, partial=True)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            template = serializer.save()
+            # A full item list replaces the template lines
+            if 'items' in request.data:
+                item_errors = set_template_lines(template, request.data['items'])
+                if item_errors:
+                    transaction.set_rollback(True)
+                    return Response(item_errors, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({'message': 'Recurring billing updated successfully!',
+                         'recurring_billing': RecurringBillingSerializer(template).data,
+                         'items': attach_recurring_items([{'id': template.id}])[0]['items']},
+                        status=status.HTTP_200_OK)
+
+    def delete(self, request, *args, **kwargs):
+        try:
+            template = RecurringBilling.objects.get(id=int(request.query_params.get('id', '')), user=request.user)
+        except ValueError:
+            return Response({'error': 'Invalid Recurring Billing ID'}, status=status.HTTP_400_BAD_REQUEST)
+        except RecurringBilling.DoesNotExist:
+            return Response({'error': 'Recurring billing not found or you do not have permission to delete it.'},
+                            status=status.HTTP_404_NOT_FOUND)
+
+        template.delete()
+        return Response({'message': 'Recurring billing deleted successfully!'}, status=status.HTTP_200_OK)
+
+
+class RecurringExpenseView(APIView):
+    """Expense templates, e.g. monthly rent; ``api.recurring`` records them as they fall due."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        read_serializer = sparse_fieldset(request, RecurringExpenseReadSerializer)
+        templates = RecurringExpense.objects.filter(user=request.user).order_by('id')
+
+        template_id = request.query_params.get('id')
+        if template_id:
+            template = get_detail_row(read_serializer, templates, template_id)
+            if template is None:
+                return Response({'error': 'Recurring expense not found'}, status=status.HTTP_404_NOT_FOUND)
+            return Response(template, status=status.HTTP_200_OK)
+
+        paginator = PageNumberPagination()
+        paginator.page_size = 10
+        result_page = paginator.paginate_queryset(read_serializer.values(templates), request)
+        return paginator.get_paginated_response(read_serializer.to_representation(result_page))
+
+    @idempotent
+    def post(self, request, *args, **kwargs):
+        template_data = request.data.copy()
+        template_data['user'] = request.user.id
+
+        serializer = RecurringExpenseSerializer(data=template_data)
+        if serializer.is_valid():
+            serializer.save(next_run_date=serializer.validated_data['start_date'])
+            return Response({'message': 'Recurring expense created successfully!',
+                             'recurring_expense': serializer.data}, status=status.HTTP_201_CREATED)
+        else:
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    def put(self, request, *args, **kwargs):
+        try:
+            template = RecurringExpense.objects.get(id=int(request.query_params.get('id', '')), user=request.user)
+        except ValueError:
+            return Response({'error': 'Invalid Recurring Expense ID'}, status=status.HTTP_400_BAD_REQUEST)
+        except RecurringExpense.DoesNotExist:
+            return Response({'error': 'Recurring expense not found or you do not have permission to edit it.'},
+                            status=status.HTTP_404_NOT_FOUND)
+
+        template_data = request.data.copy()
+        template_data.pop('user', None)
+        error = fixed_schedule_response(template_data)
+        if error:
+            return error
+        serializer = RecurringExpenseSerializer(template, data=template_data, partial=True)
+        if serializer.is_valid():
+            serializer.save()
+            return Response({'message': 'Recurring expense updated successfully!',
+                             'recurring_expense': serializer.data}, status=status.HTTP_200_OK)
+        else:
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    def delete(self, request, *args, **kwargs):
+        try:
+            template = RecurringExpense.objects.get(id=int(request.query_params.get('id', '')), user=request.user)
+        except ValueError:
+            return Response({'error': 'Invalid Recurring Expense ID'}, status=status.HTTP_400_BAD_REQUEST)
+        except RecurringExpense.DoesNotExist:
+            return Response({'error': 'Recurring expense not found or you do not have permission to delete it.'},
+                            status=status.HTTP_404_NOT_FOUND)
+
+        template.delete()
+        return Response({'message': 'Recurring expense deleted successfully!'}, status=status.HTTP_200_OK)
+
+
+# -----------------------------
+# Invoice Number Block View
+# -----------------------------
+class InvoiceNumberBlockView(APIView):
+    """Reserve a block of invoice numbers for an offline terminal."""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        terminal_id = request.data.get('terminal_id')
+        if not terminal_id:
+            return Response({'error': 'terminal_id is required'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            size = int(request.data.get('size', 100))
+        except (TypeError, ValueError):
+            return Response({'error': 'Invalid block size'}, status=status.HTTP_400_BAD_REQUEST)
+        if not 1 <= size <= INVOICE_BLOCK_MAX_SIZE:
+            return Response({'error': f'Block size must be between 1 and {INVOICE_BLOCK_MAX_SIZE}.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            block = reserve_invoice_block(request.user, str(terminal_id)[:64], size)
+
+        return Response({
+            'message': 'Invoice numbers reserved successfully!',
+            'terminal_id': block.terminal_id,
+            'year': block.year,
+            'first_number': block.first_number,
+            'last_number': block.last_number,
+            'first_invoice_number': format_invoice_number(block.year, block.first_number),
+            'last_invoice_number': format_invoice_number(block.year, block.last_number),
+        }, status=status.HTTP_201_CREATED)
+
+
+# -----------------------------
+# Sync API View
+# -----------------------------
+class SyncView(APIView):
+    """
+    Delta sync for offline terminals.
+
+    ``GET sync/?since=<token>`` returns the products, parties, expenses and
+    billings (with items) that changed after ``token``, plus tombstones for
+    deleted rows. Start with ``since=0`` and keep following ``next`` while
+    ``has_more`` is true.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        try:
+            since = int(request.query_params.get('since', 0))
+            limit = min(int(request.query_params.get('limit', SYNC_PAGE_SIZE)), SYNC_MAX_PAGE_SIZE)
+        except ValueError:
+            return Response({'error': 'Invalid sync token'}, status=status.HTTP_400_BAD_REQUEST)
+        if since < 0 or limit < 1:
+            return Response({'error': 'Invalid sync token'}, status=status.HTTP_400_BAD_REQUEST)
+
+        changed, deleted, token, has_more = changes_since(request.user, since, limit)
+
+        querysets = {
+            'product': (Product.objects.filter(user=request.user), ProductReadSerializer),
+            'party': (Party.objects.all(), PartyReadSerializer),
+            'expense': (Expense.objects.filter(user=request.user), ExpenseReadSerializer),
+            'billing': (Billing.objects.filter(user=request.user), BillingReadSerializer),
+        }
+        changes = {}
+        for entity, _ in ChangeLog.ENTITY_CHOICES:
+            rows = []
+            if changed[entity]:
+                queryset, read_serializer = querysets[entity]
+                rows = read_serializer.to_representation(
+                    read_serializer.values(queryset.filter(id__in=changed[entity])))
+                # Rows gone since the change was logged are reported as deleted
+                missing = set(changed[entity]).difference(row['id'] for row in rows)
+                deleted[entity].extend(sorted(missing))
+            changes[entity] = rows
+
+        attach_party_details(changes['party'])
+        attach_billing_items(changes['billing'])
+
+        return Response({
+            'changes': changes,
+            'deleted': deleted,
+            'next': token,
+            'has_more': has_more,
+        }, status=status.HTTP_200_OK)
+
+
+# -----------------------------
+# Batch API View
+# -----------------------------
+class BatchOperationFailed(Exception):
+    """Raised inside an operation's savepoint to roll back just that operation."""
+
+    def __init__(self, result):
+        super().__init__(result)
+        self.result = result
+
+
+class BatchView(APIView):
+    """
+    Replays queued writes in one request.
+
+    The body is ``{"operations": [...], "atomic": false}`` where each operation
+    is ``{"method": "POST", "resource": "products", "id": 3, "body": {...}}``,
+    optionally with an ``idempotency_key`` honoured like the header.
+    Operations run in order through the regular views, without repeating
+    authentication or middleware, inside a single transaction. Each one gets
+    its own savepoint, so a failed operation is rolled back on its own. With
+    ``"atomic": true`` the first failure rolls back the whole batch.
+    """
+    permission_classes = [IsAuthenticated]
+
+    resources = {
+        'products': ('ApiProductView', ApiProductView.as_view()),
+        'parties': ('ApiPartyView', ApiPartyView.as_view()),
+        'expenses': ('ApiExpenseView', ApiExpenseView.as_view()),
+        'billing': ('ApiBillingView', ApiBillingView.as_view()),
+    }
+
+    @idempotent
+    def post(self, request, *args, **kwargs):
+        operations = request.data.get('operations')
+        atomic = bool(request.data.get('atomic', False))
+
+        if not isinstance(operations, list) or not operations:
+            return Response({'error': 'operations must be a non-empty list.'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(operations) > BATCH_MAX_OPERATIONS:
+            return Response({'error': f'A batch can contain at most {BATCH_MAX_OPERATIONS} operations.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        results = []
+        try:
+            with transaction.atomic():
+                for operation in operations:
+                    try:
+                        with transaction.atomic():
+                            result = self.run_operation(request, operation)
+                            if result['status'] >= 400:
+                                raise BatchOperationFailed(result)
+                    except BatchOperationFailed as failed:
+                        result = failed.result
+                    results.append(result)
+                    if atomic and result['status'] >= 400:
+                        raise BatchOperationFailed(result)
+        except BatchOperationFailed:
+            skipped = {'status': status.HTTP_424_FAILED_DEPENDENCY,
+                       'body': {'error': 'Not applied because an earlier operation failed.'}}
+            results.extend(skipped for _ in range(len(operations) - len(results)))
+            return Response({'committed': False, 'results': results}, status=status.HTTP_200_OK)
+
+        return Response({'committed': True, 'results': results}, status=status.HTTP_200_OK)
+
+    def run_operation(self, request, operation):
+        if not isinstance(operation, dict):
+            return {'status': status.HTTP_400_BAD_REQUEST, 'body': {'error': 'Operation must be an object.'}}
+
+        method = str(operation.get('method', '')).upper()
+        resource = self.resources.get(operation.get('resource'))
+        if method not in BATCH_METHODS or resource is None:
+            return {'status': status.HTTP_400_BAD_REQUEST,
+                    'body': {'error': f"Unsupported operation. Methods: {', '.join(BATCH_METHODS)}; "
+                                      f"resources: {', '.join(self.resources)}."}}
+
+        url_name, view = resource
+        query = {'id': operation['id']} if operation.get('id') is not None else {}
+        subrequest = self.build_subrequest(request, method, reverse(url_name), query, operation.get('body') or {},
+                                           operation.get('idempotency_key'))
+        try:
+            response = view(subrequest)
+        except Exception:
+            logger.exception('Batch operation %s %s failed', method, operation.get('resource'))
+            return {'status': status.HTTP_500_INTERNAL_SERVER_ERROR, 'body': {'error': 'Operation failed.'}}
+        return {'status': response.status_code, 'body': response.data}
+
+    @staticmethod
+    def build_subrequest(request, method, path, query, body, idempotency_key=None):
+        payload = orjson.dumps(body)
+        environ = request.META.copy()
+        # The batch's own key and preconditions must not leak into its
+        # operations; each one sends a ``version`` in its body instead
+        environ.pop('HTTP_IDEMPOTENCY_KEY', None)
+        environ.pop('HTTP_IF_MATCH', None)
+        if idempotency_key:
+            environ['HTTP_IDEMPOTENCY_KEY'] = str(idempotency_key)
+        environ.update({
+            'REQUEST_METHOD': method,
+            'SCRIPT_NAME': '',
+            'PATH_INFO': path,
+            'QUERY_STRING': urlencode(query),
+            'CONTENT_TYPE': 'application/json',
+            'CONTENT_LENGTH': str(len(payload)),
+            'wsgi.input': io.BytesIO(payload),
+        })
+        subrequest = WSGIRequest(environ)
+        # DRF skips the authenticators for requests carrying a forced user.
+        subrequest._force_auth_user = request.user
+        return subrequest
+
+
+# -----------------------------
+# Sales Analytics Views
+# -----------------------------
+def analytics_params(request):
+    """Return ``(days, limit)`` from the query string, or raise ValueError."""
+    days = int(request.query_params.get('days', SALES_WINDOW_DAYS))
+    limit = int(request.query_params.get('limit', 10))
+    if not 1 <= days <= SALES_MAX_WINDOW_DAYS or not 1 <= limit <= ANALYTICS_MAX_LIMIT:
+        raise ValueError
+    return days, limit
+
+
+def velocity_rows(products):
+    return [{
+        'id': product['id'],
+        'product_name': product['product_name'],
+        'quantity': product['quantity'],
+        'quantity_sold': product['quantity_sold'],
+        'days_of_stock': None if product['days_of_stock'] is None else round(product['days_of_stock'], 1),
+    } for product in products]
+
+
+class TopProductsView(APIView):
+    """Best sellers over the last ``?days=`` days, by ``?by=quantity|revenue``."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        try:
+            days, limit = analytics_params(request)
+        except ValueError:
+            return Response({'error': f'days must be 1-{SALES_MAX_WINDOW_DAYS} and limit 1-{ANALYTICS_MAX_LIMIT}.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        order_by = request.query_params.get('by', 'quantity')
+        if order_by not in ('quantity', 'revenue'):
+            return Response({'error': "by must be 'quantity' or 'revenue'."}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = [{
+            'product': row['product_id'],
+            'product_name': row['product__product_name'],
+            'quantity_sold': row['quantity_sold'],
+            'revenue': str(row['revenue'].quantize(Decimal('0.01'))),
+            'average_rate': str((row['revenue'] / row['quantity_sold']).quantize(Decimal('0.01'))),
+        } for row in top_products(request.user, days, limit, order_by)]
+        return Response({'days': days, 'by': order_by, 'results': results}, status=status.HTTP_200_OK)
+
+
+class StockCoverView(APIView):
+    """Days of stock left at the average daily sales of the last ``?days=`` days."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        try:
+            days, _ = analytics_params(request)
+        except ValueError:
+            return Response({'error': f'days must be 1-{SALES_MAX_WINDOW_DAYS}.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Products running out first; those that did not sell come last
+        products = (products_with_velocity(request.user, days)
+                    .order_by(F('days_of_stock').asc(nulls_last=True), 'id')
+                    .values('id', 'product_name', 'quantity', 'quantity_sold', 'days_of_stock'))
+        paginator = PageNumberPagination()
+        paginator.page_size = 10
+        result_page = paginator.paginate_queryset(products, request)
+        return paginator.get_paginated_response(velocity_rows(result_page))
+
+
+class SlowMoversView(APIView):
+    """Products in stock that sold least over the last ``?days=`` days."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        try:
+            days, _ = analytics_params(request)
+        except ValueError:
+            return Response({'error': f'days must be 1-{SALES_MAX_WINDOW_DAYS}.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        products = (products_with_velocity(request.user, days)
+                    .filter(quantity__gt=0)
+                    .order_by('quantity_sold', '-quantity', 'id')
+                    .values('id', 'product_name', 'quantity', 'quantity_sold', 'days_of_stock'))
+        paginator = PageNumberPagination()
+        paginator.page_size = 10
+        result_page = paginator.paginate_queryset(products, request)
+        return paginator.get_paginated_response(velocity_rows(result_page))
+
+
+class DashboardView(APIView):
+    """
+    ``GET dashboard/`` - today's, this week's and this month's sales, dues,
+    expenses and new customers, and the low-stock count, in one call.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        return Response(get_dashboard(request.user.pk), status=status.HTTP_200_OK)
+
+
+class StockValuationView(APIView):
+    """Stock on hand valued at weighted-average cost."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        valuation = stock_valuation(request.user)
+        return Response({
+            'products': valuation['product_count'],
+            'quantity': valuation['total_quantity'],
+            'value': str(Decimal(valuation['total_value']).quantize(Decimal('0.01'))),
+        }, status=status.HTTP_200_OK)
+
+
+class CostOfGoodsSoldView(APIView):
+    """``GET analytics/cogs/?from=YYYY-MM-DD&to=YYYY-MM-DD`` - revenue, COGS and gross margin."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        today = timezone.localdate()
+        try:
+            end = date.fromisoformat(request.query_params.get('to', today.isoformat()))
+            start = date.fromisoformat(request.query_params.get('from', end.replace(day=1).isoformat()))
+        except ValueError:
+            return Response({'error': 'from and to must be YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+        if start > end:
+            return Response({'error': 'from must not be after to'}, status=status.HTTP_400_BAD_REQUEST)
+
+        revenue = Decimal(sales_revenue(request.user, start, end))
+        cogs = Decimal(cost_of_goods_sold(request.user, start, end))
+        cents = Decimal('0.01')
+        return Response({
+            'from': start,
+            'to': end,
+            'revenue': str(revenue.quantize(cents)),
+            'cost_of_goods_sold': str(cogs.quantize(cents)),
+            'gross_margin': str((revenue - cogs).quantize(cents)),
+            'gross_margin_percentage': str((100 * (revenue - cogs) / revenue).quantize(cents)) if revenue else None,
+        }, status=status.HTTP_200_OK)
+
+
 class ForgetPasswordView(APIView):
     permission_classes = [AllowAny]
 
@@ -613,7 +1720,7 @@ class ForgetPasswordView(APIView):
         email = request.data.get('email')
 
         try:
-            user = User.objects.get(email=email)
+            user = get_user_by_email(email)
         except User.DoesNotExist:
             return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
 
@@ -642,7 +1749,7 @@ class VerifyForgetPasswordOtpView(APIView):
         otp_provided = request.data.get('otp', '').strip()
 
         try:
-            user = User.objects.get(email=email)
+            user = get_user_by_email(email)
             forget_password_otp = ForgetPasswordOTP.objects.filter(user=user).latest('otp_created_at')
         except User.DoesNotExist:
             return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
@@ -672,7 +1779,7 @@ class ResetPasswordView(APIView):
         new_password = request.data.get('new_password')
 
         try:
-            user = User.objects.get(email=email)
+            user = get_user_by_email(email)
             forget_password_otp = ForgetPasswordOTP.objects.filter(user=user).latest('otp_created_at')
         except User.DoesNotExist:
             return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
@@ -1,12 +1,17 @@
+import logging
 import os
+import time
 
 from celery import Celery
+from celery.signals import before_task_publish, task_postrun, task_prerun
 
 # Set the default Django settings module for the 'celery' program.
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
 app = Celery('backend')
 
+metrics_logger = logging.getLogger('celery.metrics')
+
 # Using a string here means the worker doesn't have to serialize
 # the configuration object to child processes.
 # - namespace='CELERY' means all celery-related configuration keys
@@ -16,3 +21,32 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 # Load task modules from all registered Django apps.
 app.autodiscover_tasks()
 
+
+
+# Queue latency: stamp each message when it is published and log how long it
+# waited once a worker picks it up. Ship these logs to the metrics pipeline
+# to alert on queues that fall behind.
+@before_task_publish.connect
+def stamp_published_at(headers=None, **kwargs):
+    headers.setdefault('published_at', time.time())
+
+
+@task_prerun.connect
+def record_queue_latency(task=None, **kwargs):
+    task.request.started_at = time.monotonic()
+    published_at = getattr(task.request, 'published_at', None)
+    if published_at is None:
+        return
+    queue = (task.request.delivery_info or {}).get('routing_key')
+    latency_ms = (time.time() - published_at) * 1000
+    metrics_logger.info('celery.queue_latency task=%s queue=%s latency_ms=%.1f',
+                        task.name, queue, latency_ms)
+
+
+@task_postrun.connect
+def record_task_runtime(task=None, state=None, **kwargs):
+    started_at = getattr(task.request, 'started_at', None)
+    if started_at is None:
+        return
+    metrics_logger.info('celery.task_runtime task=%s state=%s runtime_ms=%.1f',
+                        task.name, state, (time.monotonic() - started_at) * 1000)
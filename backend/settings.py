@@ -13,8 +13,10 @@ https://docs.djangoproject.com/en/6.0/ref/settings/
 from logging import config
 from pathlib import Path
 from datetime import timedelta
+from decimal import Decimal
 from dotenv import load_dotenv
 from decouple import config
+from celery.schedules import crontab
 
 import os
 
@@ -42,6 +44,15 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
+    "DEFAULT_RENDERER_CLASSES": [
+        "api.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "api.parsers.ORJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
 }
 
 SIMPLE_JWT = {
@@ -70,6 +81,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'api.middleware.CompressionMiddleware',
+    'api.middleware.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -114,9 +127,36 @@ DATABASES = {
         'OPTIONS': {
             'sslmode': 'require',
         },
+        # Keep connections open between requests instead of paying a TLS
+        # handshake each time, and drop ones the server has closed
+        'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=60, cast=int),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Read replicas, e.g. DB_REPLICA_HOSTS=replica-1.internal,replica-2.internal.
+# Safe requests read from them (see api.routers); tests mirror the primary.
+REPLICA_DATABASES = []
+for index, host in enumerate(h.strip() for h in config('DB_REPLICA_HOSTS', default='').split(',') if h.strip()):
+    alias = f'replica_{index + 1}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'OPTIONS': {**DATABASES['default']['OPTIONS'], 'connect_timeout': 2},
+        'TEST': {'MIRROR': 'default'},
+    }
+    REPLICA_DATABASES.append(alias)
+
+DATABASE_ROUTERS = ['api.routers.ReplicaRouter']
+
+# Seconds between health checks of each replica, per process
+REPLICA_HEALTH_CHECK_INTERVAL = 10
+
+# Seconds a replica may lag behind the primary. A client reads from the
+# primary for this long after its own write (read-your-writes), and
+# conditional GETs do so after any write to what they serve (api.conditional)
+REPLICA_PIN_SECONDS = 10
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -163,6 +203,17 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Server-allocated invoice numbers look like INV-2026-000123
+INVOICE_NUMBER_PREFIX = 'INV'
+
+# Customers earn a loyalty point per this much spent on a paid invoice (0 turns
+# accrual off) and each redeemed point takes LOYALTY_POINT_VALUE off an invoice
+LOYALTY_SPEND_PER_POINT = config('LOYALTY_SPEND_PER_POINT', default='100', cast=Decimal)
+LOYALTY_POINT_VALUE = config('LOYALTY_POINT_VALUE', default='1.00', cast=Decimal)
+
+# Responses smaller than this many bytes are not worth compressing
+COMPRESSION_MIN_SIZE = 1024
+
 CORS_ALLOW_ALL_ORIGINS = True
 CORS_ALLOW_CREDENTIALS = True
 
@@ -177,4 +228,91 @@ EMAIL_HOST_PASSWORD='jhvb nzwf qkze njou'
 CELERY_BROKER_URL = "redis://127.0.0.1:6379/0"
 CELERY_ACCEPT_CONTENT = ["json"]
 CELERY_TASK_SERIALIZER = "json"
-CELERY_RESULT_BACKEND = "redis://127.0.0.1:6379/0"
\ No newline at end of file
+CELERY_RESULT_BACKEND = "redis://127.0.0.1:6379/0"
+
+# Nobody reads task return values; tasks that need one opt in with ignore_result=False
+CELERY_TASK_IGNORE_RESULT = True
+CELERY_RESULT_EXPIRES = timedelta(hours=1)
+
+# One queue per kind of work so a report or bulk email backlog never delays
+# login OTPs. Run a worker per queue (see README), e.g.
+#   celery -A backend worker -Q auth --prefetch-multiplier=1
+CELERY_TASK_DEFAULT_QUEUE = "default"
+CELERY_TASK_QUEUES = {
+    "auth": {},         # OTP and other emails a user is waiting for
+    "email": {},        # bulk and scheduled email
+    "reports": {},      # rollups, exports, other long-running jobs
+    "maintenance": {},  # pruning and the outbox relay
+    "default": {},
+}
+CELERY_TASK_ROUTES = {
+    "api.tasks.send_otp_email": {"queue": "auth", "priority": 0},
+    "api.tasks.relay_outbox": {"queue": "maintenance", "priority": 3},
+    "api.tasks.prune_*": {"queue": "maintenance", "priority": 9},
+    "api.tasks.send_low_stock_digests": {"queue": "email", "priority": 6},
+    "api.tasks.send_payment_reminders": {"queue": "email", "priority": 6},
+    "api.tasks.snapshot_stock": {"queue": "maintenance", "priority": 6},
+    "api.tasks.refresh_user_dashboard": {"queue": "default", "priority": 4},
+    "api.tasks.generate_recurring": {"queue": "reports", "priority": 5},
+}
+
+# With the Redis broker, 0 is the highest priority and each step is its own list
+CELERY_TASK_DEFAULT_PRIORITY = 5
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    "priority_steps": list(range(10)),
+    "sep": ":",
+    "queue_order_strategy": "priority",
+    # Unacked tasks are redelivered after this long; keep it above the longest task
+    "visibility_timeout": 3600,
+}
+
+# Tasks that are safe to run twice are acknowledged only once they finish, so
+# a crashed worker's tasks are redelivered. Emails that would go out twice
+# (OTPs, low-stock digests) keep the default early ack. Prefetch is set per
+# worker, one per queue (see README), so a reports worker takes one long job
+# at a time while the email worker can batch.
+_ACK_LATE = {"acks_late": True, "reject_on_worker_lost": True}
+CELERY_TASK_ANNOTATIONS = {
+    "api.tasks.relay_outbox": _ACK_LATE,
+    "api.tasks.prune_sync_change_log": _ACK_LATE,
+    "api.tasks.prune_outbox_events": _ACK_LATE,
+    "api.tasks.send_payment_reminders": _ACK_LATE,
+    "api.tasks.snapshot_stock": _ACK_LATE,
+    "api.tasks.refresh_user_dashboard": _ACK_LATE,
+    "api.tasks.generate_recurring": _ACK_LATE,
+}
+
+CELERY_BEAT_SCHEDULE = {
+    "prune-sync-change-log": {
+        "task": "api.tasks.prune_sync_change_log",
+        "schedule": timedelta(days=1),
+    },
+    # Drains the transactional outbox; see api.outbox
+    "relay-outbox": {
+        "task": "api.tasks.relay_outbox",
+        "schedule": timedelta(seconds=5),
+    },
+    "prune-outbox-events": {
+        "task": "api.tasks.prune_outbox_events",
+        "schedule": timedelta(days=1),
+    },
+    "low-stock-digests": {
+        "task": "api.tasks.send_low_stock_digests",
+        "schedule": timedelta(days=1),
+    },
+    # One digest per customer and shop; reruns skip invoices already reminded
+    "payment-reminders": {
+        "task": "api.tasks.send_payment_reminders",
+        "schedule": crontab(hour=4, minute=0),
+    },
+    # Yesterday's closing stock per product, for stock-as-of queries
+    "snapshot-stock": {
+        "task": "api.tasks.snapshot_stock",
+        "schedule": crontab(hour=0, minute=15),
+    },
+    # Recurring invoices and expenses falling due today; safe to run again
+    "generate-recurring": {
+        "task": "api.tasks.generate_recurring",
+        "schedule": crontab(hour=0, minute=30),
+    },
+}
\ No newline at end of file
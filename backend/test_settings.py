@@ -0,0 +1,46 @@
+"""
+Settings for the test suite:
+
+    python manage.py test --settings=backend.test_settings
+
+Tests run against SQLite with an in-process cache and Celery tasks run
+eagerly, so neither PostgreSQL nor Redis is needed.
+"""
+import os
+
+# The database settings below replace these; they only need to exist
+for name in ('DB_NAME', 'DB_USER', 'DB_PASSWORD', 'DB_HOST', 'DB_PORT'):
+    os.environ.setdefault(name, '')
+
+from .settings import *  # noqa: E402,F401,F403
+from .settings import BASE_DIR  # noqa: E402
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+        # A file rather than memory, so tests that use several threads share it
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
+        # Take the write lock when a transaction starts, as PostgreSQL's row
+        # locks would, instead of failing when two transactions upgrade at once
+        'OPTIONS': {'transaction_mode': 'IMMEDIATE', 'timeout': 20},
+    },
+    # A stand-in read replica: the test runner points it at the test
+    # database. Tests that route to it list it in REPLICA_DATABASES.
+    'replica_1': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+        'TEST': {'MIRROR': 'default'},
+    },
+}
+REPLICA_DATABASES = []
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+CELERY_TASK_ALWAYS_EAGER = True
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']